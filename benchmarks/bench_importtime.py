@@ -0,0 +1,103 @@
+"""
+Benchmark del tiempo de arranque de cada punto de entrada
+=========================================================
+Importa cada script principal en un intérprete nuevo con
+`python -X importtime` y reporta el tiempo total de imports y qué
+dependencias pesadas se cargaron. Con la carga diferida de `src`, ninguna
+debería cargarse solo por importar un punto de entrada.
+
+Uso: python benchmarks/bench_importtime.py
+"""
+
+import os
+import sys
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PUNTOS_DE_ENTRADA = ["main", "main_video", "main_menu", "main_shorts"]
+
+# Dependencias que solo deben importarse al usarse
+DEPENDENCIAS_PESADAS = [
+    "google.genai",
+    "googleapiclient.discovery",
+    "google_auth_oauthlib",
+    "youtube_transcript_api",
+    "numpy",
+]
+
+REPETICIONES = 3
+
+
+def medir_importacion(modulo: str) -> tuple:
+    """
+    Importa un módulo en un proceso nuevo con -X importtime.
+
+    Returns:
+        Tupla (total_ms, {modulo: ms acumulados}) o (None, error)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=RAIZ,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        ultima = result.stderr.strip().splitlines()[-1:] or ["error desconocido"]
+        return None, ultima[0]
+
+    acumulados = {}
+    total_us = 0
+    for linea in result.stderr.splitlines():
+        if not linea.startswith("import time:") or "cumulative" in linea:
+            continue
+        _, cumulativo, nombre = linea[len("import time:"):].split("|")
+        # Solo los imports de primer nivel suman al total (sin sangría)
+        if not nombre[1:].startswith(" "):
+            total_us += int(cumulativo)
+        acumulados[nombre.strip()] = int(cumulativo) / 1000
+
+    return total_us / 1000, acumulados
+
+
+def main() -> int:
+    """Ejecuta el benchmark y devuelve el código de salida."""
+    print(f"{'Punto de entrada':<18} {'Mejor':>9} {'Mediana':>9}  Dependencias pesadas cargadas")
+    print("-" * 78)
+
+    ok = True
+    for modulo in PUNTOS_DE_ENTRADA:
+        tiempos = []
+        cargadas = {}
+        error = None
+        for _ in range(REPETICIONES):
+            total, detalle = medir_importacion(modulo)
+            if total is None:
+                error = detalle
+                break
+            tiempos.append(total)
+            cargadas = {d: detalle[d] for d in DEPENDENCIAS_PESADAS if d in detalle}
+
+        if error:
+            ok = False
+            print(f"{modulo:<18} {'—':>9} {'—':>9}  ❌ {error}")
+            continue
+
+        tiempos.sort()
+        pesadas = ", ".join(f"{d} ({ms:.0f}ms)" for d, ms in cargadas.items()) or "ninguna"
+        ok = ok and not cargadas
+        print(
+            f"{modulo:<18} {tiempos[0]:>7.1f}ms {tiempos[len(tiempos) // 2]:>7.1f}ms  {pesadas}"
+        )
+
+    print("-" * 78)
+    print(
+        "✅ OK"
+        if ok
+        else "❌ Falla (algún punto de entrada no se pudo importar o carga dependencias pesadas)"
+    )
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
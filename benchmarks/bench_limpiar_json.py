@@ -0,0 +1,156 @@
+"""
+Benchmark de limpiar_json_gemini
+================================
+Compara la implementación actual (corta el texto por comillas con
+str.split y limpia solo los strings JSON con str.replace) con la versión
+original carácter a carácter sobre respuestas sintéticas de 10 KB a 5 MB.
+Verifica que la salida sea idéntica y que la mejora sea de al menos 10x.
+
+Uso: python benchmarks/bench_limpiar_json.py
+"""
+
+import os
+import sys
+import json
+import random
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.guion import limpiar_json_gemini  # noqa: E402
+
+TAMANOS = [10_000, 100_000, 1_000_000, 5_000_000]
+MEJORA_MINIMA = 10.0
+REPETICIONES = 3
+
+
+def limpiar_json_referencia(texto: str) -> str:
+    """Implementación original, carácter a carácter (referencia)."""
+    resultado = []
+    dentro_string = False
+    escape = False
+
+    for char in texto:
+        if escape:
+            resultado.append(char)
+            escape = False
+            continue
+
+        if char == "\\":
+            escape = True
+            resultado.append(char)
+            continue
+
+        if char == '"':
+            dentro_string = not dentro_string
+            resultado.append(char)
+            continue
+
+        if dentro_string:
+            if char == "\n":
+                resultado.append(" ")
+            elif char == "\r":
+                continue
+            elif char == "\t":
+                resultado.append(" ")
+            elif ord(char) < 32:
+                continue
+            else:
+                resultado.append(char)
+        else:
+            resultado.append(char)
+
+    return "".join(resultado)
+
+
+def generar_respuesta(tamano: int, semilla: int = 42) -> str:
+    """
+    Genera una respuesta parecida a la de Gemini: un guión JSON con
+    narraciones largas que traen saltos de línea, \\r\\n, tabs, comillas
+    escapadas y algún carácter de control suelto dentro de los strings.
+    """
+    rng = random.Random(semilla)
+    palabras = [
+        "misterio", "noche", "puerta", "sombra", "ciudad", "río", "él",
+        "dijo", "volvió", "año", "1987", "—", "¿qué?", "¡nunca!",
+    ]
+    secciones = []
+    largo = 0
+    while largo < tamano:
+        partes = []
+        for _ in range(rng.randint(300, 900)):
+            partes.append(rng.choice(palabras))
+            r = rng.random()
+            if r < 0.02:
+                partes.append("\n")
+            elif r < 0.025:
+                partes.append("\r\n")
+            elif r < 0.028:
+                partes.append("\t")
+            elif r < 0.031:
+                partes.append('\\"cita\\"')
+            elif r < 0.0315:
+                partes.append("\\\\")
+            elif r < 0.0317:
+                partes.append("\x07")
+        narracion = " ".join(partes)
+        seccion = (
+            "    {\n"
+            f'      "seccion": "Parte {len(secciones) + 1}",\n'
+            '      "duracion_aprox_segundos": 30,\n'
+            f'      "audio_narracion": "{narracion}",\n'
+            '      "instrucciones_visuales": "Plano general\\ttenue"\n'
+            "    }"
+        )
+        secciones.append(seccion)
+        largo += len(seccion)
+
+    return (
+        "{\r\n"
+        '  "titulo_sugerido": "El secreto\nde la casa",\n'
+        '  "estructura_guion": [\n' + ",\n".join(secciones) + "\n  ]\n}"
+    )
+
+
+def medir(funcion, texto: str) -> tuple:
+    """Devuelve (mejor tiempo en segundos, resultado)."""
+    mejor = float("inf")
+    resultado = None
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        resultado = funcion(texto)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def main() -> int:
+    """Ejecuta el benchmark y devuelve el código de salida."""
+    print(f"{'Tamaño':>10} {'Original':>12} {'Actual':>12} {'Mejora':>8}  Salida")
+    print("-" * 56)
+
+    ok = True
+    for tamano in TAMANOS:
+        texto = generar_respuesta(tamano)
+        t_ref, esperado = medir(limpiar_json_referencia, texto)
+        t_nuevo, obtenido = medir(limpiar_json_gemini, texto)
+
+        identica = obtenido == esperado
+        mejora = t_ref / t_nuevo if t_nuevo else float("inf")
+        ok = ok and identica and mejora >= MEJORA_MINIMA
+
+        # La salida además debe seguir siendo JSON válido
+        json.loads(obtenido)
+
+        print(
+            f"{len(texto) / 1000:>8.0f}KB {t_ref * 1000:>10.1f}ms "
+            f"{t_nuevo * 1000:>10.1f}ms {mejora:>7.1f}x  "
+            f"{'idéntica' if identica else 'DISTINTA'}"
+        )
+
+    print("-" * 56)
+    print("✅ OK" if ok else f"❌ Falla (se exige salida idéntica y >= {MEJORA_MINIMA:.0f}x)")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,17 +16,17 @@ from src import (
     crear_estructura_proyecto,
     crear_metadata_proyecto,
     actualizar_metadata_proyecto,
+    lote_metadata,
     generar_guion,
     guardar_guion,
     mostrar_guion,
-    generar_audio,
     obtener_duracion_audio,
     generar_imagenes,
     crear_video,
     verificar_ffmpeg,
     subir_video_youtube,
 )
-from src.audio import mostrar_opciones_voz, obtener_voz
+from src.audio import mostrar_opciones_voz, obtener_voz, NarracionIncremental
 
 
 def main():
@@ -147,8 +147,17 @@ def main():
 
     print(f"\n📝 [1/4] GENERANDO GUIÓN (~{cantidad_palabras} palabras)...")
 
+    # El audio de cada sección empieza a generarse mientras llega el guión
+    narracion = NarracionIncremental(client, rutas, voz)
+
     try:
-        guion = generar_guion(client, tema, cantidad_palabras, estructura)
+        guion = generar_guion(
+            client,
+            tema,
+            cantidad_palabras,
+            estructura,
+            al_recibir_seccion=narracion.agregar_seccion,
+        )
         mostrar_guion(guion)
         guardar_guion(guion, rutas)
 
@@ -160,6 +169,7 @@ def main():
 
     except RuntimeError as e:
         print(f"❌ Error en guión: {e}")
+        narracion.cancelar()
         actualizar_metadata_proyecto(rutas, {"estado": "error_guion"})
         return
 
@@ -170,7 +180,7 @@ def main():
     print(f"\n🔊 [2/4] GENERANDO AUDIO (voz: {voz})...")
 
     try:
-        audio_path = generar_audio(client, guion, rutas, voz)
+        audio_path = narracion.finalizar(guion)
 
         actualizar_metadata_proyecto(
             rutas,
@@ -189,47 +199,49 @@ def main():
 
     print(f"\n🖼️ [3/4] GENERANDO IMÁGENES (cada {segundos_por_imagen}s)...")
 
-    try:
-        duracion_audio = obtener_duracion_audio(audio_path)
-        imagenes = generar_imagenes(
-            client, guion, rutas, tema, duracion_audio, segundos_por_imagen
-        )
-
-        imagenes_ok = [img for img in imagenes if img]
-        print(f"\n✅ {len(imagenes_ok)}/{len(imagenes)} imágenes generadas")
-
-        if not imagenes_ok:
-            raise RuntimeError("No se pudieron generar imágenes")
-
-        imagenes_relativas = [
-            f"imagenes/imagen_{i:02d}.png" for i, img in enumerate(imagenes, 1) if img
-        ]
-        actualizar_metadata_proyecto(
-            rutas,
-            {
-                "estado": "imagenes_generadas",
-                "archivos": {"imagenes": imagenes_relativas},
-            },
-        )
-
-        # Crear video
-        print("\n🎥 [3/4] CREANDO VIDEO...")
-        video_path = os.path.join(rutas["video"], "video_final.mp4")
-        crear_video(imagenes, audio_path, video_path)
-
-        actualizar_metadata_proyecto(
-            rutas,
-            {
-                "estado": "video_generado",
-                "archivos": {"video": "video/video_final.mp4"},
-            },
-        )
-        print(f"✅ Video generado: {video_path}")
-
-    except RuntimeError as e:
-        print(f"❌ Error en video: {e}")
-        actualizar_metadata_proyecto(rutas, {"estado": "error_video"})
-        return
+    # Imágenes y video: sus actualizaciones se escriben juntas al final
+    with lote_metadata(rutas):
+        try:
+            duracion_audio = obtener_duracion_audio(audio_path)
+            imagenes = generar_imagenes(
+                client, guion, rutas, tema, duracion_audio, segundos_por_imagen
+            )
+
+            imagenes_ok = [img for img in imagenes if img]
+            print(f"\n✅ {len(imagenes_ok)}/{len(imagenes)} imágenes generadas")
+
+            if not imagenes_ok:
+                raise RuntimeError("No se pudieron generar imágenes")
+
+            imagenes_relativas = [
+                f"imagenes/imagen_{i:02d}.png" for i, img in enumerate(imagenes, 1) if img
+            ]
+            actualizar_metadata_proyecto(
+                rutas,
+                {
+                    "estado": "imagenes_generadas",
+                    "archivos": {"imagenes": imagenes_relativas},
+                },
+            )
+
+            # Crear video
+            print("\n🎥 [3/4] CREANDO VIDEO...")
+            video_path = os.path.join(rutas["video"], "video_final.mp4")
+            crear_video(imagenes, audio_path, video_path)
+
+            actualizar_metadata_proyecto(
+                rutas,
+                {
+                    "estado": "video_generado",
+                    "archivos": {"video": "video/video_final.mp4"},
+                },
+            )
+            print(f"✅ Video generado: {video_path}")
+
+        except RuntimeError as e:
+            print(f"❌ Error en video: {e}")
+            actualizar_metadata_proyecto(rutas, {"estado": "error_video"})
+            return
 
     # =========================================================
     # PASO 4: YOUTUBE (automático, privado)
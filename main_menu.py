@@ -19,7 +19,6 @@ from src import (
     crear_metadata_proyecto,
     actualizar_metadata_proyecto,
     cargar_proyecto,
-    listar_proyectos,
     generar_guion,
     guardar_guion,
     mostrar_guion,
@@ -32,6 +31,7 @@ from src import (
     listar_videos_disponibles,
 )
 from src.guion import cargar_guion
+from src.catalogo import sincronizar_catalogo, buscar_proyectos, contar_proyectos
 from src.audio import (
     mostrar_opciones_voz, 
     obtener_voz,
@@ -68,44 +68,88 @@ def mostrar_menu_principal():
     print()
 
 
-def seleccionar_proyecto() -> tuple:
-    """Muestra los proyectos y permite seleccionar uno."""
-    proyectos = listar_proyectos()
+# Proyectos por página en los listados del menú
+TAMANO_PAGINA = 10
 
-    if not proyectos:
-        print("\n❌ No hay proyectos existentes.")
-        return None, None
-
-    print("\n📂 PROYECTOS DISPONIBLES:\n")
-    for i, p in enumerate(proyectos, 1):
-        estado_emoji = {
-            "completado": "✅",
-            "iniciado": "🆕",
-            "guion_generado": "📝",
-            "audio_generado": "🔊",
-            "imagenes_generadas": "🖼️",
-            "video_generado": "🎥",
-        }.get(p["estado"], "❓")
 
-        print(f"   [{i}] {estado_emoji} {p['nombre']}")
-        print(f"       Tema: {p['tema'][:50]}...")
-        print(f"       Estado: {p['estado']}")
-        print()
+def seleccionar_proyecto(excluir_estado=None) -> tuple:
+    """
+    Muestra los proyectos por páginas y permite seleccionar uno.
 
-    print("   [0] Cancelar")
+    Args:
+        excluir_estado: Estado o lista de estados que no se muestran
+    """
+    sincronizar_catalogo()
+    tema = None
+    pagina = 0
 
-    try:
-        opcion = int(input("\nSelecciona un proyecto > ").strip())
-        if opcion == 0:
+    while True:
+        total = contar_proyectos(excluir_estado=excluir_estado, tema=tema)
+        if not total:
+            if tema:
+                print(f"\n❌ No hay proyectos con '{tema}' en el tema.")
+                tema = None
+                continue
+            print("\n❌ No hay proyectos existentes.")
             return None, None
-        if 1 <= opcion <= len(proyectos):
-            nombre = proyectos[opcion - 1]["nombre"]
-            return cargar_proyecto(nombre)
-    except (ValueError, FileNotFoundError):
-        pass
 
-    print("❌ Selección inválida")
-    return None, None
+        paginas = (total + TAMANO_PAGINA - 1) // TAMANO_PAGINA
+        pagina = min(pagina, paginas - 1)
+        proyectos = buscar_proyectos(
+            excluir_estado=excluir_estado,
+            tema=tema,
+            limite=TAMANO_PAGINA,
+            desplazamiento=pagina * TAMANO_PAGINA,
+        )
+
+        filtro = f" · tema: '{tema}'" if tema else ""
+        print(f"\n📂 PROYECTOS DISPONIBLES ({total}{filtro}) - página {pagina + 1}/{paginas}:\n")
+        for i, p in enumerate(proyectos, 1):
+            estado_emoji = {
+                "completado": "✅",
+                "iniciado": "🆕",
+                "guion_generado": "📝",
+                "audio_generado": "🔊",
+                "imagenes_generadas": "🖼️",
+                "video_generado": "🎥",
+            }.get(p["estado"], "❓")
+
+            print(f"   [{i}] {estado_emoji} {p['nombre']}")
+            print(f"       Tema: {p['tema'][:50]}...")
+            print(f"       Estado: {p['estado']}")
+            print()
+
+        if pagina + 1 < paginas:
+            print("   [s] Página siguiente")
+        if pagina > 0:
+            print("   [a] Página anterior")
+        print("   [b] Buscar por tema")
+        print("   [0] Cancelar")
+
+        opcion = input("\nSelecciona un proyecto > ").strip().lower()
+        if opcion == "s" and pagina + 1 < paginas:
+            pagina += 1
+            continue
+        if opcion == "a" and pagina > 0:
+            pagina -= 1
+            continue
+        if opcion == "b":
+            tema = input("🔎 Texto del tema (Enter para ver todos) > ").strip() or None
+            pagina = 0
+            continue
+
+        try:
+            opcion = int(opcion)
+            if opcion == 0:
+                return None, None
+            if 1 <= opcion <= len(proyectos):
+                nombre = proyectos[opcion - 1]["nombre"]
+                return cargar_proyecto(nombre)
+        except (ValueError, FileNotFoundError):
+            pass
+
+        print("❌ Selección inválida")
+        return None, None
 
 
 def flujo_completo(client, estructura):
@@ -535,34 +579,45 @@ def solo_youtube():
 
 
 def ver_proyectos():
-    """Muestra todos los proyectos."""
-    proyectos = listar_proyectos()
+    """Muestra todos los proyectos, por páginas."""
+    sincronizar_catalogo()
+    total = contar_proyectos()
 
-    if not proyectos:
+    if not total:
         print("\n📂 No hay proyectos todavía.")
         return
 
-    print("\n📂 PROYECTOS:")
+    print(f"\n📂 PROYECTOS ({total}):")
     print("-" * 50)
 
-    for p in proyectos:
-        estado_emoji = {
-            "completado": "✅",
-            "iniciado": "🆕",
-            "guion_generado": "📝",
-            "audio_generado": "🔊",
-            "imagenes_generadas": "🖼️",
-            "video_generado": "🎥",
-            "error_guion": "❌",
-            "error_audio": "❌",
-            "error_video": "❌",
-            "error_youtube": "❌",
-        }.get(p["estado"], "❓")
-
-        print(f"\n{estado_emoji} {p['nombre']}")
-        print(f"   Tema: {p['tema'][:60]}{'...' if len(p['tema']) > 60 else ''}")
-        print(f"   Estado: {p['estado']}")
-        print(f"   Fecha: {p['fecha']}")
+    desplazamiento = 0
+    while desplazamiento < total:
+        proyectos = buscar_proyectos(limite=TAMANO_PAGINA, desplazamiento=desplazamiento)
+        for p in proyectos:
+            estado_emoji = {
+                "completado": "✅",
+                "iniciado": "🆕",
+                "guion_generado": "📝",
+                "audio_generado": "🔊",
+                "imagenes_generadas": "🖼️",
+                "video_generado": "🎥",
+                "error_guion": "❌",
+                "error_audio": "❌",
+                "error_video": "❌",
+                "error_youtube": "❌",
+            }.get(p["estado"], "❓")
+
+            print(f"\n{estado_emoji} {p['nombre']}")
+            print(f"   Tema: {p['tema'][:60]}{'...' if len(p['tema']) > 60 else ''}")
+            print(f"   Estado: {p['estado']}")
+            print(f"   Fecha: {p['fecha']}")
+
+        desplazamiento += len(proyectos)
+        if not proyectos or desplazamiento >= total:
+            break
+        mas = input(f"\n-- {desplazamiento}/{total} -- Enter para ver más, [0] para salir > ")
+        if mas.strip() == "0":
+            break
 
 
 def retomar_proyecto(client, estructura):
@@ -570,7 +625,8 @@ def retomar_proyecto(client, estructura):
     print("\n🔄 RETOMAR PROYECTO")
     print("-" * 30)
 
-    metadata, rutas = seleccionar_proyecto()
+    # Solo los incompletos: los completados no tienen siguiente paso
+    metadata, rutas = seleccionar_proyecto(excluir_estado="completado")
     if not metadata:
         return
 
@@ -679,9 +735,6 @@ def retomar_proyecto(client, estructura):
                 )
                 print(f"✅ Subido: {url}")
 
-    elif estado == "completado":
-        print("✅ Este proyecto ya está completado.")
-
     else:
         print(f"❓ Estado desconocido: {estado}")
 
@@ -48,7 +48,7 @@ def main():
 
     # Método de conversión
     print("\n📱 ¿Cómo convertir a formato vertical?")
-    print("   [1] 🤖 Smart (IA detecta sujeto) - Recomendado")
+    print("   [1] 🎯 Smart (el encuadre sigue al sujeto) - Recomendado")
     print("   [2] 🌫️  Blur (fondo difuminado)")
     print("   [3] ✂️  Crop (recortar centro)")
 
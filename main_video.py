@@ -20,7 +20,6 @@ from src import (
     generar_guion,
     guardar_guion,
     mostrar_guion,
-    generar_audio,
     verificar_ffmpeg,
     crear_video_desde_audio,
     listar_videos_disponibles,
@@ -32,6 +31,7 @@ from src.audio import (
     mostrar_opciones_estilo,
     obtener_estilo,
     obtener_voz_recomendada,
+    NarracionIncremental,
 )
 
 
@@ -204,8 +204,17 @@ def main():
 
     print(f"\n📝 [1/3] GENERANDO GUIÓN (~{cantidad_palabras} palabras)...")
 
+    # El audio de cada sección empieza a generarse mientras llega el guión
+    narracion = NarracionIncremental(client, rutas, voz, estilo)
+
     try:
-        guion = generar_guion(client, tema, cantidad_palabras, estructura)
+        guion = generar_guion(
+            client,
+            tema,
+            cantidad_palabras,
+            estructura,
+            al_recibir_seccion=narracion.agregar_seccion,
+        )
         mostrar_guion(guion)
         guardar_guion(guion, rutas)
 
@@ -217,6 +226,7 @@ def main():
 
     except RuntimeError as e:
         print(f"❌ Error en guión: {e}")
+        narracion.cancelar()
         actualizar_metadata_proyecto(rutas, {"estado": "error_guion"})
         return
 
@@ -227,7 +237,7 @@ def main():
     print(f"\n🔊 [2/3] GENERANDO AUDIO (voz: {voz}, estilo: {estilo['nombre']})...")
 
     try:
-        audio_path = generar_audio(client, guion, rutas, voz, estilo)
+        audio_path = narracion.finalizar(guion)
 
         actualizar_metadata_proyecto(
             rutas,
@@ -2,47 +2,53 @@
 Módulos del Generador de Videos para YouTube con Gemini
 """
 
-from .config import (
-    configurar_gemini,
-    cargar_estructura,
-    PROYECTOS_DIR,
-    BASE_DIR,
-    cargar_modelos,
-    obtener_modelo,
-    obtener_opciones_modelos,
-    guardar_modelos,
-    MODELOS,
-)
-from .proyecto import (
-    generar_nombre_proyecto,
-    crear_estructura_proyecto,
-    crear_metadata_proyecto,
-    actualizar_metadata_proyecto,
-    cargar_proyecto,
-    listar_proyectos,
-)
-from .guion import generar_guion, guardar_guion, mostrar_guion, extraer_texto_narracion
-from .audio import (
-    generar_audio, 
-    obtener_duracion_audio,
-    mostrar_opciones_estilo,
-    obtener_estilo,
-    obtener_voz_recomendada,
-    aplicar_estilo_texto,
-    ESTILOS_NARRACION,
-)
-from .imagenes import generar_imagenes
-from .video import (
-    crear_video,
-    verificar_ffmpeg,
-    crear_video_con_loop,
-    crear_video_desde_audio,
-    obtener_video_base,
-    listar_videos_disponibles,
-    cargar_config_videos,
-)
-from .youtube import subir_video_youtube
-from .shorts import generar_shorts_desde_url, extraer_video_id, obtener_transcripcion
+import importlib
+
+# Cada nombre público y el submódulo que lo define. Los submódulos se
+# importan recién al primer acceso (PEP 562), así un punto de entrada no
+# carga el SDK de Gemini ni el stack de YouTube si no los usa.
+_EXPORTACIONES = {
+    "configurar_gemini": "config",
+    "cargar_estructura": "config",
+    "PROYECTOS_DIR": "config",
+    "BASE_DIR": "config",
+    "cargar_modelos": "config",
+    "obtener_modelo": "config",
+    "obtener_opciones_modelos": "config",
+    "guardar_modelos": "config",
+    "MODELOS": "config",
+    "generar_nombre_proyecto": "proyecto",
+    "crear_estructura_proyecto": "proyecto",
+    "crear_metadata_proyecto": "proyecto",
+    "actualizar_metadata_proyecto": "proyecto",
+    "cargar_proyecto": "proyecto",
+    "listar_proyectos": "proyecto",
+    "AlmacenProyecto": "proyecto",
+    "lote_metadata": "proyecto",
+    "generar_guion": "guion",
+    "guardar_guion": "guion",
+    "mostrar_guion": "guion",
+    "extraer_texto_narracion": "guion",
+    "generar_audio": "audio",
+    "obtener_duracion_audio": "audio",
+    "mostrar_opciones_estilo": "audio",
+    "obtener_estilo": "audio",
+    "obtener_voz_recomendada": "audio",
+    "aplicar_estilo_texto": "audio",
+    "ESTILOS_NARRACION": "audio",
+    "generar_imagenes": "imagenes",
+    "crear_video": "video",
+    "verificar_ffmpeg": "video",
+    "crear_video_con_loop": "video",
+    "crear_video_desde_audio": "video",
+    "obtener_video_base": "video",
+    "listar_videos_disponibles": "video",
+    "cargar_config_videos": "video",
+    "subir_video_youtube": "youtube",
+    "generar_shorts_desde_url": "shorts",
+    "extraer_video_id": "shorts",
+    "obtener_transcripcion": "shorts",
+}
 
 __all__ = [
     # Config
@@ -62,6 +68,8 @@ __all__ = [
     "actualizar_metadata_proyecto",
     "cargar_proyecto",
     "listar_proyectos",
+    "AlmacenProyecto",
+    "lote_metadata",
     # Guion
     "generar_guion",
     "guardar_guion",
@@ -92,3 +100,16 @@ __all__ = [
     "extraer_video_id",
     "obtener_transcripcion",
 ]
+
+
+def __getattr__(nombre):
+    modulo = _EXPORTACIONES.get(nombre)
+    if modulo is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    valor = getattr(importlib.import_module(f".{modulo}", __name__), nombre)
+    globals()[nombre] = valor
+    return valor
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,9 +1,12 @@
 """Generación de audio con Gemini TTS"""
 
 import os
+import mmap
 import wave
-from google.genai import types
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from .config import obtener_modelo
+from .limites import llamar_modelo
 
 
 # Estilos de narración disponibles según género
@@ -61,17 +64,107 @@ ESTILOS_NARRACION = {
 
 
 def guardar_audio_wav(audio_data: bytes, filepath: str, sample_rate: int = 24000):
-    """Guarda datos de audio PCM como archivo WAV."""
-    with wave.open(filepath, "wb") as wf:
+    """Guarda datos de audio PCM como archivo WAV (escritura atómica)."""
+    temporal = f"{filepath}.part"
+    with wave.open(temporal, "wb") as wf:
         wf.setnchannels(1)  # Mono
         wf.setsampwidth(2)  # 16-bit
         wf.setframerate(sample_rate)
         wf.writeframes(audio_data)
+    os.replace(temporal, filepath)
 
 
 def concatenar_audios_wav(archivos_entrada: list, archivo_salida: str):
     """
-    Concatena múltiples archivos WAV en uno solo usando FFmpeg.
+    Concatena múltiples archivos WAV en uno solo.
+    Si todos comparten el mismo formato PCM (el caso normal con Gemini TTS)
+    se copian las muestras directamente en Python; solo si algún archivo
+    tiene un formato distinto se recurre a FFmpeg para normalizarlos.
+    
+    Args:
+        archivos_entrada: Lista de rutas a archivos WAV
+        archivo_salida: Ruta del archivo WAV resultante
+    """
+    formatos = set()
+    for archivo in archivos_entrada:
+        try:
+            with wave.open(archivo, "rb") as wf:
+                formatos.add((wf.getnchannels(), wf.getsampwidth(), wf.getframerate()))
+        except (wave.Error, EOFError):
+            formatos.add(None)  # No es PCM legible por wave
+
+    if len(formatos) == 1 and None not in formatos:
+        _concatenar_wav_directo(archivos_entrada, archivo_salida, formatos.pop())
+    else:
+        print("   ⚠️  Formatos de audio distintos, normalizando con FFmpeg...")
+        _concatenar_wav_ffmpeg(archivos_entrada, archivo_salida)
+
+
+def _localizar_datos_wav(contenido) -> tuple:
+    """
+    Busca el chunk 'data' dentro de un archivo RIFF/WAVE.
+
+    Args:
+        contenido: Buffer con el archivo completo (bytes o mmap)
+
+    Returns:
+        Tupla (offset, tamaño) de las muestras PCM
+    """
+    pos = 12  # Saltar cabecera RIFF + WAVE
+    while pos + 8 <= len(contenido):
+        chunk_id = bytes(contenido[pos:pos + 4])
+        chunk_size = int.from_bytes(contenido[pos + 4:pos + 8], "little")
+        pos += 8
+        if chunk_id == b"data":
+            # Algunos escritores dejan el tamaño sin rellenar: usar lo que haya
+            return pos, min(chunk_size, len(contenido) - pos)
+        pos += chunk_size + (chunk_size & 1)  # Los chunks se alinean a 2 bytes
+    raise RuntimeError("Archivo WAV sin chunk 'data'")
+
+
+def _concatenar_wav_directo(archivos_entrada: list, archivo_salida: str, formato: tuple):
+    """
+    Concatena WAVs con el mismo formato sin procesos externos.
+    Cada archivo se mapea en memoria y sus muestras se escriben en la
+    salida a través de un memoryview, sin copias intermedias.
+
+    Args:
+        archivos_entrada: Lista de rutas a archivos WAV
+        archivo_salida: Ruta del archivo WAV resultante
+        formato: Tupla (canales, bytes por muestra, frecuencia)
+    """
+    canales, ancho, frecuencia = formato
+    bytes_por_frame = canales * ancho
+
+    # Calcular el total de frames para escribir la cabecera una sola vez
+    total_frames = 0
+    for archivo in archivos_entrada:
+        with wave.open(archivo, "rb") as wf:
+            total_frames += wf.getnframes()
+
+    temporal = f"{archivo_salida}.part"
+    with wave.open(temporal, "wb") as salida:
+        salida.setnchannels(canales)
+        salida.setsampwidth(ancho)
+        salida.setframerate(frecuencia)
+        salida.setnframes(total_frames)
+
+        for archivo in archivos_entrada:
+            with open(archivo, "rb") as f, mmap.mmap(
+                f.fileno(), 0, access=mmap.ACCESS_READ
+            ) as contenido:
+                offset, tamano = _localizar_datos_wav(contenido)
+                tamano -= tamano % bytes_por_frame
+                if tamano:
+                    with memoryview(contenido) as vista:
+                        salida.writeframesraw(vista[offset:offset + tamano])
+
+    os.replace(temporal, archivo_salida)
+
+
+def _concatenar_wav_ffmpeg(archivos_entrada: list, archivo_salida: str):
+    """
+    Concatena WAVs de formatos distintos usando FFmpeg.
     Normaliza todos los audios al mismo formato para evitar pérdida de calidad.
     
     Args:
@@ -136,6 +229,9 @@ def concatenar_audios_wav(archivos_entrada: list, archivo_salida: str):
 # Límite de caracteres por llamada a Gemini TTS (conservador)
 MAX_CARACTERES_TTS = 7000
 
+# Llamadas TTS simultáneas al generar audio por secciones
+MAX_TTS_CONCURRENTES = 4
+
 
 def generar_audio_gemini(client, texto: str, filepath: str, voz: str = "Kore") -> str:
     """
@@ -150,10 +246,14 @@ def generar_audio_gemini(client, texto: str, filepath: str, voz: str = "Kore") -
     Returns:
         Ruta del archivo de audio generado
     """
+    from google.genai import types
+
     print(f"   Usando Gemini TTS con voz '{voz}'...")
 
     try:
-        response = client.models.generate_content(
+        response = llamar_modelo(
+            "tts",
+            client.models.generate_content,
             model=obtener_modelo("tts"),
             contents=texto,
             config=types.GenerateContentConfig(
@@ -176,10 +276,31 @@ def generar_audio_gemini(client, texto: str, filepath: str, voz: str = "Kore") -
         raise RuntimeError(f"Error al generar audio con Gemini TTS: {e}") from e
 
 
-def generar_audio(client, guion: dict, rutas: dict, voz: str = "Kore", estilo: dict = None) -> str:
+def caracteres_narracion(secciones: list) -> int:
+    """
+    Largo del texto narrado completo, sin las instrucciones de estilo.
+
+    Es la medida con la que generar_audio y NarracionIncremental deciden
+    si todo va en una sola llamada TTS, así ambos dividen el guión igual
+    y reutilizan los mismos fragmentos.
+    """
+    if not secciones:
+        return 0
+    return sum(len(s["audio_narracion"]) for s in secciones) + 2 * (len(secciones) - 1)
+
+
+def generar_audio(
+    client,
+    guion: dict,
+    rutas: dict,
+    voz: str = "Kore",
+    estilo: dict = None,
+    max_concurrencia: int = MAX_TTS_CONCURRENTES,
+) -> str:
     """
     Genera un archivo de audio a partir del guión usando Gemini TTS.
-    Si el texto es muy largo, lo divide en secciones y concatena los audios.
+    Si el texto es muy largo, lo divide en secciones, las sintetiza en
+    paralelo y concatena los audios en orden.
 
     Args:
         client: Cliente de Gemini configurado
@@ -187,6 +308,7 @@ def generar_audio(client, guion: dict, rutas: dict, voz: str = "Kore", estilo: d
         rutas: Diccionario con las rutas del proyecto
         voz: Nombre de la voz a usar
         estilo: Diccionario con el estilo de narración (opcional)
+        max_concurrencia: Máximo de llamadas TTS simultáneas (1 = secuencial)
 
     Returns:
         Ruta del archivo de audio generado
@@ -204,7 +326,7 @@ def generar_audio(client, guion: dict, rutas: dict, voz: str = "Kore", estilo: d
     
     # Calcular el texto total para mostrar estadísticas
     texto_total = "\n\n".join([s["audio_narracion"] for s in secciones])
-    total_caracteres = len(texto_total)
+    total_caracteres = caracteres_narracion(secciones)
     print(f"   📝 Texto total: {total_caracteres} caracteres (~{len(texto_total.split())} palabras)")
     
     # Si el texto es corto, generarlo de una sola vez
@@ -217,36 +339,32 @@ def generar_audio(client, guion: dict, rutas: dict, voz: str = "Kore", estilo: d
     print(f"   ⚠️  Texto excede el límite ({MAX_CARACTERES_TTS} chars)")
     print(f"   🔄 Generando audio por secciones...")
     
-    archivos_temp = []
+    # Construir la lista ordenada de fragmentos (sección o parte de sección)
+    fragmentos = []
     total_secciones = len(secciones)
     
     for i, seccion in enumerate(secciones, 1):
-        texto_seccion = seccion["audio_narracion"]
-        nombre_seccion = seccion.get("seccion", f"Sección {i}")
-        
-        print(f"\n   [{i}/{total_secciones}] {nombre_seccion}")
-        print(f"       Caracteres: {len(texto_seccion)}")
-        
-        # Aplicar estilo a cada sección
-        if instrucciones_estilo:
-            texto_seccion = f"{instrucciones_estilo}\n\n{texto_seccion}"
-        
-        # Si una sección individual es muy larga, dividirla en párrafos
-        if len(texto_seccion) > MAX_CARACTERES_TTS:
-            print(f"       ⚠️  Sección muy larga, dividiendo en partes...")
-            partes = dividir_texto_largo(texto_seccion, MAX_CARACTERES_TTS)
-            
-            for j, parte in enumerate(partes, 1):
-                archivo_temp = os.path.join(rutas["audio"], f"temp_{i}_{j}.wav")
-                print(f"       Parte {j}/{len(partes)}: {len(parte)} caracteres")
-                generar_audio_gemini(client, parte, archivo_temp, voz)
-                archivos_temp.append(archivo_temp)
-        else:
-            archivo_temp = os.path.join(rutas["audio"], f"temp_{i}.wav")
-            generar_audio_gemini(client, texto_seccion, archivo_temp, voz)
-            archivos_temp.append(archivo_temp)
+        print(f"\n   [{i}/{total_secciones}] {seccion.get('seccion', f'Sección {i}')}")
+        print(f"       Caracteres: {len(seccion['audio_narracion'])}")
+        fragmentos.extend(
+            fragmentos_de_seccion(i, seccion, rutas["audio"], voz, instrucciones_estilo)
+        )
     
-    # Concatenar todos los audios
+    archivos_temp = sintetizar_fragmentos(client, fragmentos, voz, max_concurrencia)
+    return unir_fragmentos(archivos_temp, filepath)
+
+
+def unir_fragmentos(archivos_temp: list, filepath: str) -> str:
+    """
+    Concatena los WAV temporales en el audio final y los elimina.
+
+    Args:
+        archivos_temp: Lista ordenada de WAV temporales
+        filepath: Ruta del audio final
+
+    Returns:
+        Ruta del archivo de audio generado
+    """
     print(f"\n   🔗 Concatenando {len(archivos_temp)} archivos de audio...")
     concatenar_audios_wav(archivos_temp, filepath)
     
@@ -261,6 +379,259 @@ def generar_audio(client, guion: dict, rutas: dict, voz: str = "Kore", estilo: d
     return filepath
 
 
+def fragmentos_de_seccion(
+    indice: int, seccion: dict, carpeta: str, voz: str, instrucciones_estilo: str = ""
+) -> list:
+    """
+    Convierte una sección del guión en uno o más fragmentos para TTS.
+
+    Args:
+        indice: Número de la sección (empezando en 1)
+        seccion: Sección del guión con 'audio_narracion'
+        carpeta: Carpeta donde guardar los WAV temporales
+        voz: Nombre de la voz a usar
+        instrucciones_estilo: Instrucciones de estilo a anteponer (opcional)
+
+    Returns:
+        Lista ordenada de dicts con 'nombre', 'texto' y 'archivo'
+    """
+    texto_seccion = seccion["audio_narracion"]
+    nombre_seccion = seccion.get("seccion", f"Sección {indice}")
+
+    # Aplicar estilo a cada sección
+    if instrucciones_estilo:
+        texto_seccion = f"{instrucciones_estilo}\n\n{texto_seccion}"
+
+    if len(texto_seccion) <= MAX_CARACTERES_TTS:
+        return [
+            {
+                "nombre": nombre_seccion,
+                "texto": texto_seccion,
+                "archivo": _ruta_fragmento(carpeta, f"temp_{indice}", texto_seccion, voz),
+            }
+        ]
+
+    # Si una sección individual es muy larga, dividirla en párrafos
+    partes = dividir_texto_largo(texto_seccion, MAX_CARACTERES_TTS)
+    print(f"       ⚠️  Sección muy larga, dividida en {len(partes)} partes")
+    return [
+        {
+            "nombre": f"{nombre_seccion} (parte {j}/{len(partes)})",
+            "texto": parte,
+            "archivo": _ruta_fragmento(carpeta, f"temp_{indice}_{j}", parte, voz),
+        }
+        for j, parte in enumerate(partes, 1)
+    ]
+
+
+def _ruta_fragmento(carpeta: str, prefijo: str, texto: str, voz: str) -> str:
+    """
+    Construye la ruta del WAV temporal de un fragmento.
+    El nombre incluye un hash del texto y la voz para poder reutilizar
+    fragmentos de una ejecución anterior solo si no cambiaron.
+    """
+    huella = hashlib.sha1(f"{voz}\n{texto}".encode("utf-8")).hexdigest()[:10]
+    return os.path.join(carpeta, f"{prefijo}_{huella}.wav")
+
+
+def sintetizar_fragmentos(
+    client, fragmentos: list, voz: str, max_concurrencia: int = MAX_TTS_CONCURRENTES
+) -> list:
+    """
+    Sintetiza varios fragmentos de texto en paralelo con un pool acotado.
+
+    Los fragmentos que ya existen en disco (de una ejecución anterior que
+    falló a medias) se reutilizan. Si algún fragmento falla, los que sí se
+    completaron se conservan para el siguiente intento.
+
+    Args:
+        client: Cliente de Gemini configurado
+        fragmentos: Lista ordenada de dicts con 'nombre', 'texto' y 'archivo'
+        voz: Nombre de la voz a usar
+        max_concurrencia: Máximo de llamadas TTS simultáneas
+
+    Returns:
+        Lista de rutas WAV en el mismo orden que los fragmentos
+    """
+    pendientes = []
+    for fragmento in fragmentos:
+        archivo = fragmento["archivo"]
+        if os.path.exists(archivo) and os.path.getsize(archivo) > 44:
+            print(f"   ♻️  Reutilizando audio ya generado: {fragmento['nombre']}")
+        else:
+            pendientes.append(fragmento)
+
+    errores = []
+    total = len(pendientes)
+
+    if total:
+        workers = max(1, min(max_concurrencia, total))
+        print(f"\n   🚀 Sintetizando {total} fragmentos ({workers} en paralelo)...")
+
+        completados = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futuros = {
+                executor.submit(
+                    generar_audio_gemini, client, f["texto"], f["archivo"], voz
+                ): f
+                for f in pendientes
+            }
+            for futuro in as_completed(futuros):
+                fragmento = futuros[futuro]
+                try:
+                    futuro.result()
+                    completados += 1
+                    print(f"   ✅ [{completados}/{total}] {fragmento['nombre']}")
+                except RuntimeError as e:
+                    errores.append(f"{fragmento['nombre']}: {e}")
+                    print(f"   ❌ {fragmento['nombre']}: {e}")
+
+    if errores:
+        raise RuntimeError(
+            f"Fallaron {len(errores)} de {len(fragmentos)} fragmentos de audio. "
+            f"Los {len(fragmentos) - len(errores)} completados se conservaron; "
+            "vuelve a generar el audio para reintentar solo los que faltan.\n"
+            + "\n".join(errores)
+        )
+
+    return [f["archivo"] for f in fragmentos]
+
+
+class NarracionIncremental:
+    """
+    Sintetiza las secciones del guión a medida que llegan en streaming.
+
+    Uso típico junto con generar_guion(..., al_recibir_seccion=...):
+    cada sección se envía a TTS en cuanto se cierra su objeto JSON, y
+    finalizar() espera los fragmentos pendientes y concatena el audio.
+
+    Igual que generar_audio, si la narración completa cabe en una sola
+    llamada TTS se sintetiza de una vez (sin cortes de prosodia entre
+    secciones): las secciones se retienen hasta que el texto acumulado
+    supera MAX_CARACTERES_TTS, y solo entonces empiezan a enviarse.
+    """
+
+    def __init__(
+        self,
+        client,
+        rutas: dict,
+        voz: str = "Kore",
+        estilo: dict = None,
+        max_concurrencia: int = MAX_TTS_CONCURRENTES,
+    ):
+        self.client = client
+        self.rutas = rutas
+        self.voz = voz
+        self.max_concurrencia = max_concurrencia
+        self.instrucciones_estilo = estilo.get("instrucciones", "") if estilo else ""
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_concurrencia))
+        self._futuros = []
+        self._archivos = set()
+        self._retenidas = []
+        self._por_secciones = False
+
+    def agregar_seccion(self, indice: int, seccion: dict):
+        """Envía a TTS una sección recién recibida (sin bloquear)."""
+        if not self._por_secciones:
+            self._retenidas.append((indice, seccion))
+            retenidas = [s for _, s in self._retenidas]
+            if caracteres_narracion(retenidas) <= MAX_CARACTERES_TTS:
+                # Puede que todo el texto quepa en una sola llamada
+                print(f"   🎙️  Sección {indice} lista: {seccion.get('seccion', '')}")
+                return
+            self._por_secciones = True
+            retenidas, self._retenidas = self._retenidas, []
+            for indice_retenida, seccion_retenida in retenidas:
+                self._enviar(indice_retenida, seccion_retenida)
+            return
+        self._enviar(indice, seccion)
+
+    def _enviar(self, indice: int, seccion: dict):
+        print(f"   🎙️  Sección {indice} lista, enviando a TTS: {seccion.get('seccion', '')}")
+        for fragmento in fragmentos_de_seccion(
+            indice, seccion, self.rutas["audio"], self.voz, self.instrucciones_estilo
+        ):
+            if not os.path.exists(fragmento["archivo"]):
+                self._archivos.add(fragmento["archivo"])
+                self._futuros.append(
+                    self._executor.submit(
+                        generar_audio_gemini,
+                        self.client,
+                        fragmento["texto"],
+                        fragmento["archivo"],
+                        self.voz,
+                    )
+                )
+
+    def finalizar(self, guion: dict) -> str:
+        """
+        Espera los fragmentos en curso y genera narracion.wav.
+        Si la narración cabe en una llamada se sintetiza de una vez; si no,
+        las secciones que no llegaron por el stream (o que fallaron) se
+        sintetizan ahora a partir del guión final. Los fragmentos del
+        stream que no coinciden con el guión final se borran.
+
+        Args:
+            guion: Diccionario con el guión completo
+
+        Returns:
+            Ruta del archivo de audio generado
+        """
+        for futuro in self._futuros:
+            try:
+                futuro.result()
+            except RuntimeError as e:
+                print(f"   ⚠️  {e} (se reintentará)")
+        self._executor.shutdown()
+
+        filepath = os.path.join(self.rutas["audio"], "narracion.wav")
+        secciones = guion.get("estructura_guion", [])
+        texto_total = "\n\n".join(s["audio_narracion"] for s in secciones)
+        if self.instrucciones_estilo:
+            texto_total = f"{self.instrucciones_estilo}\n\n{texto_total}"
+
+        if caracteres_narracion(secciones) <= MAX_CARACTERES_TTS:
+            self._borrar_fragmentos(set())
+            print("   ✅ Texto dentro del límite, generando en una sola llamada...")
+            return generar_audio_gemini(self.client, texto_total, filepath, self.voz)
+
+        fragmentos = []
+        for i, seccion in enumerate(secciones, 1):
+            fragmentos.extend(
+                fragmentos_de_seccion(
+                    i, seccion, self.rutas["audio"], self.voz, self.instrucciones_estilo
+                )
+            )
+        self._borrar_fragmentos({f["archivo"] for f in fragmentos})
+
+        archivos_temp = sintetizar_fragmentos(
+            self.client, fragmentos, self.voz, self.max_concurrencia
+        )
+        return unir_fragmentos(archivos_temp, filepath)
+
+    def _borrar_fragmentos(self, conservar: set):
+        """Elimina los WAV sintetizados por el stream que no se van a usar."""
+        for archivo in self._archivos - conservar:
+            try:
+                os.remove(archivo)
+            except OSError:
+                pass
+
+    def cancelar(self):
+        """
+        Descarta las síntesis pendientes (por ejemplo si falla el guión).
+
+        Espera a las que ya están en curso y borra los archivos a medio
+        escribir, para que un reintento no reutilice un fragmento truncado.
+        """
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        for archivo in self._archivos:
+            try:
+                os.remove(f"{archivo}.part")
+            except OSError:
+                pass
+
+
 def dividir_texto_largo(texto: str, max_chars: int) -> list:
     """
     Divide un texto largo en partes más pequeñas respetando los párrafos.
@@ -0,0 +1,319 @@
+"""
+Caché persistente de respuestas de texto de Gemini
+"""
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from concurrent.futures import Future
+from .config import BASE_DIR, obtener_modelo
+from .limites import llamar_modelo
+
+# Ubicación y límites de la caché
+CACHE_DIR = os.path.join(BASE_DIR, "cache")
+CACHE_DB = os.path.join(CACHE_DIR, "gemini_texto.sqlite")
+CACHE_MAX_BYTES = 200 * 1024 * 1024  # 200 MB
+CACHE_MAX_EDAD = 30 * 24 * 3600  # 30 días
+
+# Una petición "en vuelo" de otro proceso se considera abandonada tras esto
+ESPERA_MAX_EN_VUELO = 600
+
+# Peticiones en curso dentro de este proceso (clave -> Future)
+_en_vuelo = {}
+_lock = threading.Lock()
+
+
+def _conectar() -> sqlite3.Connection:
+    """Abre la base de datos de la caché, creándola si no existe."""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    conn = sqlite3.connect(CACHE_DB, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS respuestas (
+            clave TEXT PRIMARY KEY,
+            modelo TEXT,
+            respuesta TEXT,
+            tamano INTEGER,
+            creado REAL,
+            ultimo_acceso REAL
+        )"""
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS en_vuelo (clave TEXT PRIMARY KEY, inicio REAL)"
+    )
+    return conn
+
+
+def _serializar(valor, h):
+    """Agrega al hash una representación estable del valor."""
+    if valor is None:
+        h.update(b"\x00")
+    elif isinstance(valor, str):
+        h.update(b"s" + valor.encode("utf-8") + b"\x00")
+    elif isinstance(valor, (bytes, bytearray, memoryview)):
+        h.update(b"b" + hashlib.sha256(valor).digest())
+    elif isinstance(valor, (int, float, bool)):
+        h.update(f"n{valor!r}".encode() + b"\x00")
+    elif isinstance(valor, dict):
+        h.update(b"{")
+        for k in sorted(valor):
+            _serializar(str(k), h)
+            _serializar(valor[k], h)
+        h.update(b"}")
+    elif isinstance(valor, (list, tuple)):
+        h.update(b"[")
+        for item in valor:
+            _serializar(item, h)
+        h.update(b"]")
+    elif hasattr(valor, "model_dump"):
+        # Objetos de google.genai.types (Part, GenerateContentConfig, ...)
+        _serializar(valor.model_dump(exclude_none=True), h)
+    else:
+        _serializar(repr(valor), h)
+
+
+def clave_cache(modelo: str, contenidos, config=None) -> str:
+    """
+    Calcula la clave de caché de una llamada.
+
+    Args:
+        modelo: Nombre del modelo
+        contenidos: Prompt (str) o lista de partes
+        config: Configuración de generación (opcional)
+
+    Returns:
+        Hash SHA-256 en hexadecimal
+    """
+    h = hashlib.sha256()
+    _serializar([modelo, contenidos, config], h)
+    return h.hexdigest()
+
+
+def leer_cache(clave: str):
+    """
+    Busca una respuesta en la caché.
+
+    Args:
+        clave: Clave calculada con clave_cache
+
+    Returns:
+        Texto de la respuesta, o None si no está o caducó
+    """
+    ahora = time.time()
+    conn = _conectar()
+    try:
+        fila = conn.execute(
+            "SELECT respuesta, creado FROM respuestas WHERE clave = ?", (clave,)
+        ).fetchone()
+        if not fila:
+            return None
+        if ahora - fila[1] > CACHE_MAX_EDAD:
+            conn.execute("DELETE FROM respuestas WHERE clave = ?", (clave,))
+            conn.commit()
+            return None
+        conn.execute(
+            "UPDATE respuestas SET ultimo_acceso = ? WHERE clave = ?", (ahora, clave)
+        )
+        conn.commit()
+        return fila[0]
+    finally:
+        conn.close()
+
+
+def guardar_cache(clave: str, modelo: str, texto: str):
+    """
+    Guarda una respuesta en la caché y aplica la política de expulsión.
+
+    Args:
+        clave: Clave calculada con clave_cache
+        modelo: Nombre del modelo (informativo)
+        texto: Texto de la respuesta
+    """
+    ahora = time.time()
+    conn = _conectar()
+    try:
+        conn.execute(
+            "INSERT OR REPLACE INTO respuestas VALUES (?, ?, ?, ?, ?, ?)",
+            (clave, modelo, texto, len(texto.encode("utf-8")), ahora, ahora),
+        )
+        _podar(conn, ahora)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def invalidar_cache(clave: str):
+    """Elimina una entrada (por ejemplo, si la respuesta resultó inválida)."""
+    conn = _conectar()
+    try:
+        conn.execute("DELETE FROM respuestas WHERE clave = ?", (clave,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _podar(conn: sqlite3.Connection, ahora: float):
+    """Expulsa entradas caducadas y, si se supera el tamaño, las menos usadas."""
+    conn.execute("DELETE FROM respuestas WHERE creado < ?", (ahora - CACHE_MAX_EDAD,))
+
+    total = conn.execute("SELECT COALESCE(SUM(tamano), 0) FROM respuestas").fetchone()[0]
+    if total <= CACHE_MAX_BYTES:
+        return
+
+    expulsar = []
+    for clave, tamano in conn.execute(
+        "SELECT clave, tamano FROM respuestas ORDER BY ultimo_acceso ASC"
+    ):
+        if total <= CACHE_MAX_BYTES:
+            break
+        expulsar.append((clave,))
+        total -= tamano
+    conn.executemany("DELETE FROM respuestas WHERE clave = ?", expulsar)
+
+
+def _reclamar_en_vuelo(clave: str) -> bool:
+    """
+    Marca la clave como "en vuelo" para otros procesos.
+
+    Returns:
+        True si este proceso debe hacer la llamada, False si ya la hace otro
+    """
+    ahora = time.time()
+    conn = _conectar()
+    try:
+        conn.execute(
+            "DELETE FROM en_vuelo WHERE inicio < ?", (ahora - ESPERA_MAX_EN_VUELO,)
+        )
+        cursor = conn.execute(
+            "INSERT OR IGNORE INTO en_vuelo VALUES (?, ?)", (clave, ahora)
+        )
+        conn.commit()
+        return cursor.rowcount == 1
+    finally:
+        conn.close()
+
+
+def _liberar_en_vuelo(clave: str):
+    """Quita la marca "en vuelo" de una clave."""
+    conn = _conectar()
+    try:
+        conn.execute("DELETE FROM en_vuelo WHERE clave = ?", (clave,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _esperar_otro_proceso(clave: str):
+    """
+    Espera a que otro proceso termine la misma petición.
+
+    Returns:
+        La respuesta si apareció en la caché, o None si el otro proceso
+        falló o abandonó la petición
+    """
+    limite = time.time() + ESPERA_MAX_EN_VUELO
+    while time.time() < limite:
+        time.sleep(0.5)
+        texto = leer_cache(clave)
+        if texto is not None:
+            return texto
+        conn = _conectar()
+        try:
+            sigue = conn.execute(
+                "SELECT 1 FROM en_vuelo WHERE clave = ?", (clave,)
+            ).fetchone()
+        finally:
+            conn.close()
+        if not sigue:
+            return leer_cache(clave)
+    return None
+
+
+def generar_texto(
+    client,
+    contenidos,
+    modelo: str = None,
+    config=None,
+    usar_cache: bool = True,
+    validar=None,
+    cachear=None,
+) -> str:
+    """
+    Llama a generate_content pasando por la caché persistente.
+
+    Peticiones idénticas (mismo modelo, contenido y configuración) se
+    sirven desde disco. Si la misma petición ya está en curso en este u
+    otro proceso, se espera su resultado en lugar de repetirla.
+
+    Args:
+        client: Cliente de Gemini configurado
+        contenidos: Prompt (str) o lista de partes
+        modelo: Nombre del modelo (default: modelo de texto configurado)
+        config: Configuración de generación (opcional)
+        usar_cache: False para ir siempre a la red (y no guardar)
+        validar: Función opcional que recibe el texto y lanza una
+            excepción si no es válido; en ese caso no se guarda
+        cachear: Función opcional que recibe el texto ya validado y
+            devuelve False si no debe guardarse (por ejemplo, JSON que
+            solo se pudo usar tras repararlo)
+
+    Returns:
+        Texto de la respuesta
+    """
+    modelo = modelo or obtener_modelo("texto")
+
+    def llamar() -> str:
+        kwargs = {"model": modelo, "contents": contenidos}
+        if config is not None:
+            kwargs["config"] = config
+        texto = llamar_modelo("texto", client.models.generate_content, **kwargs).text
+        if validar:
+            validar(texto)
+        return texto
+
+    if not usar_cache:
+        return llamar()
+
+    clave = clave_cache(modelo, contenidos, config)
+    texto = leer_cache(clave)
+    if texto is not None:
+        return texto
+
+    # Deduplicar peticiones idénticas dentro del proceso
+    with _lock:
+        futuro = _en_vuelo.get(clave)
+        propietario = futuro is None
+        if propietario:
+            futuro = Future()
+            _en_vuelo[clave] = futuro
+
+    if not propietario:
+        return futuro.result()
+
+    try:
+        # ...y entre procesos. Si el otro proceso falla o abandona, se
+        # vuelve a reclamar: solo se libera una marca que sea propia
+        texto = None
+        reclamada = _reclamar_en_vuelo(clave)
+        while not reclamada:
+            texto = _esperar_otro_proceso(clave)
+            if texto is not None:
+                break
+            reclamada = _reclamar_en_vuelo(clave)
+        if reclamada:
+            try:
+                texto = llamar()
+                if cachear is None or cachear(texto):
+                    guardar_cache(clave, modelo, texto)
+            finally:
+                _liberar_en_vuelo(clave)
+        futuro.set_result(texto)
+        return texto
+    except BaseException as e:
+        futuro.set_exception(e)
+        raise
+    finally:
+        with _lock:
+            _en_vuelo.pop(clave, None)
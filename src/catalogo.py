@@ -0,0 +1,175 @@
+"""
+Catálogo de proyectos en SQLite para listar y filtrar sin abrir cada proyecto.json
+"""
+
+import os
+import json
+import sqlite3
+from .config import BASE_DIR, PROYECTOS_DIR
+
+CATALOGO_DB = os.path.join(BASE_DIR, "cache", "proyectos.sqlite")
+
+
+def _conectar() -> sqlite3.Connection:
+    """Abre el catálogo, creando las tablas si no existen."""
+    os.makedirs(os.path.dirname(CATALOGO_DB), exist_ok=True)
+    conn = sqlite3.connect(CATALOGO_DB, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS proyectos (
+            nombre TEXT PRIMARY KEY,
+            tema TEXT,
+            estado TEXT,
+            fecha TEXT,
+            mtime REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_proyectos_fecha ON proyectos (fecha);
+        CREATE INDEX IF NOT EXISTS idx_proyectos_estado ON proyectos (estado, fecha);
+        """
+    )
+    return conn
+
+
+def sincronizar_catalogo(forzar: bool = False) -> int:
+    """
+    Actualiza el catálogo con los cambios en la carpeta de proyectos.
+
+    Solo se vuelve a leer el proyecto.json de los proyectos nuevos o cuyo
+    mtime cambió; los proyectos borrados salen del catálogo.
+
+    Args:
+        forzar: Releer todos los proyecto.json
+
+    Returns:
+        Número de proyectos leídos
+    """
+    conn = _conectar()
+    try:
+        conocidos = dict(conn.execute("SELECT nombre, mtime FROM proyectos"))
+
+        presentes = {}
+        if os.path.isdir(PROYECTOS_DIR):
+            for entrada in os.scandir(PROYECTOS_DIR):
+                if not entrada.is_dir():
+                    continue
+                try:
+                    presentes[entrada.name] = os.stat(
+                        os.path.join(entrada.path, "proyecto.json")
+                    ).st_mtime
+                except FileNotFoundError:
+                    continue
+
+        leidos = 0
+        for nombre, mtime in presentes.items():
+            if not forzar and conocidos.get(nombre) == mtime:
+                continue
+            metadata_path = os.path.join(PROYECTOS_DIR, nombre, "proyecto.json")
+            try:
+                with open(metadata_path, "r", encoding="utf-8") as f:
+                    metadata = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+            conn.execute(
+                "INSERT OR REPLACE INTO proyectos VALUES (?, ?, ?, ?, ?)",
+                (
+                    nombre,
+                    metadata.get("tema", "Sin tema"),
+                    metadata.get("estado", "desconocido"),
+                    metadata.get("fecha_creacion", ""),
+                    mtime,
+                ),
+            )
+            leidos += 1
+
+        borrados = [(n,) for n in conocidos if n not in presentes]
+        conn.executemany("DELETE FROM proyectos WHERE nombre = ?", borrados)
+        conn.commit()
+        return leidos
+    finally:
+        conn.close()
+
+
+def _filtros(
+    estado=None, excluir_estado=None, desde: str = None, hasta: str = None, tema: str = None
+) -> tuple:
+    """Arma la cláusula WHERE y sus parámetros."""
+    condiciones = []
+    parametros = []
+    if estado:
+        estados = [estado] if isinstance(estado, str) else list(estado)
+        condiciones.append(f"estado IN ({','.join('?' * len(estados))})")
+        parametros += estados
+    if excluir_estado:
+        excluidos = [excluir_estado] if isinstance(excluir_estado, str) else list(excluir_estado)
+        condiciones.append(f"estado NOT IN ({','.join('?' * len(excluidos))})")
+        parametros += excluidos
+    if desde:
+        condiciones.append("fecha >= ?")
+        parametros.append(desde)
+    if hasta:
+        # "2025-01-31" incluye todo ese día
+        condiciones.append("fecha <= ?")
+        parametros.append(hasta + " 23:59:59" if len(hasta) == 10 else hasta)
+    if tema:
+        condiciones.append("tema LIKE ? ESCAPE '\\'")
+        escapado = tema.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        parametros.append(f"%{escapado}%")
+
+    where = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    return where, parametros
+
+
+def buscar_proyectos(
+    estado=None,
+    excluir_estado=None,
+    desde: str = None,
+    hasta: str = None,
+    tema: str = None,
+    limite: int = None,
+    desplazamiento: int = 0,
+) -> list:
+    """
+    Consulta el catálogo (sin sincronizar), del más reciente al más antiguo.
+
+    Args:
+        estado: Estado o lista de estados a incluir
+        excluir_estado: Estado o lista de estados a excluir
+        desde: Fecha mínima ("YYYY-MM-DD")
+        hasta: Fecha máxima ("YYYY-MM-DD", inclusive)
+        tema: Texto contenido en el tema (sin distinguir mayúsculas)
+        limite: Máximo de resultados (None: todos)
+        desplazamiento: Resultados a saltar (paginación)
+
+    Returns:
+        Lista de diccionarios con nombre, tema, estado y fecha
+    """
+    where, parametros = _filtros(estado, excluir_estado, desde, hasta, tema)
+    sql = f"SELECT nombre, tema, estado, fecha FROM proyectos {where} ORDER BY fecha DESC, nombre DESC"
+    if limite is not None:
+        sql += " LIMIT ? OFFSET ?"
+        parametros += [limite, desplazamiento]
+
+    conn = _conectar()
+    conn.row_factory = sqlite3.Row
+    try:
+        return [dict(fila) for fila in conn.execute(sql, parametros)]
+    finally:
+        conn.close()
+
+
+def contar_proyectos(
+    estado=None, excluir_estado=None, desde: str = None, hasta: str = None, tema: str = None
+) -> int:
+    """
+    Cuenta los proyectos del catálogo que cumplen los filtros.
+
+    Returns:
+        Número de proyectos
+    """
+    where, parametros = _filtros(estado, excluir_estado, desde, hasta, tema)
+    conn = _conectar()
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM proyectos {where}", parametros).fetchone()[0]
+    finally:
+        conn.close()
@@ -0,0 +1,237 @@
+"""
+Registro de clientes de Gemini compartido por el proceso, con rotación de API keys
+"""
+
+import os
+import re
+import time
+import threading
+from collections import deque
+from dotenv import load_dotenv
+
+# Enfriamiento de una key tras un 429: se duplica con cada 429 seguido
+ENFRIAMIENTO_BASE = 20  # segundos
+ENFRIAMIENTO_MAX = 300
+
+# Ventana para estimar el uso reciente (cuota restante) de cada key
+VENTANA_USO = 60  # segundos
+
+_lock = threading.Lock()
+_pool = None
+_dotenv_cargado = False
+
+
+def _cargar_dotenv():
+    """Lee el .env una sola vez por proceso."""
+    global _dotenv_cargado
+    if not _dotenv_cargado:
+        load_dotenv()
+        _dotenv_cargado = True
+
+
+def cargar_claves() -> list:
+    """
+    Lee las API keys del entorno.
+
+    GEMINI_API_KEYS admite varias separadas por comas o espacios;
+    GEMINI_API_KEY se sigue aceptando como key única.
+
+    Returns:
+        Lista de keys sin repetidos, en orden
+    """
+    _cargar_dotenv()
+    claves = re.split(r"[\s,;]+", os.getenv("GEMINI_API_KEYS", ""))
+    claves.append(os.getenv("GEMINI_API_KEY", ""))
+    return list(dict.fromkeys(c.strip() for c in claves if c.strip()))
+
+
+def codigo_error(error: Exception):
+    """
+    Código HTTP de un error de la API de Gemini, si se puede deducir.
+
+    Returns:
+        Entero (429, 503, ...) o None
+    """
+    codigo = getattr(error, "code", None) or getattr(error, "status_code", None)
+    if isinstance(codigo, int):
+        return codigo
+    texto = str(error)
+    if "RESOURCE_EXHAUSTED" in texto or re.search(r"\b429\b", texto):
+        return 429
+    if "UNAVAILABLE" in texto or re.search(r"\b503\b", texto):
+        return 503
+    return None
+
+
+class _EstadoClave:
+    """Uso y enfriamiento de una API key."""
+
+    def __init__(self, clave: str):
+        self.clave = clave
+        self.cliente = None
+        self.en_vuelo = 0
+        self.usos = deque()
+        self.enfriada_hasta = 0.0
+        self.errores_seguidos = 0
+
+    def uso_reciente(self, ahora: float) -> int:
+        while self.usos and self.usos[0] < ahora - VENTANA_USO:
+            self.usos.popleft()
+        return len(self.usos) + self.en_vuelo
+
+
+class _ModelosRotativos:
+    """Imita `client.models` repartiendo cada llamada entre las keys."""
+
+    def __init__(self, pool: "PoolClientes"):
+        self._pool = pool
+
+    def generate_content_stream(self, *args, **kwargs):
+        return self._pool.ejecutar_stream("generate_content_stream", *args, **kwargs)
+
+    def __getattr__(self, nombre):
+        def llamar(*args, **kwargs):
+            return self._pool.ejecutar(nombre, *args, **kwargs)
+
+        return llamar
+
+
+class PoolClientes:
+    """
+    Conjunto de clientes de Gemini, uno por API key, reutilizados por todo
+    el proceso.
+
+    Se usa como un `genai.Client`: `pool.models.generate_content(...)`.
+    Cada llamada va a la key con menos uso reciente; una key que recibe un
+    429 queda fuera de la rotación durante un enfriamiento y la llamada se
+    reintenta con otra key si hay alguna disponible.
+    """
+
+    def __init__(self, claves: list):
+        if not claves:
+            raise ValueError("Se necesita al menos una API key")
+        self._estados = [_EstadoClave(c) for c in claves]
+        self._lock = threading.Lock()
+        self.models = _ModelosRotativos(self)
+
+    @property
+    def num_claves(self) -> int:
+        return len(self._estados)
+
+    def _cliente(self, estado: _EstadoClave):
+        # Un cliente por key, creado una vez: mantiene su conexión HTTP
+        if estado.cliente is None:
+            import google.genai as genai
+
+            estado.cliente = genai.Client(api_key=estado.clave)
+        return estado.cliente
+
+    def _elegir(self, excluir: set) -> _EstadoClave:
+        """Reserva la key con más margen; espera si todas están enfriándose."""
+        while True:
+            with self._lock:
+                ahora = time.time()
+                candidatos = [e for e in self._estados if id(e) not in excluir]
+                if not candidatos:
+                    return None
+                disponibles = [e for e in candidatos if e.enfriada_hasta <= ahora]
+                if disponibles:
+                    estado = min(disponibles, key=lambda e: e.uso_reciente(ahora))
+                    estado.en_vuelo += 1
+                    estado.usos.append(ahora)
+                    return estado
+                espera = min(e.enfriada_hasta for e in candidatos) - ahora
+            time.sleep(max(espera, 0.05))
+
+    def _liberar(self, estado: _EstadoClave, error: Exception = None):
+        with self._lock:
+            estado.en_vuelo -= 1
+            if error is not None and codigo_error(error) == 429:
+                estado.errores_seguidos += 1
+                enfriamiento = min(
+                    ENFRIAMIENTO_BASE * 2 ** (estado.errores_seguidos - 1), ENFRIAMIENTO_MAX
+                )
+                estado.enfriada_hasta = time.time() + enfriamiento
+            elif error is None:
+                estado.errores_seguidos = 0
+
+    def ejecutar(self, metodo: str, *args, **kwargs):
+        """
+        Ejecuta `client.models.<metodo>` con la key más descansada.
+
+        Ante un 429 prueba con las demás keys antes de propagar el error.
+        """
+        probadas = set()
+        while True:
+            estado = self._elegir(probadas)
+            try:
+                resultado = getattr(self._cliente(estado).models, metodo)(*args, **kwargs)
+            except Exception as e:
+                self._liberar(estado, e)
+                probadas.add(id(estado))
+                if codigo_error(e) == 429 and len(probadas) < len(self._estados):
+                    continue
+                raise
+            self._liberar(estado)
+            return resultado
+
+    def ejecutar_stream(self, metodo: str, *args, **kwargs):
+        """
+        Igual que ejecutar, para métodos que devuelven un iterador.
+
+        Solo se cambia de key si el error llega antes del primer trozo.
+        """
+        probadas = set()
+        while True:
+            estado = self._elegir(probadas)
+            try:
+                iterador = iter(getattr(self._cliente(estado).models, metodo)(*args, **kwargs))
+                primero = next(iterador, None)
+            except Exception as e:
+                self._liberar(estado, e)
+                probadas.add(id(estado))
+                if codigo_error(e) == 429 and len(probadas) < len(self._estados):
+                    continue
+                raise
+            break
+
+        def generar():
+            error = None
+            try:
+                if primero is not None:
+                    yield primero
+                yield from iterador
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                self._liberar(estado, error)
+
+        return generar()
+
+    def __getattr__(self, nombre):
+        # Otros servicios del SDK (files, caches, ...) usan la primera key
+        if nombre.startswith("_"):
+            raise AttributeError(nombre)
+        return getattr(self._cliente(self._estados[0]), nombre)
+
+
+def obtener_pool() -> PoolClientes:
+    """
+    Devuelve el pool de clientes del proceso, creándolo la primera vez.
+
+    Returns:
+        PoolClientes compartido
+    """
+    global _pool
+    with _lock:
+        if _pool is None:
+            claves = cargar_claves()
+            if not claves:
+                raise ValueError(
+                    "No se encontró la API key. "
+                    "Asegúrate de crear un archivo .env con GEMINI_API_KEY=tu_clave "
+                    "(o GEMINI_API_KEYS=clave1,clave2 para usar varias)"
+                )
+            _pool = PoolClientes(claves)
+        return _pool
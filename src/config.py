@@ -4,8 +4,6 @@ Configuración y conexión con APIs
 
 import os
 import json
-from dotenv import load_dotenv
-import google.genai as genai
 
 # Rutas base
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
@@ -108,22 +106,17 @@ def guardar_modelos(modelos: dict):
 
 def configurar_gemini():
     """
-    Configura la API de Gemini con la clave de entorno.
+    Devuelve el cliente de Gemini compartido por el proceso.
+
+    Las keys se leen de GEMINI_API_KEYS (varias, separadas por comas) o de
+    GEMINI_API_KEY; con varias, las peticiones se reparten entre ellas.
 
     Returns:
-        Cliente de Gemini configurado
+        Cliente de Gemini configurado (PoolClientes, mismo uso que genai.Client)
     """
-    load_dotenv()
-    api_key = os.getenv("GEMINI_API_KEY")
-
-    if not api_key:
-        raise ValueError(
-            "No se encontró la API key. "
-            "Asegúrate de crear un archivo .env con GEMINI_API_KEY=tu_clave"
-        )
+    from .clientes import obtener_pool
 
-    client = genai.Client(api_key=api_key)
-    return client
+    return obtener_pool()
 
 
 def cargar_estructura():
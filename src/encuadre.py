@@ -0,0 +1,187 @@
+"""
+Encuadre vertical dinámico a partir de movimiento y bordes (sin IA)
+"""
+
+import subprocess
+
+# Proxy de baja resolución que se analiza (16:9, escala de grises)
+ANCHO_PROXY = 160
+ALTO_PROXY = 90
+FPS_PROXY = 5
+
+# Ancho del recorte 9:16 respecto del cuadro 16:9 (607 de 1920 px)
+ANCHO_CROP_RELATIVO = 607 / 1920
+
+# Peso del movimiento frente a la energía de bordes en la saliencia
+PESO_MOVIMIENTO = 0.7
+# Penalización suave a las ventanas alejadas del centro (desempata cuadros planos)
+SESGO_CENTRO = 0.15
+# Desplazamiento máximo del centro del recorte por segundo (fracción del ancho)
+MAX_DESPLAZAMIENTO = 0.12
+
+
+def leer_proxy_gris(
+    video_path: str,
+    ancho: int = ANCHO_PROXY,
+    alto: int = ALTO_PROXY,
+    fps: int = FPS_PROXY,
+):
+    """
+    Decodifica el video a un proxy pequeño en escala de grises.
+
+    Args:
+        video_path: Ruta del video
+        ancho: Ancho del proxy
+        alto: Alto del proxy
+        fps: Frames por segundo del proxy
+
+    Returns:
+        Array de NumPy (frames, alto, ancho) con valores uint8
+    """
+    import numpy as np
+
+    cmd = [
+        "ffmpeg",
+        "-v",
+        "error",
+        "-i",
+        video_path,
+        "-an",
+        "-vf",
+        f"fps={fps},scale={ancho}:{alto}",
+        "-f",
+        "rawvideo",
+        "-pix_fmt",
+        "gray",
+        "pipe:1",
+    ]
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"Error al leer el video para el encuadre: {result.stderr.decode(errors='replace')}"
+        )
+
+    tamano_frame = ancho * alto
+    n = len(result.stdout) // tamano_frame
+    return np.frombuffer(result.stdout, dtype=np.uint8, count=n * tamano_frame).reshape(
+        n, alto, ancho
+    )
+
+
+def calcular_trayectoria(
+    frames,
+    fps: int = FPS_PROXY,
+    ancho_relativo: float = ANCHO_CROP_RELATIVO,
+) -> list:
+    """
+    Calcula el centro horizontal del recorte para cada segundo del video.
+
+    La saliencia de cada columna combina la diferencia entre frames
+    consecutivos (movimiento) y el gradiente de la imagen (bordes). En cada
+    segundo se elige la ventana del ancho del recorte con más saliencia y
+    luego la trayectoria se suaviza y se limita su velocidad.
+
+    Args:
+        frames: Array (frames, alto, ancho) de leer_proxy_gris
+        fps: Frames por segundo del proxy
+        ancho_relativo: Ancho del recorte como fracción del cuadro
+
+    Returns:
+        Lista con el centro del recorte (0-1) para cada segundo
+    """
+    import numpy as np
+
+    if len(frames) == 0:
+        return [0.5]
+
+    f = frames.astype(np.float32)
+    bordes = np.abs(np.diff(f, axis=2, prepend=f[:, :, :1])) + np.abs(
+        np.diff(f, axis=1, prepend=f[:, :1, :])
+    )
+    movimiento = np.abs(np.diff(f, axis=0, prepend=f[:1]))
+
+    # Perfiles por columna, normalizados con la media de todo el clip para
+    # que un segundo casi quieto no pese lo mismo que uno con acción
+    perfil_bordes = bordes.sum(axis=1)
+    perfil_movimiento = movimiento.sum(axis=1)
+    perfil = (1 - PESO_MOVIMIENTO) * perfil_bordes / max(perfil_bordes.mean(), 1e-6)
+    perfil += PESO_MOVIMIENTO * perfil_movimiento / max(perfil_movimiento.mean(), 1e-6)
+
+    ancho = f.shape[2]
+    ventana = min(ancho, max(1, round(ancho * ancho_relativo)))
+    posiciones = (np.arange(ancho - ventana + 1) + ventana / 2) / ancho
+    prior = 1 - SESGO_CENTRO * np.abs(posiciones - 0.5) * 2
+
+    centros = []
+    for inicio in range(0, len(perfil), fps):
+        p = perfil[inicio : inicio + fps].mean(axis=0)
+        acumulado = np.concatenate(([0.0], np.cumsum(p)))
+        sumas = (acumulado[ventana:] - acumulado[:-ventana]) * prior
+        if sumas.max() <= 0:
+            centros.append(centros[-1] if centros else 0.5)
+        else:
+            centros.append(float(posiciones[int(np.argmax(sumas))]))
+
+    centros = np.array(centros)
+
+    # Mediana de 3 para descartar saltos aislados
+    if len(centros) >= 3:
+        vecinos = np.stack(
+            [np.r_[centros[:1], centros[:-1]], centros, np.r_[centros[1:], centros[-1:]]]
+        )
+        centros = np.median(vecinos, axis=0)
+
+    # Limitar la velocidad del "camarógrafo"
+    for i in range(1, len(centros)):
+        centros[i] = np.clip(
+            centros[i], centros[i - 1] - MAX_DESPLAZAMIENTO, centros[i - 1] + MAX_DESPLAZAMIENTO
+        )
+
+    # Media móvil para suavizar
+    if len(centros) >= 3:
+        centros = np.convolve(np.pad(centros, 1, mode="edge"), np.ones(3) / 3, mode="valid")
+
+    return [float(c) for c in centros]
+
+
+def expresion_crop_x(
+    trayectoria: list, ancho_relativo: float = ANCHO_CROP_RELATIVO
+) -> str:
+    """
+    Convierte la trayectoria en una expresión x para el filtro crop.
+
+    Cada valor se ubica en la mitad de su segundo y entre valores se
+    interpola linealmente, así el recorte se desplaza sin saltos.
+
+    Args:
+        trayectoria: Centros del recorte (0-1) por segundo
+        ancho_relativo: Ancho del recorte como fracción del cuadro
+
+    Returns:
+        Expresión de ffmpeg en función de t, in_w y out_w
+    """
+    holgura = max(1 - ancho_relativo, 1e-6)
+    izquierdas = [
+        min(max((c - ancho_relativo / 2) / holgura, 0.0), 1.0) for c in trayectoria
+    ] or [0.5]
+
+    expresion = f"{izquierdas[0]:.4f}"
+    for i in range(1, len(izquierdas)):
+        delta = izquierdas[i] - izquierdas[i - 1]
+        if abs(delta) >= 0.0005:
+            expresion += f"+({delta:.4f})*clip(t-{i - 0.5:.1f},0,1)"
+
+    return f"(in_w-out_w)*({expresion})"
+
+
+def analizar_encuadre(video_path: str) -> list:
+    """
+    Calcula la trayectoria del recorte vertical de un video.
+
+    Args:
+        video_path: Ruta del video horizontal
+
+    Returns:
+        Lista con el centro del recorte (0-1) para cada segundo
+    """
+    return calcular_trayectoria(leer_proxy_gris(video_path))
@@ -0,0 +1,333 @@
+"""
+Caché local de videos fuente para recortar clips sin volver a descargar
+"""
+
+import os
+import glob
+import time
+import hashlib
+import threading
+import subprocess
+from contextlib import contextmanager
+from .config import BASE_DIR
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos, solo el margen de uso reciente
+    fcntl = None
+
+FUENTES_DIR = os.path.join(BASE_DIR, "cache", "fuentes")
+FUENTES_MAX_BYTES = 10 * 1024 * 1024 * 1024  # 10 GB
+
+# Una fuente usada hace menos de esto no se poda (protege a otros procesos)
+FUENTES_USO_RECIENTE = 60 * 60  # segundos
+
+# Videos más largos que esto solo se descargan completos si hay bastantes
+# momentos; con pocos, la descarga por secciones baja mucho menos
+FUENTE_DURACION_LARGA = 30 * 60  # segundos
+FUENTE_MOMENTOS_POR_HORA = 4
+
+# Mismo formato que usaba la descarga por secciones
+FORMATO_FUENTE = "bestvideo[height<=1080]+bestaudio/best[height<=1080]"
+
+# Un lock por fuente para que varios hilos no descarguen lo mismo a la vez
+_locks = {}
+_locks_lock = threading.Lock()
+
+# Fuentes en uso por este proceso (ruta -> contador)
+_en_uso = {}
+_poda_lock = threading.Lock()
+
+
+def ruta_fuente(video_id: str, formato: str = FORMATO_FUENTE) -> str:
+    """
+    Ruta en la caché del video fuente para un ID y formato.
+
+    Args:
+        video_id: ID del video de YouTube
+        formato: Selector de formato de yt-dlp
+
+    Returns:
+        Ruta del archivo (exista o no)
+    """
+    clave = hashlib.sha256(f"{video_id}\x00{formato}".encode("utf-8")).hexdigest()[:16]
+    return os.path.join(FUENTES_DIR, f"{video_id}_{clave}.mp4")
+
+
+def ruta_seccion(
+    video_id: str, inicio: int, fin: int, formato: str = FORMATO_FUENTE
+) -> str:
+    """
+    Ruta en la caché de una sección descargada (--download-sections).
+
+    Args:
+        video_id: ID del video de YouTube
+        inicio: Segundo de inicio
+        fin: Segundo de fin
+        formato: Selector de formato de yt-dlp
+
+    Returns:
+        Ruta del archivo (exista o no)
+    """
+    base = ruta_fuente(video_id, formato)[: -len(".mp4")]
+    return f"{base}_{int(inicio)}-{int(fin)}.mp4"
+
+
+def _lock_de(ruta: str) -> threading.Lock:
+    with _locks_lock:
+        return _locks.setdefault(ruta, threading.Lock())
+
+
+@contextmanager
+def _bloqueo_archivo(ruta: str, compartido: bool = False, esperar: bool = True):
+    """
+    Bloqueo entre procesos sobre `<ruta>.lock`.
+
+    Produce True si se obtuvo, o False si esperar=False y otro proceso lo
+    tiene. Sin fcntl (Windows) siempre produce True.
+    """
+    if fcntl is None:
+        yield True
+        return
+    with open(ruta + ".lock", "a+b") as f:
+        modo = fcntl.LOCK_SH if compartido else fcntl.LOCK_EX
+        try:
+            fcntl.flock(f.fileno(), modo if esperar else modo | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def usar_fuente(ruta: str):
+    """
+    Marca una fuente de la caché como en uso mientras se recortan clips,
+    para que ninguna poda (de este u otro proceso) la elimine.
+
+    Args:
+        ruta: Ruta devuelta por obtener_fuente
+    """
+    with _locks_lock:
+        _en_uso[ruta] = _en_uso.get(ruta, 0) + 1
+    try:
+        with _bloqueo_archivo(ruta, compartido=True):
+            yield ruta
+    finally:
+        with _locks_lock:
+            _en_uso[ruta] -= 1
+            if not _en_uso[ruta]:
+                del _en_uso[ruta]
+
+
+def conviene_fuente_completa(duracion: float, num_momentos: int) -> bool:
+    """
+    Decide si vale la pena descargar el video completo a la caché.
+
+    Para videos largos con pocos momentos, bajar solo las secciones
+    (--download-sections) transfiere mucho menos.
+
+    Args:
+        duracion: Duración aproximada del video en segundos (None si no se sabe)
+        num_momentos: Número de clips que se van a recortar
+
+    Returns:
+        True si conviene la descarga completa
+    """
+    if not duracion or duracion <= FUENTE_DURACION_LARGA:
+        return True
+    return num_momentos >= FUENTE_MOMENTOS_POR_HORA * duracion / 3600
+
+
+def obtener_fuente(
+    video_id: str, url: str = None, formato: str = FORMATO_FUENTE
+) -> str:
+    """
+    Devuelve el video fuente completo, descargándolo solo la primera vez.
+
+    Args:
+        video_id: ID del video de YouTube
+        url: URL a descargar (default: la URL estándar del ID)
+        formato: Selector de formato de yt-dlp
+
+    Returns:
+        Ruta del video en la caché
+    """
+    destino = ruta_fuente(video_id, formato)
+    _descargar_a_cache(destino, video_id, url, formato, [], "video fuente")
+    podar_fuentes(conservar=destino)
+    return destino
+
+
+def obtener_seccion(
+    video_id: str,
+    inicio: int,
+    fin: int,
+    url: str = None,
+    formato: str = FORMATO_FUENTE,
+) -> str:
+    """
+    Devuelve una sección del video, descargándola solo la primera vez.
+
+    Para videos largos con pocos momentos se bajan solo las secciones
+    (ver conviene_fuente_completa); quedan en la misma caché que las
+    fuentes completas, así que volver a procesar el video no descarga nada.
+
+    Args:
+        video_id: ID del video de YouTube
+        inicio: Segundo de inicio
+        fin: Segundo de fin
+        url: URL a descargar (default: la URL estándar del ID)
+        formato: Selector de formato de yt-dlp
+
+    Returns:
+        Ruta de la sección en la caché
+    """
+    destino = ruta_seccion(video_id, inicio, fin, formato)
+    _descargar_a_cache(
+        destino,
+        video_id,
+        url,
+        formato,
+        ["--download-sections", f"*{int(inicio)}-{int(fin)}"],
+        "sección",
+    )
+    podar_fuentes(conservar=destino)
+    return destino
+
+
+def _descargar_a_cache(
+    destino: str, video_id: str, url: str, formato: str, extra: list, descripcion: str
+):
+    """Descarga con yt-dlp a `destino` si no existe (bajo los locks de la ruta)."""
+    os.makedirs(FUENTES_DIR, exist_ok=True)
+    with _lock_de(destino), _bloqueo_archivo(destino):
+        if os.path.exists(destino):
+            # Marcar como usado recientemente para la expulsión
+            os.utime(destino)
+            return
+
+        temporal = f"{destino}.{os.getpid()}.descarga.mp4"
+        cmd = [
+            "yt-dlp",
+            *extra,
+            "-f",
+            formato,
+            "--merge-output-format",
+            "mp4",
+            "-o",
+            temporal,
+            "--no-playlist",
+            url or f"https://www.youtube.com/watch?v={video_id}",
+        ]
+        try:
+            subprocess.run(cmd, check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError as e:
+            for resto in glob.glob(glob.escape(temporal) + "*"):
+                os.remove(resto)
+            raise RuntimeError(f"Error al descargar {descripcion}: {e.stderr}") from e
+
+        os.replace(temporal, destino)
+
+
+def podar_fuentes(conservar: str = None, max_bytes: int = FUENTES_MAX_BYTES):
+    """
+    Elimina las fuentes (y secciones) usadas hace más tiempo hasta quedar
+    bajo el límite.
+
+    Cada fuente se elimina bajo los mismos locks que su descarga; se saltan
+    las que están en uso (usar_fuente, en este u otro proceso), las que se
+    están descargando y las usadas hace menos de FUENTES_USO_RECIENTE.
+
+    Args:
+        conservar: Ruta que no se debe eliminar (la que se acaba de usar)
+        max_bytes: Tamaño máximo total de la caché
+    """
+    if not os.path.isdir(FUENTES_DIR):
+        return
+
+    archivos = []
+    for entrada in os.scandir(FUENTES_DIR):
+        if entrada.is_file() and entrada.name.endswith(".mp4") and ".descarga." not in entrada.name:
+            stat = entrada.stat()
+            archivos.append((stat.st_mtime, stat.st_size, entrada.path))
+
+    total = sum(tamano for _, tamano, _ in archivos)
+    reciente = time.time() - FUENTES_USO_RECIENTE
+    with _poda_lock:
+        for mtime, tamano, path in sorted(archivos):
+            if total <= max_bytes:
+                break
+            if conservar and os.path.abspath(path) == os.path.abspath(conservar):
+                continue
+            if mtime > reciente or path in _en_uso:
+                continue
+            lock = _lock_de(path)
+            if not lock.acquire(blocking=False):
+                continue
+            try:
+                with _bloqueo_archivo(path, esperar=False) as libre:
+                    if not libre or path in _en_uso:
+                        continue
+                    os.remove(path)
+                    total -= tamano
+                    if fcntl is not None:
+                        os.remove(path + ".lock")
+            except OSError:
+                pass
+            finally:
+                lock.release()
+
+
+def recortar_clip(fuente: str, inicio: float, fin: float, output_path: str) -> str:
+    """
+    Recorta un segmento de un video local con búsqueda precisa.
+
+    Se re-codifica (en lugar de copiar el stream) para que el clip empiece
+    exactamente en `inicio` y no en el keyframe anterior.
+
+    Args:
+        fuente: Ruta del video completo
+        inicio: Segundo de inicio
+        fin: Segundo de fin
+        output_path: Ruta de salida
+
+    Returns:
+        Ruta del clip
+    """
+    cmd = [
+        "ffmpeg",
+        "-ss",
+        f"{inicio:.3f}",
+        "-i",
+        fuente,
+        "-t",
+        f"{max(fin - inicio, 0.1):.3f}",
+        "-map",
+        "0:v:0",
+        "-map",
+        "0:a:0?",
+        "-c:v",
+        "libx264",
+        "-preset",
+        "veryfast",
+        "-crf",
+        "18",
+        "-c:a",
+        "aac",
+        "-b:a",
+        "192k",
+        "-movflags",
+        "+faststart",
+        "-y",
+        output_path,
+    ]
+
+    try:
+        subprocess.run(cmd, check=True, capture_output=True, text=True)
+        return output_path
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Error al recortar clip: {e.stderr}") from e
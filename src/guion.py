@@ -4,6 +4,41 @@ import os
 import json
 import re
 from .config import obtener_modelo
+from .cache import generar_texto, clave_cache, leer_cache, guardar_cache
+from .limites import obtener_controlador
+
+
+# Dentro de strings JSON: saltos de línea y tabs pasan a espacio, el resto
+# de caracteres de control (incluido \r) se elimina
+_RE_CONTROL_BORRAR = re.compile(r"[\x00-\x08\x0b-\x1f]")
+_RE_ESCAPE = re.compile(r"(\\.)", re.DOTALL)
+_RE_ESCAPE_CONTROL = re.compile(r"\\[\x00-\x1f]")
+
+# Un escape fuera de string, un string (quizá sin cerrar) o una llave/corchete
+_RE_TOKEN_ESTRUCTURA = re.compile(
+    r'\\.|"[^"\\]*(?:\\.[^"\\]*)*("?)|[{}\[\]]', re.DOTALL
+)
+
+
+def _limpiar_controles(texto: str) -> str:
+    """Reemplaza o elimina los caracteres de control de un fragmento."""
+    texto = texto.replace("\n", " ").replace("\t", " ").replace("\r", "")
+    if not texto.isprintable():
+        # Quedan otros caracteres de control (poco habitual)
+        texto = _RE_CONTROL_BORRAR.sub("", texto)
+    return texto
+
+
+def _limpiar_string_json(contenido: str) -> str:
+    """Limpia los caracteres de control del contenido de un string JSON."""
+    if "\\" in contenido and _RE_ESCAPE_CONTROL.search(contenido):
+        # Un control justo tras una barra invertida se conserva sin tocar
+        partes = _RE_ESCAPE.split(contenido)
+        return "".join(
+            parte if i % 2 else _limpiar_controles(parte)
+            for i, parte in enumerate(partes)
+        )
+    return _limpiar_controles(contenido)
 
 
 def limpiar_json_gemini(texto: str) -> str:
@@ -17,57 +52,92 @@ def limpiar_json_gemini(texto: str) -> str:
         String JSON limpio
     """
     # Reemplazar caracteres de control dentro de strings JSON
-    # Esto maneja saltos de línea, tabs, etc. que Gemini a veces incluye
+    # Esto maneja saltos de línea, tabs, etc. que Gemini a veces incluye.
+    # Se corta por comillas (en C) y solo se recorre la lista de trozos:
+    # una comilla precedida por un número impar de barras está escapada.
+    piezas = texto.split('"')
     resultado = []
     dentro_string = False
-    escape = False
+    token = [piezas[0]]
 
-    for char in texto:
-        if escape:
-            resultado.append(char)
-            escape = False
+    for anterior, pieza in zip(piezas, piezas[1:]):
+        if anterior.endswith("\\") and (len(anterior) - len(anterior.rstrip("\\"))) % 2:
+            token.append(pieza)  # Comilla escapada: sigue el mismo token
             continue
 
-        if char == "\\":
-            escape = True
-            resultado.append(char)
-            continue
+        texto_token = '"'.join(token)
+        resultado.append(_limpiar_string_json(texto_token) if dentro_string else texto_token)
+        dentro_string = not dentro_string
+        token = [pieza]
 
-        if char == '"':
-            dentro_string = not dentro_string
-            resultado.append(char)
-            continue
+    texto_token = '"'.join(token)
+    resultado.append(_limpiar_string_json(texto_token) if dentro_string else texto_token)
+
+    return '"'.join(resultado)
 
-        if dentro_string:
-            # Dentro de un string, reemplazar caracteres de control
-            if char == "\n":
-                resultado.append(" ")  # Reemplazar salto de línea por espacio
-            elif char == "\r":
-                continue  # Ignorar retorno de carro
-            elif char == "\t":
-                resultado.append(" ")  # Reemplazar tab por espacio
-            elif ord(char) < 32:
-                continue  # Ignorar otros caracteres de control
-            else:
-                resultado.append(char)
-        else:
-            resultado.append(char)
 
-    return "".join(resultado)
+def reparar_json_truncado(texto: str) -> str:
+    """
+    Intenta cerrar un JSON cortado a mitad (por ejemplo por límite de tokens).
 
+    Cierra el último string si quedó abierto, descarta una coma o dos
+    puntos colgantes y cierra los objetos/arrays pendientes en orden.
 
-def generar_guion(client, tema: str, cantidad_palabras: int, estructura: dict) -> dict:
+    Args:
+        texto: String JSON (ya limpio) posiblemente truncado
+
+    Returns:
+        String JSON con los cierres agregados
     """
-    Genera un guión estructurado basado en el tema proporcionado.
+    pila = []
+    string_abierto = False
+
+    for match in _RE_TOKEN_ESTRUCTURA.finditer(texto):
+        token = match.group()
+        if token in "{[":
+            pila.append("}" if token == "{" else "]")
+        elif token in "}]":
+            if pila:
+                pila.pop()
+        elif token.startswith('"'):
+            # Sin comilla de cierre solo puede pasar al final del texto
+            string_abierto = match.group(1) == ""
+
+    reparado = texto
+    if string_abierto:
+        if reparado.endswith("\\"):
+            reparado = reparado[:-1]  # Un escape a medias no se puede completar
+        reparado += '"'
+
+    reparado = reparado.rstrip()
+    if reparado.endswith(","):
+        reparado = reparado[:-1]
+    elif reparado.endswith(":"):
+        reparado += " null"
+
+    return reparado + "".join(reversed(pila))
+
+
+def es_guion_completo(texto_respuesta: str) -> bool:
+    """True si la respuesta es JSON válido sin necesidad de repararla."""
+    try:
+        parsear_respuesta_guion(texto_respuesta, reparar=False)
+    except RuntimeError:
+        return False
+    return True
+
+
+def construir_prompt_guion(tema: str, cantidad_palabras: int, estructura: dict) -> str:
+    """
+    Construye el prompt de generación de guión a partir de la estructura.
 
     Args:
-        client: Cliente de Gemini configurado
         tema: El tema o texto base para el guión
         cantidad_palabras: Número aproximado de palabras para el guión
         estructura: Diccionario con la estructura del guión
 
     Returns:
-        El guión generado como diccionario JSON
+        Prompt listo para enviar a Gemini
     """
     # Construir la descripción de las secciones
     secciones_desc = []
@@ -82,7 +152,7 @@ def generar_guion(client, tema: str, cantidad_palabras: int, estructura: dict) -
 
     secciones_json = ",".join(secciones_desc)
 
-    prompt = f"""Eres un guionista experto en contenido viral para YouTube, especializado en misterios, historias intrigantes y narrativas cautivadoras.
+    return f"""Eres un guionista experto en contenido viral para YouTube, especializado en misterios, historias intrigantes y narrativas cautivadoras.
 
 TEMA/HISTORIA BASE: {tema}
 
@@ -109,34 +179,212 @@ El formato JSON que DEBES seguir estrictamente:
 
 Genera el guión completo ahora:"""
 
-    try:
-        respuesta = client.models.generate_content(
-            model=obtener_modelo("texto"), contents=prompt
-        )
-        texto_respuesta = respuesta.text.strip()
 
-        # Limpiar posibles marcadores de código
-        if texto_respuesta.startswith("```json"):
-            texto_respuesta = texto_respuesta[7:]
-        if texto_respuesta.startswith("```"):
-            texto_respuesta = texto_respuesta[3:]
-        if texto_respuesta.endswith("```"):
-            texto_respuesta = texto_respuesta[:-3]
+def parsear_respuesta_guion(texto_respuesta: str, reparar: bool = True) -> dict:
+    """
+    Limpia y parsea la respuesta completa de Gemini como JSON.
 
-        texto_respuesta = texto_respuesta.strip()
+    Args:
+        texto_respuesta: Texto devuelto por el modelo
+        reparar: Si es True, intenta cerrar un JSON truncado
+
+    Returns:
+        El guión como diccionario
+    """
+    texto_respuesta = texto_respuesta.strip()
 
-        # Limpiar caracteres de control problemáticos dentro de strings JSON
-        # Reemplazar saltos de línea literales dentro de valores por espacios
-        texto_respuesta = limpiar_json_gemini(texto_respuesta)
+    # Limpiar posibles marcadores de código
+    if texto_respuesta.startswith("```json"):
+        texto_respuesta = texto_respuesta[7:]
+    if texto_respuesta.startswith("```"):
+        texto_respuesta = texto_respuesta[3:]
+    if texto_respuesta.endswith("```"):
+        texto_respuesta = texto_respuesta[:-3]
 
-        # Parsear el JSON
-        guion = json.loads(texto_respuesta)
-        return guion
+    texto_respuesta = texto_respuesta.strip()
+
+    # Limpiar caracteres de control problemáticos dentro de strings JSON
+    # Reemplazar saltos de línea literales dentro de valores por espacios
+    texto_respuesta = limpiar_json_gemini(texto_respuesta)
 
+    try:
+        return json.loads(texto_respuesta)
     except json.JSONDecodeError as e:
+        # Respuestas cortadas a mitad: intentar cerrar strings y llaves
+        if reparar:
+            try:
+                guion = json.loads(reparar_json_truncado(texto_respuesta))
+                print("   ⚠️  La respuesta venía truncada, se reparó el JSON")
+                return guion
+            except json.JSONDecodeError:
+                pass
         raise RuntimeError(
             f"Error al parsear la respuesta de Gemini como JSON: {e}\nRespuesta: {texto_respuesta[:500]}..."
         ) from e
+
+
+class ParserSeccionesIncremental:
+    """
+    Parser JSON incremental para respuestas de guión en streaming.
+
+    Recibe el texto por trozos y devuelve cada objeto de
+    "estructura_guion" en cuanto se cierra su llave, sin esperar
+    al resto de la respuesta.
+    """
+
+    _ESPECIALES = re.compile(r'[\\"{}\[\]]')
+    _CLAVE_SECCIONES = re.compile(r'"estructura_guion"\s*:\s*$')
+
+    def __init__(self):
+        self.texto = ""
+        self._pos = 0  # Posición hasta la que ya se analizó
+        self._dentro_string = False
+        self._escapado_en = -1  # Posición del carácter escapado pendiente
+        self._profundidad = 0
+        self._profundidad_lista = None  # Profundidad del array de secciones
+        self._inicio_seccion = None
+        self.secciones = []
+
+    def alimentar(self, trozo: str) -> list:
+        """
+        Agrega un trozo de texto y devuelve las secciones completadas.
+
+        Args:
+            trozo: Nuevo texto recibido del stream
+
+        Returns:
+            Lista de secciones (dict) que se cerraron en este trozo
+        """
+        self.texto += trozo
+        nuevas = []
+
+        for match in self._ESPECIALES.finditer(self.texto, self._pos):
+            pos = match.start()
+            char = match.group()
+
+            if pos == self._escapado_en:
+                continue
+            if char == "\\":
+                self._escapado_en = pos + 1
+                continue
+            if char == '"':
+                self._dentro_string = not self._dentro_string
+                continue
+            if self._dentro_string:
+                continue
+
+            if char in "{[":
+                if (
+                    char == "["
+                    and self._profundidad_lista is None
+                    and self._CLAVE_SECCIONES.search(self.texto, 0, pos)
+                ):
+                    self._profundidad_lista = self._profundidad + 1
+                elif (
+                    char == "{"
+                    and self._profundidad_lista is not None
+                    and self._profundidad == self._profundidad_lista
+                ):
+                    self._inicio_seccion = pos
+                self._profundidad += 1
+            else:
+                self._profundidad -= 1
+                if (
+                    char == "}"
+                    and self._inicio_seccion is not None
+                    and self._profundidad == self._profundidad_lista
+                ):
+                    seccion = self._parsear_seccion(self.texto[self._inicio_seccion:pos + 1])
+                    self._inicio_seccion = None
+                    if seccion is not None:
+                        self.secciones.append(seccion)
+                        nuevas.append(seccion)
+                elif char == "]" and self._profundidad_lista is not None and (
+                    self._profundidad < self._profundidad_lista
+                ):
+                    self._profundidad_lista = -1  # Lista cerrada, no buscar más
+
+        self._pos = len(self.texto)
+        return nuevas
+
+    @staticmethod
+    def _parsear_seccion(texto_objeto: str):
+        """Parsea un objeto de sección; devuelve None si no es válido."""
+        try:
+            seccion = json.loads(limpiar_json_gemini(texto_objeto))
+        except json.JSONDecodeError:
+            return None
+        if isinstance(seccion, dict) and "audio_narracion" in seccion:
+            return seccion
+        return None
+
+
+def generar_guion(
+    client,
+    tema: str,
+    cantidad_palabras: int,
+    estructura: dict,
+    al_recibir_seccion=None,
+    usar_cache: bool = True,
+) -> dict:
+    """
+    Genera un guión estructurado basado en el tema proporcionado.
+
+    Args:
+        client: Cliente de Gemini configurado
+        tema: El tema o texto base para el guión
+        cantidad_palabras: Número aproximado de palabras para el guión
+        estructura: Diccionario con la estructura del guión
+        al_recibir_seccion: Función opcional (indice, seccion). Si se indica,
+            la respuesta se pide en streaming y cada sección de
+            "estructura_guion" se entrega en cuanto termina de escribirse
+        usar_cache: False para ignorar la caché de respuestas
+
+    Returns:
+        El guión generado como diccionario JSON
+    """
+    prompt = construir_prompt_guion(tema, cantidad_palabras, estructura)
+    modelo = obtener_modelo("texto")
+
+    try:
+        if al_recibir_seccion is None:
+            texto = generar_texto(
+                client,
+                prompt,
+                modelo=modelo,
+                usar_cache=usar_cache,
+                validar=parsear_respuesta_guion,
+                cachear=es_guion_completo,
+            )
+            return parsear_respuesta_guion(texto)
+
+        parser = ParserSeccionesIncremental()
+        clave = clave_cache(modelo, prompt)
+        texto = leer_cache(clave) if usar_cache else None
+
+        if texto is not None:
+            # Respuesta ya conocida: entregar las secciones de inmediato
+            trozos = [texto]
+        else:
+            trozos = (
+                chunk.text or ""
+                for chunk in obtener_controlador("texto").stream(
+                    client.models.generate_content_stream, model=modelo, contents=prompt
+                )
+            )
+
+        for trozo in trozos:
+            for seccion in parser.alimentar(trozo):
+                al_recibir_seccion(len(parser.secciones), seccion)
+
+        guion = parsear_respuesta_guion(parser.texto)
+        # Un guión truncado (reparado) no se guarda: se volverá a pedir
+        if usar_cache and texto is None and es_guion_completo(parser.texto):
+            guardar_cache(clave, modelo, parser.texto)
+        return guion
+
+    except RuntimeError:
+        raise
     except Exception as e:
         raise RuntimeError(f"Error al generar el guión: {e}") from e
 
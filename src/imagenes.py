@@ -1,9 +1,14 @@
 """Generación de imágenes con Imagen 4.0"""
 
 import os
+import json
 import math
-from google.genai import types
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from .config import obtener_modelo
+from .limites import llamar_modelo
+from .cache import generar_texto
 
 
 def dividir_texto_en_segmentos(
@@ -39,7 +44,7 @@ def dividir_texto_en_segmentos(
 
 
 def generar_prompt_visual(
-    client, segmento_texto: str, tema: str, num_segmento: int
+    client, segmento_texto: str, tema: str, num_segmento: int, usar_cache: bool = True
 ) -> str:
     """
     Genera un prompt visual basado en el contenido del segmento de texto.
@@ -49,6 +54,7 @@ def generar_prompt_visual(
         segmento_texto: Texto del segmento de narración
         tema: Tema general de la historia
         num_segmento: Número del segmento
+        usar_cache: False para ignorar la caché de respuestas
 
     Returns:
         Prompt optimizado para generación de imagen
@@ -71,14 +77,185 @@ El prompt debe ser:
 Responde SOLO con el prompt, sin explicaciones adicionales."""
 
     try:
-        respuesta = client.models.generate_content(
-            model=obtener_modelo("texto"), contents=prompt_generador
-        )
-        return respuesta.text.strip()
-    except Exception:
+        respuesta = generar_texto(client, prompt_generador, usar_cache=usar_cache)
+        return respuesta.strip()
+    except Exception as e:
+        # Los errores transitorios ya se reintentaron en generar_texto
+        print(f"   ⚠️  No se pudo generar el prompt visual {num_segmento} ({e}), usando uno genérico")
         return f"Cinematic scene, dramatic lighting, {tema}, mysterious atmosphere, 4K quality, film still"
 
 
+# Imágenes generándose a la vez
+MAX_IMAGENES_CONCURRENTES = 4
+
+# Límites de cada petición en el modo por lotes
+SEGMENTOS_POR_LOTE = 25
+CARACTERES_POR_LOTE = 30000
+
+
+def dividir_en_lotes(segmentos: list) -> list:
+    """
+    Agrupa los índices de los segmentos en lotes para pedir sus prompts
+    en una sola llamada, respetando un máximo de segmentos y de caracteres.
+
+    Args:
+        segmentos: Lista de segmentos de texto
+
+    Returns:
+        Lista de listas de índices (base 0)
+    """
+    lotes = []
+    actual = []
+    caracteres = 0
+    for i, segmento in enumerate(segmentos):
+        if actual and (
+            len(actual) >= SEGMENTOS_POR_LOTE
+            or caracteres + len(segmento) > CARACTERES_POR_LOTE
+        ):
+            lotes.append(actual)
+            actual = []
+            caracteres = 0
+        actual.append(i)
+        caracteres += len(segmento)
+    if actual:
+        lotes.append(actual)
+    return lotes
+
+
+def _parsear_lote_prompts(texto: str) -> dict:
+    """
+    Parsea la respuesta de un lote de prompts.
+
+    Returns:
+        Diccionario {numero_segmento: prompt} con las entradas válidas
+    """
+    texto = texto.strip()
+    if texto.startswith("```json"):
+        texto = texto[7:]
+    if texto.startswith("```"):
+        texto = texto[3:]
+    if texto.endswith("```"):
+        texto = texto[:-3]
+
+    datos = json.loads(texto.strip())
+    if isinstance(datos, dict):
+        datos = datos.get("prompts", [])
+    if not isinstance(datos, list):
+        raise ValueError("Se esperaba un array JSON de prompts")
+
+    prompts = {}
+    for entrada in datos:
+        if not isinstance(entrada, dict):
+            continue
+        numero = entrada.get("segmento")
+        prompt = entrada.get("prompt")
+        if isinstance(numero, int) and isinstance(prompt, str) and prompt.strip():
+            prompts[numero] = prompt.strip()
+    return prompts
+
+
+def generar_prompts_lote(
+    client,
+    segmentos: list,
+    indices: list,
+    tema: str,
+    segundos_por_segmento: int = 30,
+    usar_cache: bool = True,
+) -> dict:
+    """
+    Pide en una sola llamada los prompts visuales de varios segmentos.
+
+    Args:
+        client: Cliente de Gemini configurado
+        segmentos: Lista completa de segmentos de texto
+        indices: Índices (base 0) de los segmentos de este lote
+        tema: Tema general de la historia
+        segundos_por_segmento: Duración de cada segmento
+        usar_cache: False para ignorar la caché de respuestas
+
+    Returns:
+        Diccionario {indice: prompt} con los prompts válidos recibidos
+    """
+    bloques = []
+    for i in indices:
+        inicio = i * segundos_por_segmento
+        bloques.append(
+            f'SEGMENTO {i + 1} (segundos {inicio}-{inicio + segundos_por_segmento}):\n"{segmentos[i]}"'
+        )
+
+    prompt_generador = f"""Eres un experto en crear prompts para generación de imágenes.
+
+Tema de la historia: {tema}
+
+A continuación tienes {len(indices)} momentos consecutivos de la narración:
+
+{chr(10).join(bloques)}
+
+Para CADA segmento, genera UN prompt corto (máximo 100 palabras) para crear una imagen que represente visualmente ese momento de la narración.
+Cada prompt debe ser:
+- En inglés (para mejor calidad de imagen)
+- Descriptivo y visual
+- Estilo cinematográfico, dramático
+- Sin texto ni palabras en la imagen
+- Formato 16:9 horizontal
+
+Responde ÚNICAMENTE con un array JSON válido, sin texto adicional, con un objeto por segmento:
+[
+  {{"segmento": {indices[0] + 1}, "prompt": "..."}}
+]"""
+
+    try:
+        texto = generar_texto(
+            client, prompt_generador, usar_cache=usar_cache, validar=_parsear_lote_prompts
+        )
+        por_numero = _parsear_lote_prompts(texto)
+    except Exception as e:
+        print(f"      ⚠️ Error en el lote de prompts: {e}")
+        return {}
+
+    return {i: por_numero[i + 1] for i in indices if i + 1 in por_numero}
+
+
+def iterar_prompts_visuales(
+    client,
+    segmentos: list,
+    tema: str,
+    segundos_por_segmento: int = 30,
+    usar_cache: bool = True,
+):
+    """
+    Genera los prompts visuales por lotes y los entrega a medida que llegan.
+    Los segmentos que falten o vengan inválidos en un lote se piden de
+    forma individual con generar_prompt_visual.
+
+    Args:
+        client: Cliente de Gemini configurado
+        segmentos: Lista de segmentos de texto
+        tema: Tema general de la historia
+        segundos_por_segmento: Duración de cada segmento
+        usar_cache: False para ignorar la caché de respuestas
+
+    Yields:
+        Tuplas (indice, prompt) con índice base 0
+    """
+    lotes = dividir_en_lotes(segmentos)
+    print(f"   🧾 Pidiendo {len(segmentos)} prompts en {len(lotes)} llamada(s)...")
+
+    for indices in lotes:
+        prompts = generar_prompts_lote(
+            client, segmentos, indices, tema, segundos_por_segmento, usar_cache
+        )
+        faltantes = [i for i in indices if i not in prompts]
+        if faltantes:
+            print(f"      ↪️  {len(faltantes)} prompt(s) sin respuesta válida, pidiéndolos uno a uno")
+
+        for i in indices:
+            if i in prompts:
+                yield i, prompts[i]
+            else:
+                yield i, generar_prompt_visual(client, segmentos[i], tema, i + 1, usar_cache)
+
+
 def generar_imagen(client, prompt: str, filepath: str) -> str:
     """
     Genera una imagen usando Imagen 4.0 de Google.
@@ -91,8 +268,12 @@ def generar_imagen(client, prompt: str, filepath: str) -> str:
     Returns:
         Ruta del archivo de imagen generado
     """
+    from google.genai import types
+
     try:
-        response = client.models.generate_images(
+        response = llamar_modelo(
+            "imagen",
+            client.models.generate_images,
             model=obtener_modelo("imagen"),
             prompt=prompt,
             config=types.GenerateImagesConfig(
@@ -104,8 +285,10 @@ def generar_imagen(client, prompt: str, filepath: str) -> str:
 
         if response.generated_images:
             image_data = response.generated_images[0].image.image_bytes
-            with open(filepath, "wb") as f:
+            temporal = f"{filepath}.part"
+            with open(temporal, "wb") as f:
                 f.write(image_data)
+            os.replace(temporal, filepath)
             return filepath
         else:
             raise RuntimeError("No se generó ninguna imagen")
@@ -114,6 +297,39 @@ def generar_imagen(client, prompt: str, filepath: str) -> str:
         raise RuntimeError(f"Error al generar imagen: {e}") from e
 
 
+def hash_prompt(prompt: str) -> str:
+    """Huella del prompt y el modelo de imagen, para saber si hay que regenerar."""
+    contenido = f"{obtener_modelo('imagen')}\n{prompt}"
+    return hashlib.sha256(contenido.encode("utf-8")).hexdigest()[:16]
+
+
+def cargar_manifest_imagenes(rutas: dict) -> dict:
+    """
+    Carga el manifest de imágenes del proyecto.
+
+    Args:
+        rutas: Diccionario con las rutas del proyecto
+
+    Returns:
+        Diccionario {numero_segmento (str): entrada}
+    """
+    manifest_path = os.path.join(rutas["imagenes"], "manifest.json")
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("segmentos", {})
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def guardar_manifest_imagenes(rutas: dict, segmentos: dict):
+    """Guarda el manifest de imágenes de forma atómica."""
+    manifest_path = os.path.join(rutas["imagenes"], "manifest.json")
+    temporal = f"{manifest_path}.part"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump({"segmentos": segmentos}, f, ensure_ascii=False, indent=2)
+    os.replace(temporal, manifest_path)
+
+
 def generar_imagenes(
     client,
     guion: dict,
@@ -121,10 +337,16 @@ def generar_imagenes(
     tema: str,
     duracion_audio: float,
     segundos_por_imagen: int = 30,
+    max_concurrencia: int = MAX_IMAGENES_CONCURRENTES,
 ) -> list:
     """
     Genera imágenes cada X segundos, con contenido relacionado a ese momento.
 
+    Los prompts se piden por lotes y cada imagen se lanza en cuanto su
+    prompt está listo, con hasta max_concurrencia imágenes en paralelo.
+    Un manifest por segmento permite reanudar: si imagen_XX.png ya existe
+    y se generó con el mismo prompt, no se vuelve a generar.
+
     Args:
         client: Cliente de Gemini configurado
         guion: Diccionario con el guión generado
@@ -132,9 +354,10 @@ def generar_imagenes(
         tema: Tema del guión
         duracion_audio: Duración del audio en segundos
         segundos_por_imagen: Cada cuántos segundos generar una imagen
+        max_concurrencia: Máximo de imágenes generándose a la vez
 
     Returns:
-        Lista de rutas de imágenes generadas
+        Lista de rutas de imágenes generadas (None en las que fallaron)
     """
     from .guion import extraer_texto_narracion
 
@@ -147,32 +370,61 @@ def generar_imagenes(
     print(f"   Duración del audio: {duracion_audio:.1f}s")
     print(f"   Imágenes a generar: {num_imagenes} (una cada {segundos_por_imagen}s)")
 
-    imagenes = []
+    imagenes = [None] * num_imagenes
+    manifest = cargar_manifest_imagenes(rutas)
+    lock_manifest = threading.Lock()
+    reutilizadas = 0
 
-    for i, segmento in enumerate(segmentos, 1):
+    def generar_segmento(i: int, prompt: str, filepath: str):
+        """Genera una imagen y registra el resultado en el manifest."""
         tiempo_inicio = (i - 1) * segundos_por_imagen
         tiempo_fin = min(i * segundos_por_imagen, duracion_audio)
-
-        print(
-            f"\n   📸 Imagen {i}/{num_imagenes} [{tiempo_inicio}s - {tiempo_fin:.0f}s]"
-        )
-        texto_preview = segmento[:80] + "..." if len(segmento) > 80 else segmento
-        print(f'      Texto: "{texto_preview}"')
-
-        print("      Generando prompt visual...")
-        prompt = generar_prompt_visual(client, segmento, tema, i)
-        prompt_preview = prompt[:100] + "..." if len(prompt) > 100 else prompt
-        print(f'      Prompt: "{prompt_preview}"')
-
-        filepath = os.path.join(rutas["imagenes"], f"imagen_{i:02d}.png")
-
+        entrada = {
+            "archivo": os.path.basename(filepath),
+            "prompt": prompt,
+            "hash_prompt": hash_prompt(prompt),
+        }
         try:
-            print("      Generando imagen...")
             generar_imagen(client, prompt, filepath)
-            imagenes.append(filepath)
-            print("      ✅ Imagen generada")
+            entrada["estado"] = "ok"
+            print(f"   ✅ Imagen {i}/{num_imagenes} [{tiempo_inicio}s - {tiempo_fin:.0f}s]")
+            return filepath
         except RuntimeError as e:
-            print(f"      ⚠️ Error: {e}")
-            imagenes.append(None)
+            entrada["estado"] = "error"
+            print(f"   ⚠️ Imagen {i}/{num_imagenes}: {e}")
+            return None
+        finally:
+            with lock_manifest:
+                manifest[str(i)] = entrada
+                guardar_manifest_imagenes(rutas, manifest)
+
+    # Las imágenes arrancan en cuanto llega el prompt de su segmento
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrencia)) as executor:
+        futuros = {}
+        for indice, prompt in iterar_prompts_visuales(
+            client, segmentos, tema, segundos_por_imagen
+        ):
+            i = indice + 1
+            filepath = os.path.join(rutas["imagenes"], f"imagen_{i:02d}.png")
+
+            entrada = manifest.get(str(i), {})
+            if (
+                entrada.get("estado") == "ok"
+                and entrada.get("hash_prompt") == hash_prompt(prompt)
+                and os.path.exists(filepath)
+            ):
+                imagenes[indice] = filepath
+                reutilizadas += 1
+                continue
+
+            prompt_preview = prompt[:100] + "..." if len(prompt) > 100 else prompt
+            print(f'   📸 Imagen {i}/{num_imagenes} en cola: "{prompt_preview}"')
+            futuros[executor.submit(generar_segmento, i, prompt, filepath)] = indice
+
+        for futuro in as_completed(futuros):
+            imagenes[futuros[futuro]] = futuro.result()
+
+    if reutilizadas:
+        print(f"   ♻️  {reutilizadas} imagen(es) reutilizadas de una ejecución anterior")
 
     return imagenes
@@ -0,0 +1,186 @@
+"""
+Control de ritmo y reintentos de las llamadas a los modelos de Gemini
+"""
+
+import time
+import random
+import threading
+from .clientes import cargar_claves, codigo_error
+
+# Cuota por API key y tipo de modelo (claves de MODELOS): peticiones por
+# minuto y máximo de llamadas simultáneas
+LIMITES_POR_TIPO = {
+    "texto": {"rpm": 60, "concurrencia": 8},
+    "tts": {"rpm": 10, "concurrencia": 4},
+    "imagen": {"rpm": 10, "concurrencia": 2},
+}
+
+# Errores transitorios que se reintentan
+CODIGOS_REINTENTABLES = {429, 500, 502, 503, 504}
+# Errores que indican saturación y reducen la concurrencia
+CODIGOS_SATURACION = {429, 503}
+
+MAX_REINTENTOS = 5
+ESPERA_BASE = 2  # segundos, se duplica en cada reintento
+ESPERA_MAX = 60
+
+_lock = threading.Lock()
+_controladores = {}
+
+
+class ControladorLlamadas:
+    """
+    Ritmo y concurrencia de las llamadas a un tipo de modelo.
+
+    Un token bucket limita las peticiones por segundo a la cuota; la
+    concurrencia se ajusta con AIMD: crece de a poco con cada éxito y se
+    reduce a la mitad con cada 429/503. Los errores transitorios se
+    reintentan con espera exponencial y jitter.
+    """
+
+    def __init__(self, tipo: str, rpm: int, concurrencia: int):
+        self.tipo = tipo
+        self.tasa = rpm / 60
+        self.capacidad = max(1.0, min(float(concurrencia), rpm / 60 * 10))
+        self.tokens = self.capacidad
+        self.concurrencia_max = concurrencia
+        self.limite = float(concurrencia)
+        self.en_curso = 0
+        self._ultima_recarga = time.monotonic()
+        self._ultima_reduccion = 0.0
+        self._condicion = threading.Condition()
+
+    def _recargar(self, ahora: float):
+        self.tokens = min(
+            self.capacidad, self.tokens + (ahora - self._ultima_recarga) * self.tasa
+        )
+        self._ultima_recarga = ahora
+
+    def adquirir(self) -> float:
+        """
+        Espera un lugar libre y un token del bucket.
+
+        Returns:
+            Instante de inicio de la llamada (para liberar)
+        """
+        with self._condicion:
+            while True:
+                if self.en_curso >= int(self.limite):
+                    self._condicion.wait()
+                    continue
+                ahora = time.monotonic()
+                self._recargar(ahora)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    self.en_curso += 1
+                    return ahora
+                self._condicion.wait((1 - self.tokens) / self.tasa)
+
+    def liberar(self, inicio: float, error: Exception = None):
+        """Devuelve el lugar y ajusta la concurrencia según el resultado."""
+        with self._condicion:
+            self.en_curso -= 1
+            codigo = codigo_error(error) if error is not None else None
+            if codigo in CODIGOS_SATURACION:
+                # Los errores de llamadas lanzadas antes de la última
+                # reducción ya se tuvieron en cuenta
+                if inicio >= self._ultima_reduccion:
+                    self.limite = max(1.0, self.limite / 2)
+                    self._ultima_reduccion = time.monotonic()
+                # Vaciar el bucket: la cuota ya está agotada
+                self.tokens = min(self.tokens, 0.0)
+            elif error is None:
+                self.limite = min(self.concurrencia_max, self.limite + 1 / self.limite)
+            self._condicion.notify_all()
+
+    def _esperar_reintento(self, intento: int, error: Exception):
+        espera = random.uniform(0, min(ESPERA_MAX, ESPERA_BASE * 2**intento))
+        print(
+            f"   ⏳ {self.tipo}: error {codigo_error(error)}, "
+            f"reintento {intento + 1}/{MAX_REINTENTOS} en {espera:.1f}s"
+        )
+        time.sleep(espera)
+
+    def ejecutar(self, funcion, *args, **kwargs):
+        """
+        Ejecuta una llamada al modelo respetando el ritmo y reintentando
+        los errores transitorios.
+
+        Returns:
+            Resultado de la función
+        """
+        for intento in range(MAX_REINTENTOS + 1):
+            inicio = self.adquirir()
+            try:
+                resultado = funcion(*args, **kwargs)
+            except Exception as e:
+                self.liberar(inicio, e)
+                if codigo_error(e) not in CODIGOS_REINTENTABLES or intento == MAX_REINTENTOS:
+                    raise
+                self._esperar_reintento(intento, e)
+                continue
+            self.liberar(inicio)
+            return resultado
+
+    def stream(self, funcion, *args, **kwargs):
+        """
+        Igual que ejecutar, para llamadas que devuelven un iterador.
+
+        Solo se reintenta si el error llega antes del primer trozo; el
+        lugar queda ocupado hasta terminar de consumir el iterador.
+        """
+        for intento in range(MAX_REINTENTOS + 1):
+            inicio = self.adquirir()
+            try:
+                iterador = iter(funcion(*args, **kwargs))
+                primero = next(iterador, None)
+            except Exception as e:
+                self.liberar(inicio, e)
+                if codigo_error(e) not in CODIGOS_REINTENTABLES or intento == MAX_REINTENTOS:
+                    raise
+                self._esperar_reintento(intento, e)
+                continue
+            break
+
+        error = None
+        try:
+            if primero is not None:
+                yield primero
+            yield from iterador
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self.liberar(inicio, error)
+
+
+def obtener_controlador(tipo: str) -> ControladorLlamadas:
+    """
+    Devuelve el controlador compartido de un tipo de modelo.
+
+    La cuota de LIMITES_POR_TIPO es por API key, así que se multiplica por
+    el número de keys configuradas.
+
+    Args:
+        tipo: Tipo de modelo ('texto', 'tts', 'imagen')
+
+    Returns:
+        ControladorLlamadas del proceso para ese tipo
+    """
+    with _lock:
+        if tipo not in _controladores:
+            limites = LIMITES_POR_TIPO.get(tipo, LIMITES_POR_TIPO["texto"])
+            claves = len(cargar_claves()) or 1
+            _controladores[tipo] = ControladorLlamadas(
+                tipo, limites["rpm"] * claves, limites["concurrencia"] * claves
+            )
+        return _controladores[tipo]
+
+
+def llamar_modelo(tipo: str, funcion, *args, **kwargs):
+    """
+    Ejecuta `funcion(*args, **kwargs)` con el controlador del tipo de modelo.
+
+    Ejemplo: llamar_modelo("tts", client.models.generate_content, model=..., ...)
+    """
+    return obtener_controlador(tipo).ejecutar(funcion, *args, **kwargs)
@@ -0,0 +1,289 @@
+"""
+Índice de la biblioteca de videos base con metadatos de ffprobe
+"""
+
+import os
+import json
+import fnmatch
+import sqlite3
+import threading
+import subprocess
+from .config import BASE_DIR
+
+INDICE_DB = os.path.join(BASE_DIR, "cache", "medios.sqlite")
+
+# Extensiones que se consideran videos al escanear la carpeta
+EXTENSIONES_VIDEO = (".mp4", ".mov", ".mkv", ".webm")
+
+# Última sincronización de este proceso: carpeta -> (categorías, mtime de la carpeta)
+_sincronizado = {}
+_sincronizado_lock = threading.Lock()
+
+
+def _conectar() -> sqlite3.Connection:
+    """Abre el índice, creando las tablas si no existen."""
+    os.makedirs(os.path.dirname(INDICE_DB), exist_ok=True)
+    conn = sqlite3.connect(INDICE_DB, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    columnas = {fila[1] for fila in conn.execute("PRAGMA table_info(videos)")}
+    if columnas and "pix_fmt" not in columnas:
+        # Índice de una versión anterior, sin los datos para copiar sin
+        # recodificar: se vuelve a analizar todo
+        conn.execute("DROP TABLE videos")
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS videos (
+            archivo TEXT PRIMARY KEY,
+            tamano INTEGER,
+            mtime REAL,
+            duracion REAL,
+            ancho INTEGER,
+            alto INTEGER,
+            codec TEXT,
+            fps REAL,
+            pix_fmt TEXT,
+            perfil TEXT,
+            nivel INTEGER,
+            inicio REAL
+        );
+        CREATE TABLE IF NOT EXISTS categorias (
+            categoria TEXT,
+            archivo TEXT,
+            PRIMARY KEY (categoria, archivo)
+        );
+        CREATE INDEX IF NOT EXISTS idx_categorias_archivo ON categorias (archivo);
+        CREATE TABLE IF NOT EXISTS estado (clave TEXT PRIMARY KEY, valor TEXT);
+        """
+    )
+    return conn
+
+
+def probar_video(path: str) -> dict:
+    """
+    Lee los metadatos de un video con ffprobe.
+
+    Args:
+        path: Ruta del video
+
+    Returns:
+        Diccionario con duracion, ancho, alto, codec, fps, pix_fmt, perfil,
+        nivel e inicio (instante del primer frame; distinto de 0 con edit
+        lists), con None en lo que no se pudo leer
+    """
+    cmd = [
+        "ffprobe",
+        "-v", "error",
+        "-select_streams", "v:0",
+        "-show_entries", "stream=codec_name,width,height,r_frame_rate,pix_fmt,profile,level,start_time"
+        ":format=duration",
+        "-of", "json",
+        path,
+    ]
+    vacio = {
+        "duracion": None,
+        "ancho": None,
+        "alto": None,
+        "codec": None,
+        "fps": None,
+        "pix_fmt": None,
+        "perfil": None,
+        "nivel": None,
+        "inicio": None,
+    }
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        datos = json.loads(result.stdout)
+    except (subprocess.CalledProcessError, FileNotFoundError, json.JSONDecodeError):
+        return vacio
+
+    stream = (datos.get("streams") or [{}])[0]
+    fps = None
+    if stream.get("r_frame_rate"):
+        num, _, den = stream["r_frame_rate"].partition("/")
+        try:
+            fps = float(num) / float(den or 1)
+        except (ValueError, ZeroDivisionError):
+            fps = None
+
+    duracion = datos.get("format", {}).get("duration")
+    inicio = stream.get("start_time")
+    try:
+        inicio = float(inicio) if inicio is not None else None
+    except ValueError:
+        inicio = None
+    return {
+        "duracion": float(duracion) if duracion else None,
+        "ancho": stream.get("width"),
+        "alto": stream.get("height"),
+        "codec": stream.get("codec_name"),
+        "fps": fps,
+        "pix_fmt": stream.get("pix_fmt"),
+        "perfil": stream.get("profile"),
+        "nivel": stream.get("level"),
+        "inicio": inicio,
+    }
+
+
+def _huella_categorias(config: dict) -> str:
+    """Resume la definición de categorías, para saber si hay que recalcularlas."""
+    return json.dumps(config.get("categorias", {}), sort_keys=True)
+
+
+def actualizar_indice_medios(
+    config: dict, forzar: bool = False, refrescar: bool = False
+) -> int:
+    """
+    Sincroniza el índice con la carpeta de videos base.
+
+    La primera vez en cada proceso se hace stat de cada archivo (barato) y
+    solo se vuelve a ejecutar ffprobe sobre los nuevos o cuyo tamaño/mtime
+    cambió; así también se detecta un clip sobrescrito con el mismo nombre.
+    Después, mientras no cambien el mtime de la carpeta (altas, bajas,
+    renombres) ni las categorías, las llamadas no recorren la carpeta;
+    refrescar=True fuerza la revisión archivo por archivo.
+
+    Args:
+        config: Configuración de videos (cargar_config_videos)
+        forzar: Volver a analizar todos los archivos con ffprobe
+        refrescar: Revisar cada archivo aunque la carpeta no haya cambiado
+
+    Returns:
+        Número de archivos analizados con ffprobe
+    """
+    carpeta = os.path.join(BASE_DIR, config["carpeta_videos"])
+    huella = _huella_categorias(config)
+    try:
+        mtime_carpeta = os.stat(carpeta).st_mtime
+    except FileNotFoundError:
+        mtime_carpeta = None
+
+    with _sincronizado_lock:
+        if (
+            not forzar
+            and not refrescar
+            and _sincronizado.get(carpeta) == (huella, mtime_carpeta)
+        ):
+            return 0
+        # Bajo el lock: otro hilo espera en lugar de repetir el recorrido
+        analizados = _sincronizar_indice(config, carpeta, huella, forzar)
+        _sincronizado[carpeta] = (huella, mtime_carpeta)
+        return analizados
+
+
+def _sincronizar_indice(config: dict, carpeta: str, huella: str, forzar: bool) -> int:
+    """Recorre la carpeta y actualiza el índice (ver actualizar_indice_medios)."""
+    conn = _conectar()
+    try:
+        fila = conn.execute("SELECT valor FROM estado WHERE clave = 'huella'").fetchone()
+
+        conocidos = {
+            archivo: (tamano, mtime)
+            for archivo, tamano, mtime in conn.execute(
+                "SELECT archivo, tamano, mtime FROM videos"
+            )
+        }
+
+        presentes = {}
+        if os.path.isdir(carpeta):
+            for entrada in os.scandir(carpeta):
+                if entrada.is_file() and entrada.name.lower().endswith(EXTENSIONES_VIDEO):
+                    stat = entrada.stat()
+                    presentes[entrada.name] = (stat.st_size, stat.st_mtime)
+
+        analizados = 0
+        for archivo, (tamano, mtime) in presentes.items():
+            if not forzar and conocidos.get(archivo) == (tamano, mtime):
+                continue
+            meta = probar_video(os.path.join(carpeta, archivo))
+            conn.execute(
+                "INSERT OR REPLACE INTO videos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    archivo,
+                    tamano,
+                    mtime,
+                    meta["duracion"],
+                    meta["ancho"],
+                    meta["alto"],
+                    meta["codec"],
+                    meta["fps"],
+                    meta["pix_fmt"],
+                    meta["perfil"],
+                    meta["nivel"],
+                    meta["inicio"],
+                ),
+            )
+            analizados += 1
+
+        borrados = [(a,) for a in conocidos if a not in presentes]
+        conn.executemany("DELETE FROM videos WHERE archivo = ?", borrados)
+
+        nuevos = any(archivo not in conocidos for archivo in presentes)
+        if nuevos or borrados or not fila or fila[0] != huella:
+            # Pertenencia a categorías: por patrón y por lista explícita
+            conn.execute("DELETE FROM categorias")
+            for nombre, info in config.get("categorias", {}).items():
+                patron = info.get("patron")
+                explicitos = set(info.get("archivos", []))
+                miembros = [
+                    (nombre, archivo)
+                    for archivo in presentes
+                    if archivo in explicitos or (patron and fnmatch.fnmatch(archivo, patron))
+                ]
+                conn.executemany("INSERT OR IGNORE INTO categorias VALUES (?, ?)", miembros)
+            conn.execute("INSERT OR REPLACE INTO estado VALUES ('huella', ?)", (huella,))
+        conn.commit()
+
+        if analizados or borrados:
+            print(f"   🗂️  Índice de videos actualizado ({analizados} analizados, {len(borrados)} eliminados)")
+        return analizados
+    finally:
+        conn.close()
+
+
+def buscar_videos(categoria: str = None) -> list:
+    """
+    Devuelve los videos del índice, opcionalmente filtrados por categoría.
+
+    Args:
+        categoria: Nombre de la categoría, o None para todos
+
+    Returns:
+        Lista de diccionarios con archivo y metadatos, ordenada por nombre
+    """
+    conn = _conectar()
+    conn.row_factory = sqlite3.Row
+    try:
+        if categoria is None:
+            filas = conn.execute("SELECT * FROM videos ORDER BY archivo")
+        else:
+            filas = conn.execute(
+                """SELECT v.* FROM videos v
+                   JOIN categorias c ON c.archivo = v.archivo
+                   WHERE c.categoria = ? ORDER BY v.archivo""",
+                (categoria,),
+            )
+        return [dict(fila) for fila in filas]
+    finally:
+        conn.close()
+
+
+def resumen_categorias() -> dict:
+    """
+    Cuenta los videos y la duración total de cada categoría.
+
+    Returns:
+        Diccionario {categoria: {"total": n, "duracion_total": segundos}}
+    """
+    conn = _conectar()
+    try:
+        filas = conn.execute(
+            """SELECT c.categoria, COUNT(*), COALESCE(SUM(v.duracion), 0)
+               FROM categorias c JOIN videos v ON v.archivo = c.archivo
+               GROUP BY c.categoria"""
+        )
+        return {
+            categoria: {"total": total, "duracion_total": duracion}
+            for categoria, total, duracion in filas
+        }
+    finally:
+        conn.close()
@@ -4,8 +4,173 @@ Gestión de proyectos - crear, actualizar, listar
 
 import os
 import json
+import time
+import errno
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from .config import PROYECTOS_DIR
+from .catalogo import sincronizar_catalogo, buscar_proyectos
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Segundos que se espera el bloqueo de proyecto.json antes de fallar
+ESPERA_MAX_BLOQUEO = 60
+
+
+class AlmacenProyecto:
+    """
+    Acceso seguro al proyecto.json de un proyecto.
+
+    Cada lectura-modificación-escritura se hace bajo un bloqueo de archivo
+    (entre procesos) y un lock de hilo, y la escritura es atómica (archivo
+    temporal + rename), así que dos workers sobre el mismo proyecto no
+    pueden dejar un JSON a medias. Dentro de `lote()` las actualizaciones
+    de este hilo se acumulan y se escriben una sola vez al salir.
+    """
+
+    _instancias = {}
+    _instancias_lock = threading.Lock()
+
+    def __init__(self, raiz: str):
+        self.path = os.path.join(raiz, "proyecto.json")
+        self._lock = threading.RLock()
+        self._local = threading.local()
+
+    @classmethod
+    def de(cls, raiz: str) -> "AlmacenProyecto":
+        """Devuelve la instancia compartida para la carpeta de un proyecto."""
+        clave = os.path.abspath(raiz)
+        with cls._instancias_lock:
+            if clave not in cls._instancias:
+                cls._instancias[clave] = cls(clave)
+            return cls._instancias[clave]
+
+    @contextmanager
+    def _bloqueo(self):
+        """Bloqueo exclusivo sobre proyecto.json.lock (hilos y procesos)."""
+        with self._lock:
+            with open(self.path + ".lock", "a+b") as f:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                else:
+                    f.seek(0)
+                    limite = time.monotonic() + ESPERA_MAX_BLOQUEO
+                    while True:
+                        try:
+                            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                            break
+                        except OSError as e:
+                            # Solo se reintenta si otro proceso tiene el bloqueo
+                            if e.errno not in (errno.EDEADLOCK, errno.EACCES):
+                                raise
+                            if time.monotonic() >= limite:
+                                raise RuntimeError(
+                                    f"No se pudo bloquear {self.path} en "
+                                    f"{ESPERA_MAX_BLOQUEO}s: otro proceso lo tiene"
+                                ) from e
+                            time.sleep(0.1)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+                    else:
+                        f.seek(0)
+                        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+    def _leer(self) -> dict:
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _escribir(self, metadata: dict):
+        temporal = f"{self.path}.{os.getpid()}.{threading.get_ident()}.part"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(metadata, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, self.path)
+
+    def leer(self) -> dict:
+        """Lee la metadata (incluye las actualizaciones pendientes del lote)."""
+        with self._bloqueo():
+            metadata = self._leer()
+        for actualizaciones in getattr(self._local, "pendientes", None) or []:
+            _fusionar_metadata(metadata, actualizaciones)
+        return metadata
+
+    def escribir(self, metadata: dict):
+        """Reemplaza la metadata completa."""
+        with self._bloqueo():
+            self._escribir(metadata)
+
+    def actualizar(self, actualizaciones: dict):
+        """
+        Fusiona campos en la metadata.
+
+        Args:
+            actualizaciones: Diccionario con los campos a actualizar
+        """
+        pendientes = getattr(self._local, "pendientes", None)
+        if pendientes is not None:
+            pendientes.append(actualizaciones)
+            return
+        self._aplicar([actualizaciones])
+
+    def _aplicar(self, lista: list):
+        with self._bloqueo():
+            metadata = self._leer()
+            for actualizaciones in lista:
+                _fusionar_metadata(metadata, actualizaciones)
+            self._escribir(metadata)
+
+    @contextmanager
+    def lote(self):
+        """
+        Agrupa las actualizaciones de este hilo en una sola escritura.
+
+        Se pueden anidar; solo el lote exterior escribe. Si el bloque
+        termina con una excepción, las actualizaciones igual se guardan.
+        """
+        if getattr(self._local, "pendientes", None) is not None:
+            yield self
+            return
+
+        self._local.pendientes = []
+        try:
+            yield self
+        finally:
+            pendientes, self._local.pendientes = self._local.pendientes, None
+            if pendientes:
+                self._aplicar(pendientes)
+
+
+def _fusionar_metadata(original: dict, updates: dict):
+    """Fusión recursiva: los diccionarios se mezclan, el resto se reemplaza."""
+    for key, value in updates.items():
+        if isinstance(value, dict) and isinstance(original.get(key), dict):
+            _fusionar_metadata(original[key], value)
+        else:
+            original[key] = value
+
+
+def lote_metadata(rutas: dict):
+    """
+    Context manager para agrupar varias actualizaciones de metadata.
+
+    Uso:
+        with lote_metadata(rutas):
+            actualizar_metadata_proyecto(rutas, {...})
+            actualizar_metadata_proyecto(rutas, {...})  # una sola escritura
+
+    Args:
+        rutas: Diccionario con las rutas del proyecto
+    """
+    return AlmacenProyecto.de(rutas["raiz"]).lote()
 
 
 def generar_nombre_proyecto(tema: str) -> str:
@@ -72,37 +237,24 @@ def crear_metadata_proyecto(rutas: dict, tema: str, config: dict) -> str:
         "youtube": {"subido": False, "url": None, "privacidad": None},
     }
 
-    metadata_path = os.path.join(rutas["raiz"], "proyecto.json")
-    with open(metadata_path, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, ensure_ascii=False, indent=2)
+    almacen = AlmacenProyecto.de(rutas["raiz"])
+    almacen.escribir(metadata)
 
-    return metadata_path
+    return almacen.path
 
 
 def actualizar_metadata_proyecto(rutas: dict, actualizaciones: dict):
     """
     Actualiza el archivo proyecto.json con nuevos datos.
 
+    La escritura es atómica y con bloqueo; dentro de lote_metadata(rutas)
+    se difiere hasta el final del lote.
+
     Args:
         rutas: Diccionario con las rutas del proyecto
         actualizaciones: Diccionario con los campos a actualizar
     """
-    metadata_path = os.path.join(rutas["raiz"], "proyecto.json")
-
-    with open(metadata_path, "r", encoding="utf-8") as f:
-        metadata = json.load(f)
-
-    def actualizar_dict(original, updates):
-        for key, value in updates.items():
-            if isinstance(value, dict) and key in original:
-                actualizar_dict(original[key], value)
-            else:
-                original[key] = value
-
-    actualizar_dict(metadata, actualizaciones)
-
-    with open(metadata_path, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, ensure_ascii=False, indent=2)
+    AlmacenProyecto.de(rutas["raiz"]).actualizar(actualizaciones)
 
 
 def cargar_proyecto(nombre_proyecto: str) -> tuple:
@@ -135,36 +287,40 @@ def cargar_proyecto(nombre_proyecto: str) -> tuple:
     return metadata, rutas
 
 
-def listar_proyectos() -> list:
+def listar_proyectos(
+    estado=None,
+    excluir_estado=None,
+    desde: str = None,
+    hasta: str = None,
+    tema: str = None,
+    limite: int = None,
+    desplazamiento: int = 0,
+) -> list:
     """
-    Lista todos los proyectos existentes.
+    Lista los proyectos existentes (más reciente primero).
+
+    Usa el catálogo SQLite, que antes se sincroniza leyendo solo los
+    proyecto.json que cambiaron.
+
+    Args:
+        estado: Estado o lista de estados a incluir
+        excluir_estado: Estado o lista de estados a excluir
+        desde: Fecha mínima ("YYYY-MM-DD")
+        hasta: Fecha máxima ("YYYY-MM-DD", inclusive)
+        tema: Texto contenido en el tema
+        limite: Máximo de resultados (None: todos)
+        desplazamiento: Resultados a saltar (paginación)
 
     Returns:
         Lista de diccionarios con info de cada proyecto
     """
-    if not os.path.exists(PROYECTOS_DIR):
-        return []
-
-    proyectos = []
-    for nombre in os.listdir(PROYECTOS_DIR):
-        proyecto_dir = os.path.join(PROYECTOS_DIR, nombre)
-        metadata_path = os.path.join(proyecto_dir, "proyecto.json")
-
-        if os.path.isdir(proyecto_dir) and os.path.exists(metadata_path):
-            try:
-                with open(metadata_path, "r", encoding="utf-8") as f:
-                    metadata = json.load(f)
-                proyectos.append(
-                    {
-                        "nombre": nombre,
-                        "tema": metadata.get("tema", "Sin tema"),
-                        "estado": metadata.get("estado", "desconocido"),
-                        "fecha": metadata.get("fecha_creacion", ""),
-                    }
-                )
-            except (json.JSONDecodeError, KeyError):
-                continue
-
-    # Ordenar por fecha (más reciente primero)
-    proyectos.sort(key=lambda x: x["fecha"], reverse=True)
-    return proyectos
+    sincronizar_catalogo()
+    return buscar_proyectos(
+        estado=estado,
+        excluir_estado=excluir_estado,
+        desde=desde,
+        hasta=hasta,
+        tema=tema,
+        limite=limite,
+        desplazamiento=desplazamiento,
+    )
@@ -5,14 +5,72 @@ Extractor de Shorts desde videos de YouTube
 import os
 import re
 import json
+import math
+import bisect
+import shutil
 import subprocess
-import tempfile
-import base64
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound
-from google.genai import types
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from .config import PROYECTOS_DIR
+from .cache import generar_texto
+from .fuentes import (
+    obtener_fuente,
+    obtener_seccion,
+    recortar_clip,
+    ruta_fuente,
+    usar_fuente,
+    conviene_fuente_completa,
+)
+from .encuadre import analizar_encuadre, expresion_crop_x
+from .transcripciones import leer_transcripcion_cache, guardar_transcripcion_cache
+
+# Concurrencia al procesar varios momentos: las descargas esperan a la red
+# y las conversiones ocupan CPU, por eso tienen límites separados
+MAX_DESCARGAS_CONCURRENTES = 3
+MAX_CONVERSIONES_CONCURRENTES = 2
+
+# Conversión en lote: los cortes se agrupan solo si el rango que hay que
+# decodificar no supera por mucho la duración sumada de los clips
+LOTE_MAX_RELACION_RANGO = 1.5
+LOTE_HOLGURA_RANGO = 30  # segundos
+
+# Transcripciones más largas que esto se analizan por ventanas (map-reduce)
+MAX_CARACTERES_ANALISIS = 60000
+VENTANA_ANALISIS = 15 * 60  # segundos
+SOLAPE_ANALISIS = 90  # mayor que la duración máxima de un Short
+MAX_ANALISIS_CONCURRENTES = 4
+
+# Compactación de la transcripción: una línea por frase o cada N segundos
+COMPACTAR_MAX_SEGUNDOS = 20
+COMPACTAR_MIN_SEGUNDOS = 3
+
+# Preselección local de ventanas antes de llamar a Gemini
+PRESELECCION_DURACIONES = (30, 45, 60)  # segundos
+PRESELECCION_PASO = 10  # segundos entre inicios de ventana
+PRESELECCION_MEMORIA_LEXICA = 120  # una palabra es "nueva" si no se dijo en este lapso
+PRESELECCION_TOP_K = 12
+PRESELECCION_MIN_DURACION = 15 * 60  # videos más cortos se envían completos
+
+_RE_PALABRA = re.compile(r"\w+")
+_RE_MARCADOR = re.compile(
+    r"\[(?:risas?|aplausos?|laughter|laughs|applause|cheering)\]|\b(?:ja){2,}\b|\b(?:ha){2,}\b",
+    re.IGNORECASE,
+)
+_RE_LINEA_TIMESTAMP = re.compile(r"^\[(\d+):(\d{2})\]")
+
+CRITERIOS_MOMENTOS = """CRITERIOS PARA SELECCIONAR MOMENTOS:
+1. Ganchos impactantes que capturen atención en 2 segundos
+2. Datos sorprendentes o contraintuitivos
+3. Momentos emocionales o dramáticos
+4. Frases memorables o quotes potentes
+5. Revelaciones o plot twists
+6. Contenido que genere curiosidad
 
-from .config import obtener_modelo, PROYECTOS_DIR
+REGLAS:
+- Cada clip debe durar entre 30 y 60 segundos
+- El inicio debe ser un gancho fuerte (no puede empezar aburrido)
+- Debe tener sentido por sí solo (no requerir contexto previo)"""
 
 
 def extraer_video_id(url: str) -> str:
@@ -38,13 +96,19 @@ def extraer_video_id(url: str) -> str:
     raise ValueError(f"No se pudo extraer el ID del video de: {url}")
 
 
-def obtener_transcripcion(video_id: str, idiomas: list = None) -> list:
+def obtener_transcripcion(
+    video_id: str, idiomas: list = None, usar_cache: bool = True
+) -> list:
     """
     Obtiene la transcripción de un video de YouTube.
 
+    Las transcripciones descargadas se guardan comprimidas en la caché
+    local, así que repetir el análisis de un video no vuelve a la red.
+
     Args:
         video_id: ID del video
         idiomas: Lista de idiomas preferidos (default: ['es', 'en'])
+        usar_cache: False para descargarla de nuevo
 
     Returns:
         Lista de segmentos con 'text', 'start', 'duration'
@@ -52,36 +116,44 @@ def obtener_transcripcion(video_id: str, idiomas: list = None) -> list:
     if idiomas is None:
         idiomas = ["es", "en"]
 
+    if usar_cache:
+        guardada = leer_transcripcion_cache(video_id, idiomas)
+        if guardada is not None:
+            return guardada[1]
+
+    from youtube_transcript_api import YouTubeTranscriptApi
+    from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound
+
     # Crear instancia de la API (nueva versión)
     ytt_api = YouTubeTranscriptApi()
 
     try:
-        transcript = ytt_api.fetch(video_id, languages=idiomas)
-        # Convertir a lista de diccionarios
-        return [
-            {"text": item.text, "start": item.start, "duration": item.duration}
-            for item in transcript
-        ]
-    except NoTranscriptFound:
-        # Intentar obtener cualquier transcripción disponible
+        # Una sola consulta de la lista: idioma preferido o, si no hay,
+        # cualquier transcripción disponible (p. ej. generada automáticamente)
+        transcript_list = ytt_api.list(video_id)
         try:
-            transcript_list = ytt_api.list(video_id)
-            # Buscar transcripción generada automáticamente
-            for transcript in transcript_list:
-                fetched = transcript.fetch()
-                return [
-                    {"text": item.text, "start": item.start, "duration": item.duration}
-                    for item in fetched
-                ]
-        except Exception as e:
-            raise RuntimeError(f"No se encontró transcripción: {e}") from e
+            transcript = transcript_list.find_transcript(idiomas)
+        except NoTranscriptFound:
+            transcript = next(iter(transcript_list), None)
+            if transcript is None:
+                raise RuntimeError("No se encontró transcripción para este video")
+        fetched = transcript.fetch()
     except TranscriptsDisabled as exc:
         raise RuntimeError(
             "Las transcripciones están deshabilitadas para este video"
         ) from exc
+    except RuntimeError:
+        raise
     except Exception as e:
         raise RuntimeError(f"Error al obtener transcripción: {e}") from e
 
+    segmentos = [
+        {"text": item.text, "start": item.start, "duration": item.duration}
+        for item in fetched
+    ]
+    guardar_transcripcion_cache(video_id, idiomas, transcript.language_code, segmentos)
+    return segmentos
+
 
 def formatear_transcripcion(transcript: list) -> str:
     """
@@ -104,7 +176,315 @@ def formatear_transcripcion(transcript: list) -> str:
     return "\n".join(lines)
 
 
-def analizar_momentos_virales(client, transcripcion: str, num_shorts: int = 3) -> list:
+def compactar_transcripcion(
+    transcript: list, max_segundos: float = COMPACTAR_MAX_SEGUNDOS
+) -> list:
+    """
+    Une los fragmentos de la transcripción en frases o bloques de N segundos.
+
+    Los subtítulos automáticos traen dos a cinco palabras por fragmento, así
+    que la mayor parte del prompt serían timestamps. Cada línea compacta
+    conserva el inicio de su primer fragmento; los límites exactos se
+    recuperan después con ajustar_limites_momentos sobre la original.
+
+    Args:
+        transcript: Lista de segmentos de transcripción
+        max_segundos: Duración máxima de una línea compacta
+
+    Returns:
+        Lista de segmentos con el mismo formato ('text', 'start', 'duration')
+    """
+    compactos = []
+    textos = []
+    inicio = fin = None
+
+    for seg in transcript:
+        texto = " ".join(seg["text"].split())
+        if not texto:
+            continue
+        if inicio is None:
+            inicio = seg["start"]
+        textos.append(texto)
+        fin = seg["start"] + seg.get("duration", 0)
+
+        fin_de_frase = texto[-1] in ".?!…" and fin - inicio >= COMPACTAR_MIN_SEGUNDOS
+        if fin_de_frase or fin - inicio >= max_segundos:
+            compactos.append(
+                {"text": " ".join(textos), "start": inicio, "duration": fin - inicio}
+            )
+            textos = []
+            inicio = None
+
+    if textos:
+        compactos.append(
+            {"text": " ".join(textos), "start": inicio, "duration": fin - inicio}
+        )
+    return compactos
+
+
+def estimar_tokens(texto: str) -> int:
+    """Estimación aproximada de tokens (unos 4 caracteres por token)."""
+    return len(texto) // 4
+
+
+def segundos_a_timestamp(segundos: float) -> str:
+    """Convierte segundos a timestamp MM:SS (los minutos pueden pasar de 59)."""
+    segundos = int(segundos)
+    return f"{segundos // 60:02d}:{segundos % 60:02d}"
+
+
+def ajustar_limites_momentos(momentos: list, transcript: list) -> list:
+    """
+    Ajusta el inicio y fin de cada momento a los fragmentos originales.
+
+    El inicio se lleva al comienzo del fragmento señalado y el fin al
+    final del fragmento en curso, para no cortar una frase a la mitad.
+    Los límites exactos quedan en 'inicio_segundos' y 'fin_segundos'.
+
+    Args:
+        momentos: Momentos devueltos por analizar_momentos_virales, con
+            timestamps válidos (ver descartar_momentos_invalidos)
+        transcript: Transcripción original (sin compactar)
+
+    Returns:
+        La misma lista de momentos, modificada
+    """
+    if not transcript:
+        return momentos
+
+    inicios = [seg["start"] for seg in transcript]
+    n = len(inicios)
+
+    for momento in momentos:
+        inicio, fin = _rango_momento(momento)
+
+        # El timestamp viene truncado al segundo: preferir el fragmento que
+        # empieza dentro de ese segundo y, si no hay, el que lo contiene
+        i = bisect.bisect_left(inicios, inicio)
+        if i >= n or inicios[i] >= inicio + 1:
+            i = max(i - 1, 0)
+
+        # Último fragmento que empieza antes del fin; termina donde empieza el siguiente
+        j = max(bisect.bisect_left(inicios, fin) - 1, i)
+        if j + 1 < n:
+            fin_real = inicios[j + 1]
+        else:
+            fin_real = inicios[j] + transcript[j].get("duration", 0)
+
+        momento["inicio_segundos"] = round(inicios[i], 3)
+        momento["fin_segundos"] = round(max(fin_real, inicios[i] + 1), 3)
+        momento["timestamp_inicio"] = segundos_a_timestamp(momento["inicio_segundos"])
+        momento["timestamp_fin"] = segundos_a_timestamp(
+            math.ceil(momento["fin_segundos"])
+        )
+
+    return momentos
+
+
+def _palabras(texto: str) -> list:
+    return _RE_PALABRA.findall(texto.lower())
+
+
+def puntuar_ventanas(transcript: list) -> list:
+    """
+    Puntúa localmente ventanas deslizantes de 30 a 60 segundos.
+
+    Señales (normalizadas entre todas las ventanas): velocidad del habla,
+    densidad de preguntas y exclamaciones, novedad léxica (palabras que
+    no aparecieron en los dos minutos anteriores) y marcadores como
+    [risas] o [aplausos].
+
+    Args:
+        transcript: Transcripción original (lista de segmentos)
+
+    Returns:
+        Lista de ventanas {'inicio', 'fin', 'desde', 'hasta', 'puntuacion', ...}
+        ordenada de mayor a menor puntuación
+    """
+    if not transcript:
+        return []
+
+    n = len(transcript)
+    inicios = [seg["start"] for seg in transcript]
+
+    # Sumas acumuladas por fragmento para calcular cada ventana en O(1)
+    acum = {"palabras": [0], "enfasis": [0], "novedad": [0], "marcadores": [0]}
+    visto_en = {}
+    for seg in transcript:
+        texto = seg["text"]
+        palabras = _palabras(texto)
+        novedosas = 0
+        # Al principio todo es "nuevo": la novedad solo cuenta tras la memoria inicial
+        contar_novedad = seg["start"] >= PRESELECCION_MEMORIA_LEXICA
+        for palabra in palabras:
+            if len(palabra) > 3:
+                anterior = visto_en.get(palabra)
+                if contar_novedad and (
+                    anterior is None or seg["start"] - anterior > PRESELECCION_MEMORIA_LEXICA
+                ):
+                    novedosas += 1
+                visto_en[palabra] = seg["start"]
+        acum["palabras"].append(acum["palabras"][-1] + len(palabras))
+        acum["enfasis"].append(
+            acum["enfasis"][-1] + texto.count("?") + texto.count("!") + texto.count("¿") + texto.count("¡")
+        )
+        acum["novedad"].append(acum["novedad"][-1] + novedosas)
+        acum["marcadores"].append(acum["marcadores"][-1] + len(_RE_MARCADOR.findall(texto)))
+
+    ventanas = []
+    ultimo_inicio = None
+    for i in range(n):
+        if ultimo_inicio is not None and inicios[i] - ultimo_inicio < PRESELECCION_PASO:
+            continue
+        ultimo_inicio = inicios[i]
+        for duracion in PRESELECCION_DURACIONES:
+            j = bisect.bisect_right(inicios, inicios[i] + duracion) - 1
+            fin = inicios[j] + transcript[j].get("duration", 0)
+            if fin - inicios[i] < min(PRESELECCION_DURACIONES) * 0.8:
+                continue
+            palabras = acum["palabras"][j + 1] - acum["palabras"][i]
+            if not palabras:
+                continue
+            ventanas.append(
+                {
+                    "inicio": inicios[i],
+                    "fin": min(fin, inicios[i] + duracion),
+                    "desde": i,
+                    "hasta": j,
+                    "velocidad": palabras / max(fin - inicios[i], 1),
+                    "enfasis": (acum["enfasis"][j + 1] - acum["enfasis"][i]) / palabras,
+                    "novedad": (acum["novedad"][j + 1] - acum["novedad"][i]) / palabras,
+                    "marcadores": acum["marcadores"][j + 1] - acum["marcadores"][i],
+                }
+            )
+
+    if not ventanas:
+        return []
+
+    def normalizar(clave):
+        valores = [v[clave] for v in ventanas]
+        media = sum(valores) / len(valores)
+        desv = (sum((x - media) ** 2 for x in valores) / len(valores)) ** 0.5 or 1
+        # Limitar a ±3 para que una sola señal extrema no decida sola
+        return [max(-3.0, min(3.0, (x - media) / desv)) for x in valores]
+
+    z = {clave: normalizar(clave) for clave in ("velocidad", "enfasis", "novedad")}
+    for k, ventana in enumerate(ventanas):
+        ventana["puntuacion"] = round(
+            z["velocidad"][k]
+            + z["enfasis"][k]
+            + z["novedad"][k]
+            + 1.5 * min(ventana["marcadores"], 3),
+            3,
+        )
+
+    return sorted(ventanas, key=lambda v: v["puntuacion"], reverse=True)
+
+
+def seleccionar_ventanas(ventanas: list, top_k: int) -> list:
+    """
+    Elige las top_k ventanas mejor puntuadas que no se solapen entre sí.
+
+    Args:
+        ventanas: Resultado de puntuar_ventanas (ordenado por puntuación)
+        top_k: Número de ventanas a conservar
+
+    Returns:
+        Ventanas elegidas, en orden cronológico
+    """
+    elegidas = []
+    for ventana in ventanas:
+        if len(elegidas) >= top_k:
+            break
+        if all(ventana["fin"] <= e["inicio"] or ventana["inicio"] >= e["fin"] for e in elegidas):
+            elegidas.append(ventana)
+    return sorted(elegidas, key=lambda v: v["inicio"])
+
+
+def preseleccionar_transcripcion(transcript: list, top_k: int) -> str:
+    """
+    Formatea solo las mejores ventanas locales de la transcripción.
+
+    Args:
+        transcript: Transcripción original
+        top_k: Número de ventanas a incluir
+
+    Returns:
+        Texto formateado (compacto), con '...' entre ventanas
+    """
+    bloques = []
+    for ventana in seleccionar_ventanas(puntuar_ventanas(transcript), top_k):
+        segmentos = transcript[ventana["desde"] : ventana["hasta"] + 1]
+        bloques.append(formatear_transcripcion(compactar_transcripcion(segmentos)))
+    return "\n...\n".join(bloques)
+
+
+def momentos_locales(transcript: list, num_shorts: int = 3) -> list:
+    """
+    Modo rápido sin Gemini: propone momentos a partir de la puntuación local.
+
+    Args:
+        transcript: Transcripción original
+        num_shorts: Número de shorts a generar
+
+    Returns:
+        Lista de momentos con el mismo formato que analizar_momentos_virales
+    """
+    momentos = []
+    for ventana in seleccionar_ventanas(puntuar_ventanas(transcript), num_shorts):
+        segmentos = transcript[ventana["desde"] : ventana["hasta"] + 1]
+        texto = " ".join(" ".join(seg["text"].split()) for seg in segmentos)
+        gancho = " ".join(segmentos[0]["text"].split())
+        momentos.append(
+            {
+                "timestamp_inicio": segundos_a_timestamp(ventana["inicio"]),
+                "timestamp_fin": segundos_a_timestamp(math.ceil(ventana["fin"])),
+                "titulo_sugerido": texto[:50],
+                "descripcion": texto[:200],
+                "gancho": gancho,
+                "porque_es_viral": (
+                    f"Puntuación local {ventana['puntuacion']:.1f} "
+                    f"({ventana['velocidad']:.1f} palabras/s, "
+                    f"{ventana['marcadores']} marcadores)"
+                ),
+                "puntuacion": ventana["puntuacion"],
+            }
+        )
+
+    # Orden de presentación: del mejor al peor
+    momentos.sort(key=lambda m: m["puntuacion"], reverse=True)
+    for i, momento in enumerate(momentos, 1):
+        momento["numero"] = i
+    return momentos
+
+
+def parsear_json_respuesta(texto: str):
+    """
+    Quita los marcadores de código de una respuesta de Gemini y la parsea.
+
+    Args:
+        texto: Texto devuelto por el modelo
+
+    Returns:
+        El JSON parseado
+    """
+    texto = texto.strip()
+    if texto.startswith("```json"):
+        texto = texto[7:]
+    if texto.startswith("```"):
+        texto = texto[3:]
+    if texto.endswith("```"):
+        texto = texto[:-3]
+    return json.loads(texto.strip())
+
+
+def analizar_momentos_virales(
+    client,
+    transcripcion: str,
+    num_shorts: int = 3,
+    usar_cache: bool = True,
+    modo: str = "auto",
+) -> list:
     """
     Usa Gemini para analizar la transcripción y encontrar momentos virales.
 
@@ -112,27 +492,26 @@ def analizar_momentos_virales(client, transcripcion: str, num_shorts: int = 3) -
         client: Cliente de Gemini
         transcripcion: Transcripción formateada con timestamps
         num_shorts: Número de shorts a generar
+        usar_cache: False para ignorar la caché de respuestas
+        modo: 'completo' (una sola petición), 'ventanas' (map-reduce) o
+            'auto' (ventanas si la transcripción supera MAX_CARACTERES_ANALISIS)
 
     Returns:
         Lista de diccionarios con los clips sugeridos
     """
+    if modo == "ventanas" or (
+        modo == "auto" and len(transcripcion) > MAX_CARACTERES_ANALISIS
+    ):
+        return analizar_momentos_por_ventanas(
+            client, transcripcion, num_shorts, usar_cache=usar_cache
+        )
+
     prompt = f"""Eres un experto en contenido viral de YouTube Shorts. Analiza esta transcripción y encuentra los {num_shorts} mejores momentos para crear Shorts virales.
 
 TRANSCRIPCIÓN:
 {transcripcion}
 
-CRITERIOS PARA SELECCIONAR MOMENTOS:
-1. Ganchos impactantes que capturen atención en 2 segundos
-2. Datos sorprendentes o contraintuitivos
-3. Momentos emocionales o dramáticos
-4. Frases memorables o quotes potentes
-5. Revelaciones o plot twists
-6. Contenido que genere curiosidad
-
-REGLAS:
-- Cada clip debe durar entre 30 y 60 segundos
-- El inicio debe ser un gancho fuerte (no puede empezar aburrido)
-- Debe tener sentido por sí solo (no requerir contexto previo)
+{CRITERIOS_MOMENTOS}
 
 Responde ÚNICAMENTE con un JSON válido, sin texto adicional:
 
@@ -151,20 +530,10 @@ Responde ÚNICAMENTE con un JSON válido, sin texto adicional:
 }}"""
 
     try:
-        response = client.models.generate_content(
-            model=obtener_modelo("texto"), contents=prompt
+        texto = generar_texto(
+            client, prompt, usar_cache=usar_cache, validar=parsear_json_respuesta
         )
-        texto = response.text.strip()
-
-        # Limpiar marcadores de código
-        if texto.startswith("```json"):
-            texto = texto[7:]
-        if texto.startswith("```"):
-            texto = texto[3:]
-        if texto.endswith("```"):
-            texto = texto[:-3]
-
-        resultado = json.loads(texto.strip())
+        resultado = parsear_json_respuesta(texto)
         return resultado.get("shorts", [])
 
     except json.JSONDecodeError as e:
@@ -173,6 +542,278 @@ Responde ÚNICAMENTE con un JSON válido, sin texto adicional:
         raise RuntimeError(f"Error al analizar momentos: {e}") from e
 
 
+def dividir_en_ventanas(
+    transcripcion: str,
+    duracion_ventana: int = VENTANA_ANALISIS,
+    solape: int = SOLAPE_ANALISIS,
+) -> list:
+    """
+    Divide una transcripción formateada en ventanas de tiempo solapadas.
+
+    El solape es mayor que la duración máxima de un Short, así que
+    cualquier clip posible cabe entero en al menos una ventana.
+
+    Args:
+        transcripcion: Transcripción formateada con timestamps
+        duracion_ventana: Duración de cada ventana en segundos
+        solape: Segundos compartidos entre ventanas consecutivas
+
+    Returns:
+        Lista de textos, uno por ventana
+    """
+    tiempos = []
+    lineas = transcripcion.splitlines()
+    for linea in lineas:
+        match = _RE_LINEA_TIMESTAMP.match(linea)
+        if match:
+            tiempos.append(int(match.group(1)) * 60 + int(match.group(2)))
+        else:
+            tiempos.append(tiempos[-1] if tiempos else 0)
+
+    if not lineas:
+        return []
+
+    ventanas = []
+    paso = max(duracion_ventana - solape, 1)
+    inicio = 0
+    while True:
+        fin = inicio + duracion_ventana
+        desde = bisect.bisect_left(tiempos, inicio)
+        hasta = bisect.bisect_left(tiempos, fin)
+        if hasta > desde:
+            ventanas.append("\n".join(lineas[desde:hasta]))
+        if fin > tiempos[-1]:
+            break
+        inicio += paso
+
+    return ventanas
+
+
+def _rango_momento(momento: dict) -> tuple:
+    """Devuelve (inicio, fin) en segundos de un momento sugerido."""
+    return (
+        timestamp_a_segundos(momento.get("timestamp_inicio", "0:00")),
+        timestamp_a_segundos(momento.get("timestamp_fin", "0:00")),
+    )
+
+
+def _puntuacion(momento: dict) -> float:
+    """Puntuación numérica de un momento; acepta 8, "8" o "8/10" (0 si no se entiende)."""
+    valor = momento.get("puntuacion", 0)
+    try:
+        return float(valor or 0)
+    except (TypeError, ValueError):
+        coincidencia = re.match(r"\s*(\d+(?:[.,]\d+)?)", str(valor))
+        return float(coincidencia.group(1).replace(",", ".")) if coincidencia else 0.0
+
+
+def _rango_valido(momento: dict) -> bool:
+    """True si los timestamps del momento se entienden y forman un rango."""
+    try:
+        inicio, fin = _rango_momento(momento)
+    except (TypeError, ValueError, AttributeError):
+        return False
+    return fin > inicio
+
+
+def descartar_momentos_invalidos(momentos: list) -> list:
+    """
+    Quita los momentos cuyos timestamps no se entienden (p. ej. "1:xx"),
+    avisando de cada uno.
+
+    Returns:
+        Lista con los momentos válidos, en el mismo orden
+    """
+    validos = []
+    for momento in momentos:
+        if isinstance(momento, dict) and _rango_valido(momento):
+            validos.append(momento)
+            continue
+        datos = momento if isinstance(momento, dict) else {}
+        print(
+            f"   ⚠️ Momento descartado, timestamps no válidos: "
+            f"{datos.get('timestamp_inicio')!r} - {datos.get('timestamp_fin')!r}"
+        )
+    return validos
+
+
+def _fusionar_candidatos(candidatos: list) -> list:
+    """
+    Elimina candidatos repetidos por el solape entre ventanas.
+
+    Dos candidatos se consideran el mismo momento si comparten más de la
+    mitad del más corto; se conserva el de mayor puntuación. Los
+    candidatos con timestamps que no se entienden se descartan.
+    """
+    ordenados = sorted(
+        descartar_momentos_invalidos(candidatos), key=_puntuacion, reverse=True
+    )
+    elegidos = []
+    for candidato in ordenados:
+        inicio, fin = _rango_momento(candidato)
+        repetido = False
+        for otro in elegidos:
+            otro_inicio, otro_fin = _rango_momento(otro)
+            comun = min(fin, otro_fin) - max(inicio, otro_inicio)
+            if comun > 0.5 * max(min(fin - inicio, otro_fin - otro_inicio), 1):
+                repetido = True
+                break
+        if not repetido:
+            elegidos.append(candidato)
+    return sorted(elegidos, key=lambda m: _rango_momento(m)[0])
+
+
+def _analizar_ventana(
+    client, ventana: str, num_candidatos: int, usar_cache: bool
+) -> list:
+    """Pide candidatos a Gemini para una sola ventana de la transcripción."""
+    prompt = f"""Eres un experto en contenido viral de YouTube Shorts. Este es un fragmento de la transcripción de un video largo. Encuentra hasta {num_candidatos} momentos de este fragmento que funcionarían como Shorts virales.
+
+FRAGMENTO DE LA TRANSCRIPCIÓN:
+{ventana}
+
+{CRITERIOS_MOMENTOS}
+
+Usa los timestamps tal como aparecen en el fragmento. Si ningún momento vale la pena, devuelve una lista vacía.
+
+Responde ÚNICAMENTE con un JSON válido, sin texto adicional:
+
+{{
+  "shorts": [
+    {{
+      "timestamp_inicio": "MM:SS",
+      "timestamp_fin": "MM:SS",
+      "titulo_sugerido": "Título viral y clickbait (máx 50 chars)",
+      "descripcion": "Breve descripción del contenido",
+      "gancho": "La frase de gancho de los primeros 3 segundos",
+      "porque_es_viral": "Por qué este momento funcionará como Short",
+      "puntuacion": 1-10
+    }}
+  ]
+}}"""
+
+    texto = generar_texto(
+        client, prompt, usar_cache=usar_cache, validar=parsear_json_respuesta
+    )
+    resultado = parsear_json_respuesta(texto)
+    return resultado.get("shorts", []) if isinstance(resultado, dict) else []
+
+
+def _seleccionar_mejores(
+    client, candidatos: list, num_shorts: int, usar_cache: bool
+) -> list:
+    """
+    Paso final: Gemini ordena los candidatos y elige los num_shorts mejores.
+
+    Solo recibe un resumen de cada candidato, no la transcripción. Si la
+    llamada falla se usa la puntuación de cada ventana.
+    """
+    if len(candidatos) <= num_shorts:
+        return candidatos
+
+    resumen = [
+        {
+            "id": i,
+            "inicio": m.get("timestamp_inicio"),
+            "fin": m.get("timestamp_fin"),
+            "titulo": m.get("titulo_sugerido"),
+            "gancho": m.get("gancho"),
+            "porque_es_viral": m.get("porque_es_viral"),
+            "puntuacion": m.get("puntuacion"),
+        }
+        for i, m in enumerate(candidatos)
+    ]
+    prompt = f"""Eres un experto en contenido viral de YouTube Shorts. Estos son momentos candidatos extraídos de distintas partes de un mismo video:
+
+{json.dumps(resumen, ensure_ascii=False, indent=1)}
+
+Elige los {num_shorts} mejores para publicar como Shorts, del más al menos prometedor. Prioriza ganchos fuertes, variedad de temas y que cada uno se entienda sin contexto.
+
+Responde ÚNICAMENTE con un JSON válido, sin texto adicional:
+
+{{"seleccion": [id, id, ...]}}"""
+
+    try:
+        texto = generar_texto(
+            client, prompt, usar_cache=usar_cache, validar=parsear_json_respuesta
+        )
+        ids = parsear_json_respuesta(texto).get("seleccion", [])
+        elegidos = []
+        for i in ids:
+            if isinstance(i, int) and 0 <= i < len(candidatos) and candidatos[i] not in elegidos:
+                elegidos.append(candidatos[i])
+        if elegidos:
+            return elegidos[:num_shorts]
+    except Exception as e:
+        print(f"   ⚠️ No se pudo ordenar candidatos con Gemini: {e}")
+
+    return sorted(candidatos, key=_puntuacion, reverse=True)[:num_shorts]
+
+
+def analizar_momentos_por_ventanas(
+    client,
+    transcripcion: str,
+    num_shorts: int = 3,
+    usar_cache: bool = True,
+    max_concurrencia: int = MAX_ANALISIS_CONCURRENTES,
+) -> list:
+    """
+    Busca momentos virales en transcripciones largas (map-reduce).
+
+    Cada ventana solapada de la transcripción se analiza en paralelo y una
+    última llamada pequeña elige los mejores entre todos los candidatos, así
+    ninguna petición crece con la duración del video.
+
+    Args:
+        client: Cliente de Gemini
+        transcripcion: Transcripción formateada con timestamps
+        num_shorts: Número de shorts a generar
+        usar_cache: False para ignorar la caché de respuestas
+        max_concurrencia: Ventanas analizadas a la vez
+
+    Returns:
+        Lista de diccionarios con los clips sugeridos
+    """
+    ventanas = dividir_en_ventanas(transcripcion)
+    num_candidatos = max(2, min(num_shorts, 5))
+    print(f"   🪟 Analizando {len(ventanas)} ventanas de la transcripción...")
+
+    candidatos = []
+    errores = []
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrencia)) as pool:
+        futuros = [
+            pool.submit(_analizar_ventana, client, v, num_candidatos, usar_cache)
+            for v in ventanas
+        ]
+        for futuro in futuros:
+            try:
+                candidatos.extend(
+                    m for m in futuro.result() if isinstance(m, dict)
+                )
+            except Exception as e:
+                errores.append(str(e))
+
+    if errores:
+        print(f"   ⚠️ {len(errores)} ventanas fallaron: {errores[0]}")
+    if not candidatos:
+        raise RuntimeError(
+            f"Error al analizar momentos: {errores[0] if errores else 'sin candidatos'}"
+        )
+
+    try:
+        candidatos = _fusionar_candidatos(candidatos)
+        if not candidatos:
+            raise RuntimeError("ningún candidato tiene timestamps válidos")
+        print(f"   🔎 {len(candidatos)} candidatos, eligiendo los {num_shorts} mejores...")
+        elegidos = _seleccionar_mejores(client, candidatos, num_shorts, usar_cache)
+    except Exception as e:
+        raise RuntimeError(f"Error al analizar momentos: {e}") from e
+
+    for i, momento in enumerate(elegidos, 1):
+        momento["numero"] = i
+    return elegidos
+
+
 def timestamp_a_segundos(timestamp: str) -> float:
     """Convierte timestamp MM:SS a segundos."""
     partes = timestamp.split(":")
@@ -224,6 +865,33 @@ def descargar_clip(url: str, inicio: str, fin: str, output_path: str) -> str:
         raise RuntimeError(f"Error al descargar clip: {e.stderr}") from e
 
 
+def _filtro_vertical(metodo: str, entrada: str = "0:v", salida: str = "") -> str:
+    """
+    Grafo de filtros que pasa un stream horizontal a 1080x1920.
+
+    Args:
+        metodo: 'blur' (fondo difuminado) o 'crop' (recortar centro)
+        entrada: Etiqueta del stream de entrada
+        salida: Etiqueta de salida ('' deja la salida sin etiquetar)
+
+    Returns:
+        Texto del filter_complex
+    """
+    fin = f"[{salida}]" if salida else ""
+    if metodo == "blur":
+        # Video pequeño arriba con fondo blur
+        return (
+            f"[{entrada}]scale=1080:1920:force_original_aspect_ratio=decrease,"
+            "pad=1080:1920:(ow-iw)/2:(oh-ih)/2:black,"
+            f"split[fg{salida}][bg{salida}];"
+            f"[bg{salida}]scale=1080:1920:force_original_aspect_ratio=increase,"
+            f"crop=1080:1920,boxblur=20:20[blurred{salida}];"
+            f"[blurred{salida}][fg{salida}]overlay=(W-w)/2:(H-h)/2{fin}"
+        )
+    # crop: recortar el centro
+    return f"[{entrada}]scale=1920:1080,crop=607:1080:(in_w-607)/2:0,scale=1080:1920{fin}"
+
+
 def convertir_a_vertical(
     input_path: str, output_path: str, metodo: str = "blur"
 ) -> str:
@@ -238,19 +906,7 @@ def convertir_a_vertical(
     Returns:
         Ruta del video convertido
     """
-    if metodo == "blur":
-        # Video pequeño arriba con fondo blur
-        filter_complex = (
-            "[0:v]scale=1080:1920:force_original_aspect_ratio=decrease,"
-            "pad=1080:1920:(ow-iw)/2:(oh-ih)/2:black,"
-            "split[fg][bg];"
-            "[bg]scale=1080:1920:force_original_aspect_ratio=increase,"
-            "crop=1080:1920,boxblur=20:20[blurred];"
-            "[blurred][fg]overlay=(W-w)/2:(H-h)/2"
-        )
-    else:  # crop
-        # Recortar el centro
-        filter_complex = "scale=1920:1080,crop=607:1080:(in_w-607)/2:0,scale=1080:1920"
+    filter_complex = _filtro_vertical(metodo)
 
     cmd = [
         "ffmpeg",
@@ -279,20 +935,134 @@ def convertir_a_vertical(
         raise RuntimeError(f"Error al convertir video: {e.stderr}") from e
 
 
-def extraer_frames(video_path: str, num_frames: int = 5) -> list:
+def _tiene_audio(video_path: str) -> bool:
+    """Indica si el archivo tiene al menos un stream de audio (ffprobe)."""
+    cmd = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-select_streams",
+        "a",
+        "-show_entries",
+        "stream=index",
+        "-of",
+        "csv=p=0",
+        video_path,
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    return bool(result.stdout.strip())
+
+
+def convertir_lote_vertical(
+    fuente: str, cortes: list, metodo: str = "blur"
+) -> list:
     """
-    Extrae frames del video para análisis.
+    Genera varios Shorts de un mismo video decodificándolo una sola vez.
+
+    Un único ffmpeg lee el rango que cubre todos los cortes, lo reparte con
+    split/asplit, recorta cada rama con trim/atrim, le aplica el grafo
+    vertical y la codifica como una salida independiente. Conviene pasarle
+    cortes cercanos entre sí (ver agrupar_cortes).
 
     Args:
-        video_path: Ruta del video
-        num_frames: Número de frames a extraer
+        fuente: Ruta del video horizontal completo
+        cortes: Lista de tuplas (inicio, fin, output_path) en segundos
+        metodo: 'blur' o 'crop'
 
     Returns:
-        Lista de rutas de frames
+        Rutas de los Shorts generados, en el orden de los cortes
+    """
+    desde = min(inicio for inicio, _, _ in cortes)
+    hasta = max(fin for _, fin, _ in cortes)
+    audio = _tiene_audio(fuente)
+    n = len(cortes)
+
+    grafo = [f"[0:v]split={n}" + "".join(f"[v{k}]" for k in range(n))]
+    if audio:
+        grafo.append(f"[0:a]asplit={n}" + "".join(f"[a{k}]" for k in range(n)))
+
+    salidas = []
+    for k, (inicio, fin, output_path) in enumerate(cortes):
+        # Tiempos relativos al inicio del rango leído (-ss de entrada)
+        a, b = inicio - desde, fin - desde
+        grafo.append(f"[v{k}]trim=start={a:.3f}:end={b:.3f},setpts=PTS-STARTPTS[t{k}]")
+        grafo.append(_filtro_vertical(metodo, f"t{k}", f"vo{k}"))
+        salidas += ["-map", f"[vo{k}]"]
+        if audio:
+            grafo.append(
+                f"[a{k}]atrim=start={a:.3f}:end={b:.3f},asetpts=PTS-STARTPTS[ao{k}]"
+            )
+            salidas += ["-map", f"[ao{k}]", "-c:a", "aac", "-b:a", "128k"]
+        salidas += [
+            "-c:v",
+            "libx264",
+            "-preset",
+            "medium",
+            "-crf",
+            "23",
+            "-y",
+            output_path,
+        ]
+
+    cmd = [
+        "ffmpeg",
+        "-ss",
+        f"{desde:.3f}",
+        "-t",
+        f"{hasta - desde:.3f}",
+        "-i",
+        fuente,
+        "-filter_complex",
+        ";".join(grafo),
+        *salidas,
+    ]
+
+    try:
+        subprocess.run(cmd, check=True, capture_output=True, text=True)
+        return [output_path for _, _, output_path in cortes]
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Error al convertir videos: {e.stderr}") from e
+
+
+def agrupar_cortes(
+    cortes: list,
+    max_relacion: float = LOTE_MAX_RELACION_RANGO,
+    holgura: float = LOTE_HOLGURA_RANGO,
+) -> list:
     """
-    temp_dir = tempfile.mkdtemp()
+    Agrupa cortes cercanos para convertirlos con una sola decodificación.
 
-    # Obtener duración del video
+    Un grupo crece mientras el rango que cubre siga cerca de la duración
+    sumada de sus clips; así no se decodifica una hora de video para sacar
+    dos clips alejados. Un corte aislado queda en un grupo propio, que
+    equivale a convertir ese clip por separado.
+
+    Args:
+        cortes: Lista de tuplas (inicio, fin, output_path) en segundos
+        max_relacion: Rango máximo respecto de la duración sumada
+        holgura: Segundos de rango extra permitidos en cualquier grupo
+
+    Returns:
+        Lista de grupos; cada grupo es una lista de índices de `cortes`
+    """
+    grupos = []
+    desde = hasta = total = 0.0
+    for k in sorted(range(len(cortes)), key=lambda k: cortes[k][0]):
+        inicio, fin, _ = cortes[k]
+        if grupos:
+            rango = max(hasta, fin) - desde
+            if rango <= max_relacion * (total + fin - inicio) + holgura:
+                grupos[-1].append(k)
+                hasta = max(hasta, fin)
+                total += fin - inicio
+                continue
+        grupos.append([k])
+        desde, hasta, total = inicio, fin, fin - inicio
+    return grupos
+
+
+def obtener_duracion_video(video_path: str) -> float:
+    """Devuelve la duración de un video en segundos (ffprobe)."""
     cmd_duration = [
         "ffprobe",
         "-v",
@@ -304,59 +1074,94 @@ def extraer_frames(video_path: str, num_frames: int = 5) -> list:
         video_path,
     ]
     result = subprocess.run(cmd_duration, capture_output=True, text=True)
-    duration = float(result.stdout.strip())
+    try:
+        return float(result.stdout.strip())
+    except ValueError as e:
+        raise RuntimeError(f"No se pudo leer la duración de {video_path}") from e
 
+
+def _separar_jpegs(datos: bytes) -> list:
+    """Separa un flujo MJPEG (image2pipe) en imágenes JPEG individuales."""
     frames = []
-    interval = duration / (num_frames + 1)
-
-    for i in range(1, num_frames + 1):
-        timestamp = interval * i
-        frame_path = os.path.join(temp_dir, f"frame_{i:02d}.jpg")
-
-        cmd = [
-            "ffmpeg",
-            "-ss",
-            str(timestamp),
-            "-i",
-            video_path,
-            "-vframes",
-            "1",
-            "-q:v",
-            "2",
-            "-y",
-            frame_path,
-        ]
-        subprocess.run(cmd, capture_output=True)
+    inicio = datos.find(b"\xff\xd8")
+    while inicio != -1:
+        fin = datos.find(b"\xff\xd9", inicio + 2)
+        if fin == -1:
+            break
+        frames.append(datos[inicio : fin + 2])
+        inicio = datos.find(b"\xff\xd8", fin + 2)
+    return frames
 
-        if os.path.exists(frame_path):
-            frames.append(frame_path)
 
-    return frames
+def extraer_frames(
+    video_path: str, num_frames: int = 5, duracion: float = None, ancho: int = 640
+) -> list:
+    """
+    Extrae frames del video para análisis en una sola pasada de ffmpeg.
 
+    Los frames se eligen con un filtro select (el primero en o después de
+    cada instante), se reducen de tamaño y llegan como JPEG por un pipe,
+    sin archivos temporales.
 
-def analizar_posicion_sujeto(client, frames: list) -> dict:
+    Args:
+        video_path: Ruta del video
+        num_frames: Número de frames a extraer
+        duracion: Duración del video en segundos (si no se indica, ffprobe)
+        ancho: Ancho de los frames extraídos
+
+    Returns:
+        Lista de frames JPEG (bytes)
+    """
+    if duracion is None:
+        try:
+            duracion = obtener_duracion_video(video_path)
+        except RuntimeError:
+            return []
+
+    interval = duracion / (num_frames + 1)
+    instantes = [interval * i for i in range(1, num_frames + 1)]
+    condicion = "+".join(
+        f"gte(t,{t:.3f})*lt(prev_pts*TB,{t:.3f})" for t in instantes
+    )
+
+    cmd = [
+        "ffmpeg",
+        "-v",
+        "error",
+        "-i",
+        video_path,
+        "-an",
+        "-vf",
+        f"select='{condicion}',scale={ancho}:-2",
+        "-frames:v",
+        str(num_frames),
+        "-f",
+        "image2pipe",
+        "-c:v",
+        "mjpeg",
+        "-q:v",
+        "3",
+        "pipe:1",
+    ]
+    result = subprocess.run(cmd, capture_output=True)
+    if result.returncode != 0:
+        return []
+
+    return _separar_jpegs(result.stdout)
+
+
+def analizar_posicion_sujeto(client, frames: list, usar_cache: bool = True) -> dict:
     """
     Usa Gemini para analizar los frames y detectar la posición del sujeto.
 
     Args:
         client: Cliente de Gemini
-        frames: Lista de rutas de frames
+        frames: Lista de frames JPEG (bytes), como los de extraer_frames
+        usar_cache: False para ignorar la caché de respuestas
 
     Returns:
         Diccionario con la posición recomendada del crop
     """
-    # Codificar frames en base64
-    images_data = []
-    for frame_path in frames[:3]:  # Usar máximo 3 frames para no exceder límites
-        with open(frame_path, "rb") as f:
-            image_bytes = f.read()
-            images_data.append(
-                {
-                    "mime_type": "image/jpeg",
-                    "data": base64.b64encode(image_bytes).decode(),
-                }
-            )
-
     prompt = """Analiza estas imágenes de un video. Necesito convertir este video de formato horizontal (16:9) a vertical (9:16).
 
 Identifica dónde está el sujeto principal o punto de interés en las imágenes.
@@ -370,29 +1175,18 @@ Responde ÚNICAMENTE con un JSON:
 
 Si hay una persona hablando, indica dónde está. Si no hay persona clara, indica dónde está la acción principal."""
 
+    from google.genai import types
+
     try:
         # Construir el contenido con imágenes
         contents = [prompt]
-        for img in images_data:
-            contents.append(
-                types.Part.from_bytes(
-                    data=base64.b64decode(img["data"]), mime_type=img["mime_type"]
-                )
-            )
+        for frame in frames[:3]:  # Usar máximo 3 frames para no exceder límites
+            contents.append(types.Part.from_bytes(data=frame, mime_type="image/jpeg"))
 
-        response = client.models.generate_content(
-            model=obtener_modelo("texto"), contents=contents
+        texto = generar_texto(
+            client, contents, usar_cache=usar_cache, validar=parsear_json_respuesta
         )
-
-        texto = response.text.strip()
-        if texto.startswith("```json"):
-            texto = texto[7:]
-        if texto.startswith("```"):
-            texto = texto[3:]
-        if texto.endswith("```"):
-            texto = texto[:-3]
-
-        resultado = json.loads(texto.strip())
+        resultado = parsear_json_respuesta(texto)
 
         # Asegurar que sea un diccionario
         if isinstance(resultado, list):
@@ -407,17 +1201,12 @@ Si hay una persona hablando, indica dónde está. Si no hay persona clara, indic
         return {"posicion_horizontal": "centro", "hay_persona": False}
 
 
-def convertir_a_vertical_smart(client, input_path: str, output_path: str) -> str:
+def _crop_x_con_ia(client, input_path: str):
     """
-    Convierte video a vertical usando IA para detectar el sujeto.
-
-    Args:
-        client: Cliente de Gemini
-        input_path: Ruta del video horizontal
-        output_path: Ruta de salida
+    Elige un recorte fijo (izquierda/centro/derecha) preguntando a Gemini.
 
     Returns:
-        Ruta del video convertido
+        Expresión x para el filtro crop, o None si no se pudieron extraer frames
     """
     print("      🧠 Analizando contenido del video con IA...")
 
@@ -425,8 +1214,7 @@ def convertir_a_vertical_smart(client, input_path: str, output_path: str) -> str
     frames = extraer_frames(input_path, num_frames=3)
 
     if not frames:
-        print("      ⚠️ No se pudieron extraer frames, usando crop centro")
-        return convertir_a_vertical(input_path, output_path, "crop")
+        return None
 
     # 2. Analizar con Gemini
     analisis = analizar_posicion_sujeto(client, frames)
@@ -442,11 +1230,49 @@ def convertir_a_vertical_smart(client, input_path: str, output_path: str) -> str
     # Para video 1920x1080 → queremos 607px de ancho para 9:16
     # crop=607:1080:X:0 donde X depende de la posición
     if posicion == "izquierda":
-        crop_x = "0"  # Empezar desde la izquierda
+        return "0"  # Empezar desde la izquierda
     elif posicion == "derecha":
-        crop_x = "in_w-607"  # Desde la derecha
-    else:  # centro
-        crop_x = "(in_w-607)/2"  # Centro
+        return "in_w-607"  # Desde la derecha
+    return "(in_w-607)/2"  # Centro
+
+
+def convertir_a_vertical_smart(
+    client, input_path: str, output_path: str, usar_ia: bool = False
+) -> str:
+    """
+    Convierte video a vertical siguiendo al sujeto.
+
+    Por defecto el recorte se calcula localmente (movimiento y bordes sobre
+    un proxy de baja resolución) y se desplaza segundo a segundo. Con
+    usar_ia, o si NumPy no está instalado, se pide a Gemini una posición fija.
+
+    Args:
+        client: Cliente de Gemini (solo para el análisis con IA)
+        input_path: Ruta del video horizontal
+        output_path: Ruta de salida
+        usar_ia: Usar Gemini en lugar del análisis local
+
+    Returns:
+        Ruta del video convertido
+    """
+    crop_x = None
+    if not usar_ia:
+        print("      🎯 Analizando movimiento del video...")
+        try:
+            trayectoria = analizar_encuadre(input_path)
+            crop_x = f"'{expresion_crop_x(trayectoria)}'"
+            print(f"      📍 Trayectoria de encuadre: {len(trayectoria)} s")
+        except ImportError:
+            print("      ⚠️ NumPy no está instalado, se usa el análisis con IA")
+        except RuntimeError as e:
+            print(f"      ⚠️ {e}")
+
+    if crop_x is None and client is not None:
+        crop_x = _crop_x_con_ia(client, input_path)
+
+    if crop_x is None:
+        print("      ⚠️ No se pudo analizar el video, usando crop centro")
+        return convertir_a_vertical(input_path, output_path, "crop")
 
     filter_complex = f"scale=1920:1080:force_original_aspect_ratio=increase,crop=607:1080:{crop_x}:0,scale=1080:1920"
 
@@ -470,14 +1296,6 @@ def convertir_a_vertical_smart(client, input_path: str, output_path: str) -> str
         output_path,
     ]
 
-    # Limpiar frames temporales
-    for frame in frames:
-        try:
-            os.remove(frame)
-            os.rmdir(os.path.dirname(frame))
-        except:
-            pass
-
     try:
         subprocess.run(cmd, check=True, capture_output=True, text=True)
         return output_path
@@ -513,8 +1331,198 @@ def crear_estructura_shorts(video_id: str) -> dict:
     return rutas
 
 
+def _obtener_clip(url: str, fuente: str, momento: dict, output_path: str) -> str:
+    """
+    Recorta el clip de la fuente local; sin fuente usa la sección en la
+    caché de fuentes, descargándola la primera vez.
+    """
+    if fuente:
+        inicio, fin = _rango_momento(momento)
+        return recortar_clip(
+            fuente,
+            momento.get("inicio_segundos", inicio),
+            momento.get("fin_segundos", fin),
+            output_path,
+        )
+    inicio, fin = _rango_momento(momento)
+    seccion = obtener_seccion(extraer_video_id(url), inicio, fin, url)
+    with usar_fuente(seccion):
+        shutil.copyfile(seccion, output_path)
+    return output_path
+
+
+def _ruta_short(rutas: dict, i: int, momento: dict) -> str:
+    """Ruta del Short final de un momento."""
+    nombre_safe = re.sub(r"[^\w\s-]", "", momento["titulo_sugerido"])[:30]
+    return os.path.join(rutas["shorts"], f"short_{i:02d}_{nombre_safe}.mp4")
+
+
+def _procesar_momentos_lote(
+    momentos: list,
+    rutas: dict,
+    metodo_conversion: str,
+    fuente: str,
+    max_conversiones: int = MAX_CONVERSIONES_CONCURRENTES,
+) -> list:
+    """Genera los Shorts desde la fuente, un ffmpeg por grupo de cortes cercanos."""
+    cortes = []
+    for i, momento in enumerate(momentos, 1):
+        inicio, fin = _rango_momento(momento)
+        cortes.append(
+            (
+                momento.get("inicio_segundos", inicio),
+                momento.get("fin_segundos", fin),
+                _ruta_short(rutas, i, momento),
+            )
+        )
+
+    grupos = agrupar_cortes(cortes)
+    print(
+        f"   📱 Convirtiendo {len(cortes)} clips a vertical "
+        f"({metodo_conversion}) en {len(grupos)} pasada(s)..."
+    )
+    with ThreadPoolExecutor(max_workers=max(1, max_conversiones)) as pool:
+        futuros = [
+            pool.submit(
+                convertir_lote_vertical, fuente, [cortes[k] for k in grupo], metodo_conversion
+            )
+            for grupo in grupos
+        ]
+        for futuro in futuros:
+            futuro.result()
+
+    shorts = []
+    for i, (momento, (_, _, short_final)) in enumerate(zip(momentos, cortes), 1):
+        print(f"   ✅ Short #{i} generado")
+        shorts.append(
+            {
+                "archivo": short_final,
+                "titulo": momento["titulo_sugerido"],
+                "descripcion": momento["descripcion"],
+            }
+        )
+    return shorts
+
+
+def _convertir_momento(
+    client, clip_original: str, short_final: str, metodo_conversion: str
+) -> str:
+    """Convierte un clip descargado a vertical con el método indicado."""
+    if metodo_conversion == "smart":
+        return convertir_a_vertical_smart(client, clip_original, short_final)
+    return convertir_a_vertical(clip_original, short_final, metodo_conversion)
+
+
+def procesar_momentos(
+    client,
+    url: str,
+    momentos: list,
+    rutas: dict,
+    metodo_conversion: str = "blur",
+    max_descargas: int = MAX_DESCARGAS_CONCURRENTES,
+    max_conversiones: int = MAX_CONVERSIONES_CONCURRENTES,
+    fuente: str = None,
+    en_lote: bool = True,
+) -> list:
+    """
+    Descarga y convierte los clips de varios momentos de forma concurrente.
+
+    Las descargas (red) y las conversiones (ffmpeg, CPU) usan pools
+    separados: en cuanto termina la descarga de un clip se encola su
+    conversión, mientras siguen bajando los demás.
+
+    Args:
+        client: Cliente de Gemini (solo se usa con el método 'smart')
+        url: URL del video de YouTube
+        momentos: Momentos devueltos por analizar_momentos_virales
+        rutas: Rutas de crear_estructura_shorts
+        metodo_conversion: 'blur', 'crop' o 'smart'
+        max_descargas: Descargas simultáneas
+        max_conversiones: Conversiones de ffmpeg simultáneas
+        fuente: Video completo ya disponible en disco; si se indica, los
+            clips se recortan de él en lugar de descargarse por secciones
+        en_lote: Con fuente y método 'blur' o 'crop', generar los Shorts
+            cercanos entre sí con una sola decodificación de la fuente
+
+    Returns:
+        Lista de shorts generados, en el orden original de los momentos
+    """
+    if en_lote and fuente and momentos and metodo_conversion in ("blur", "crop"):
+        try:
+            return _procesar_momentos_lote(
+                momentos, rutas, metodo_conversion, fuente, max_conversiones
+            )
+        except RuntimeError as e:
+            print(f"   ⚠️ Falló la conversión en lote, se procesa clip por clip: {e}")
+
+    resultados = [None] * len(momentos)
+
+    with ThreadPoolExecutor(max_workers=max(1, max_descargas)) as pool_descargas, \
+            ThreadPoolExecutor(max_workers=max(1, max_conversiones)) as pool_conversiones:
+        descargas = {}
+        for i, momento in enumerate(momentos, 1):
+            clip_original = os.path.join(
+                rutas["clips_originales"], f"clip_{i:02d}_original.mp4"
+            )
+            accion = "recortando" if fuente else "descargando"
+            print(
+                f"   📥 Short #{i}: {accion} clip "
+                f"{momento['timestamp_inicio']}-{momento['timestamp_fin']}..."
+            )
+            futuro = pool_descargas.submit(
+                _obtener_clip,
+                url,
+                fuente,
+                momento,
+                clip_original,
+            )
+            descargas[futuro] = (i, momento, clip_original)
+
+        conversiones = {}
+        for futuro in as_completed(descargas):
+            i, momento, clip_original = descargas[futuro]
+            try:
+                futuro.result()
+            except RuntimeError as e:
+                print(f"   ❌ Short #{i}: error al obtener el clip: {e}")
+                continue
+            print(f"   ✅ Short #{i}: clip listo")
+
+            short_final = _ruta_short(rutas, i, momento)
+            print(f"   📱 Short #{i}: convirtiendo a vertical ({metodo_conversion})...")
+            futuro_conv = pool_conversiones.submit(
+                _convertir_momento, client, clip_original, short_final, metodo_conversion
+            )
+            conversiones[futuro_conv] = (i, momento, short_final)
+
+        for futuro in as_completed(conversiones):
+            i, momento, short_final = conversiones[futuro]
+            try:
+                futuro.result()
+            except RuntimeError as e:
+                print(f"   ❌ Short #{i}: error al convertir: {e}")
+                continue
+            print(f"   ✅ Short #{i} generado")
+            resultados[i - 1] = {
+                "archivo": short_final,
+                "titulo": momento["titulo_sugerido"],
+                "descripcion": momento["descripcion"],
+            }
+
+    return [r for r in resultados if r is not None]
+
+
 def generar_shorts_desde_url(
-    client, url: str, num_shorts: int = 3, metodo_conversion: str = "blur"
+    client,
+    url: str,
+    num_shorts: int = 3,
+    metodo_conversion: str = "blur",
+    max_descargas: int = MAX_DESCARGAS_CONCURRENTES,
+    max_conversiones: int = MAX_CONVERSIONES_CONCURRENTES,
+    usar_cache_fuente: bool = True,
+    fuente_local: str = None,
+    preseleccion: bool = True,
+    modo_rapido: bool = False,
 ) -> dict:
     """
     Flujo completo: URL → Shorts listos.
@@ -524,6 +1532,15 @@ def generar_shorts_desde_url(
         url: URL del video de YouTube
         num_shorts: Número de shorts a generar
         metodo_conversion: 'blur' o 'crop'
+        max_descargas: Descargas simultáneas de clips
+        max_conversiones: Conversiones de ffmpeg simultáneas
+        usar_cache_fuente: Descargar el video completo una vez a la caché y
+            recortar los clips localmente (False: yt-dlp por secciones)
+        fuente_local: Ruta de un video ya descargado; evita toda descarga
+        preseleccion: En videos largos, enviar a Gemini solo las mejores
+            ventanas según la puntuación local
+        modo_rapido: Elegir los momentos solo con la puntuación local, sin
+            llamar a Gemini (útil sin cuota o sin conexión)
 
     Returns:
         Diccionario con resultados
@@ -550,19 +1567,51 @@ def generar_shorts_desde_url(
         print(f"   ❌ {e}")
         return {"error": str(e)}
 
-    # 4. Formatear transcripción
-    transcripcion_formateada = formatear_transcripcion(transcript)
+    # 4. Formatear transcripción (compacta: una línea por frase)
+    duracion_total = transcript[-1]["start"] if transcript else 0
+    top_k = max(PRESELECCION_TOP_K, num_shorts * 3)
+    tokens_original = estimar_tokens(formatear_transcripcion(transcript))
+    if preseleccion and not modo_rapido and duracion_total > PRESELECCION_MIN_DURACION:
+        transcripcion_formateada = preseleccionar_transcripcion(transcript, top_k)
+        print(f"   🎯 Preselección local: {top_k} ventanas más prometedoras")
+    else:
+        transcripcion_formateada = formatear_transcripcion(
+            compactar_transcripcion(transcript)
+        )
+    tokens_compacta = estimar_tokens(transcripcion_formateada)
+    if tokens_original and not modo_rapido:
+        reduccion = 100 * (1 - tokens_compacta / tokens_original)
+        print(
+            f"   📉 Transcripción compactada: ~{tokens_original:,} → "
+            f"~{tokens_compacta:,} tokens (-{reduccion:.0f}%)"
+        )
 
-    # 5. Analizar con Gemini
+    # 5. Analizar con Gemini (o solo con la puntuación local en modo rápido)
     print(f"\n🧠 Analizando contenido para encontrar {num_shorts} momentos virales...")
-    try:
-        momentos = analizar_momentos_virales(
-            client, transcripcion_formateada, num_shorts
-        )
-        print(f"   ✅ {len(momentos)} momentos identificados")
-    except RuntimeError as e:
-        print(f"   ❌ {e}")
-        return {"error": str(e)}
+    if modo_rapido:
+        momentos = momentos_locales(transcript, num_shorts)
+        print(f"   ⚡ Modo rápido: {len(momentos)} momentos elegidos sin IA")
+    else:
+        try:
+            momentos = analizar_momentos_virales(
+                client, transcripcion_formateada, num_shorts
+            )
+            print(f"   ✅ {len(momentos)} momentos identificados")
+        except RuntimeError as e:
+            print(f"   ❌ {e}")
+            momentos = momentos_locales(transcript, num_shorts)
+            if not momentos:
+                return {"error": str(e)}
+            print(f"   ⚡ Usando {len(momentos)} momentos de la puntuación local")
+
+    # Llevar los límites a los fragmentos originales de la transcripción
+    momentos = descartar_momentos_invalidos(momentos)
+    if not momentos:
+        momentos = momentos_locales(transcript, num_shorts)
+        if not momentos:
+            return {"error": "Ningún momento tiene timestamps válidos"}
+        print(f"   ⚡ Usando {len(momentos)} momentos de la puntuación local")
+    ajustar_limites_momentos(momentos, transcript)
 
     # 6. Mostrar momentos encontrados
     print("\n📋 MOMENTOS VIRALES DETECTADOS:")
@@ -581,55 +1630,47 @@ def generar_shorts_desde_url(
         print("❌ Operación cancelada")
         return {"momentos": momentos, "cancelado": True}
 
-    # 8. Descargar y convertir cada clip
-    shorts_generados = []
-
-    for i, momento in enumerate(momentos, 1):
-        print(f"\n🎬 Procesando Short #{i}...")
-
-        # Descargar clip original
-        clip_original = os.path.join(
-            rutas["clips_originales"], f"clip_{i:02d}_original.mp4"
-        )
-        print(
-            f"   📥 Descargando clip {momento['timestamp_inicio']}-{momento['timestamp_fin']}..."
-        )
-
-        try:
-            descargar_clip(
-                url,
-                momento["timestamp_inicio"],
-                momento["timestamp_fin"],
-                clip_original,
+    # 8. Obtener el video fuente (una sola descarga para todos los clips)
+    fuente = None
+    if fuente_local:
+        if not os.path.isfile(fuente_local):
+            return {"momentos": momentos, "error": f"No existe el archivo: {fuente_local}"}
+        fuente = fuente_local
+        print(f"\n📂 Usando video local: {fuente}")
+    elif usar_cache_fuente:
+        if os.path.exists(ruta_fuente(video_id)) or conviene_fuente_completa(
+            duracion_total, len(momentos)
+        ):
+            print("\n📥 Obteniendo video fuente (caché local)...")
+            try:
+                fuente = obtener_fuente(video_id, url)
+                print(f"   ✅ {fuente}")
+            except RuntimeError as e:
+                print(f"   ⚠️  {e}")
+                print("   Se descargarán los clips por secciones")
+        else:
+            print(
+                f"\n📥 Video largo (~{duracion_total / 60:.0f} min) con "
+                f"{len(momentos)} momentos: se descargan solo las secciones "
+                "(quedan en la caché)"
             )
-            print("   ✅ Clip descargado")
-        except RuntimeError as e:
-            print(f"   ❌ Error: {e}")
-            continue
-
-        # Convertir a vertical
-        nombre_safe = re.sub(r"[^\w\s-]", "", momento["titulo_sugerido"])[:30]
-        short_final = os.path.join(rutas["shorts"], f"short_{i:02d}_{nombre_safe}.mp4")
 
-        print(f"   📱 Convirtiendo a formato vertical ({metodo_conversion})...")
-        try:
-            if metodo_conversion == "smart":
-                convertir_a_vertical_smart(client, clip_original, short_final)
-            else:
-                convertir_a_vertical(clip_original, short_final, metodo_conversion)
-            print("   ✅ Short generado")
-            shorts_generados.append(
-                {
-                    "archivo": short_final,
-                    "titulo": momento["titulo_sugerido"],
-                    "descripcion": momento["descripcion"],
-                }
-            )
-        except RuntimeError as e:
-            print(f"   ❌ Error: {e}")
-            continue
+    # 9. Obtener y convertir los clips (descargas y conversiones solapadas)
+    print()
+    # La fuente de la caché queda protegida de la poda mientras se recorta
+    with usar_fuente(fuente) if fuente and not fuente_local else nullcontext():
+        shorts_generados = procesar_momentos(
+            client,
+            url,
+            momentos,
+            rutas,
+            metodo_conversion,
+            max_descargas=max_descargas,
+            max_conversiones=max_conversiones,
+            fuente=fuente,
+        )
 
-    # 9. Guardar metadata
+    # 10. Guardar metadata
     metadata = {
         "video_id": video_id,
         "url_original": url,
@@ -641,7 +1682,7 @@ def generar_shorts_desde_url(
     with open(metadata_path, "w", encoding="utf-8") as f:
         json.dump(metadata, f, indent=2, ensure_ascii=False)
 
-    # 10. Resumen final
+    # 11. Resumen final
     print("\n" + "=" * 50)
     print("✅ SHORTS GENERADOS")
     print("=" * 50)
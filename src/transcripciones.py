@@ -0,0 +1,92 @@
+"""
+Caché local de transcripciones de YouTube
+"""
+
+import os
+import json
+import gzip
+from .config import BASE_DIR
+
+TRANSCRIPCIONES_DIR = os.path.join(BASE_DIR, "cache", "transcripciones")
+
+
+def _carpeta(video_id: str) -> str:
+    return os.path.join(TRANSCRIPCIONES_DIR, video_id)
+
+
+def _clave_idiomas(idiomas: list) -> str:
+    return ",".join(idiomas)
+
+
+def _leer_indice(video_id: str) -> dict:
+    try:
+        with open(os.path.join(_carpeta(video_id), "indice.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _escribir_atomico(path: str, datos: bytes):
+    temporal = f"{path}.{os.getpid()}.part"
+    with open(temporal, "wb") as f:
+        f.write(datos)
+    os.replace(temporal, path)
+
+
+def leer_transcripcion_cache(video_id: str, idiomas: list):
+    """
+    Busca una transcripción guardada para el video y los idiomas pedidos.
+
+    Args:
+        video_id: ID del video
+        idiomas: Lista de idiomas preferidos, en el orden de la petición
+
+    Returns:
+        Tupla (idioma, segmentos), o None si no está en la caché
+    """
+    indice = _leer_indice(video_id)
+    idioma = indice.get("peticiones", {}).get(_clave_idiomas(idiomas))
+    if idioma is None:
+        # Sin una petición previa igual solo vale el idioma preferido: otro
+        # idioma guardado podría no ser el que resolvería YouTube ahora
+        if idiomas and idiomas[0] in indice.get("idiomas", []):
+            idioma = idiomas[0]
+    if idioma is None:
+        return None
+
+    try:
+        with gzip.open(os.path.join(_carpeta(video_id), f"{idioma}.json.gz"), "rt", encoding="utf-8") as f:
+            return idioma, json.load(f)["segmentos"]
+    except (FileNotFoundError, OSError, json.JSONDecodeError, KeyError):
+        return None
+
+
+def guardar_transcripcion_cache(
+    video_id: str, idiomas: list, idioma: str, segmentos: list
+):
+    """
+    Guarda una transcripción comprimida y anota qué idioma resolvió la petición.
+
+    Args:
+        video_id: ID del video
+        idiomas: Idiomas pedidos
+        idioma: Código del idioma obtenido
+        segmentos: Lista de segmentos con 'text', 'start', 'duration'
+    """
+    carpeta = _carpeta(video_id)
+    os.makedirs(carpeta, exist_ok=True)
+
+    contenido = json.dumps(
+        {"video_id": video_id, "idioma": idioma, "segmentos": segmentos},
+        ensure_ascii=False,
+    ).encode("utf-8")
+    _escribir_atomico(os.path.join(carpeta, f"{idioma}.json.gz"), gzip.compress(contenido))
+
+    indice = _leer_indice(video_id)
+    indice.setdefault("peticiones", {})[_clave_idiomas(idiomas)] = idioma
+    if idioma not in indice.setdefault("idiomas", []):
+        indice["idiomas"].append(idioma)
+    _escribir_atomico(
+        os.path.join(carpeta, "indice.json"),
+        json.dumps(indice, indent=2, ensure_ascii=False).encode("utf-8"),
+    )
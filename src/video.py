@@ -5,20 +5,40 @@ Creación de video con FFmpeg
 import os
 import json
 import random
+import hashlib
+import shutil
+import tempfile
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from .audio import obtener_duracion_audio
+from .medios import actualizar_indice_medios, buscar_videos
 
 
 # Ruta base del proyecto
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
+# Configuración de videos ya leída: (mtime del archivo, config)
+_config_videos = None
+
+
 def cargar_config_videos() -> dict:
-    """Carga la configuración de videos base."""
+    """
+    Carga la configuración de videos base.
+
+    Se mantiene en memoria y solo se vuelve a leer si el archivo cambió.
+    """
+    global _config_videos
     config_path = os.path.join(BASE_DIR, "config_videos.json")
-    if os.path.exists(config_path):
-        with open(config_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+    try:
+        mtime = os.stat(config_path).st_mtime
+    except FileNotFoundError:
+        mtime = None
+    if mtime is not None:
+        if _config_videos is None or _config_videos[0] != mtime:
+            with open(config_path, "r", encoding="utf-8") as f:
+                _config_videos = (mtime, json.load(f))
+        return _config_videos[1]
     return {
         "carpeta_videos": "videos_base",
         "categorias": {},
@@ -40,17 +60,18 @@ def obtener_video_base(categoria: str = None) -> str:
     """
     config = cargar_config_videos()
     carpeta = os.path.join(BASE_DIR, config["carpeta_videos"])
+    actualizar_indice_medios(config)
     
     # Usar categoría default si no se especifica
     if categoria is None:
         categoria = config.get("categoria_default", "paisaje")
     
-    # Obtener archivos de la categoría
+    # Obtener archivos de la categoría (si no existe, todos los de la carpeta)
     if categoria in config.get("categorias", {}):
-        archivos = config["categorias"][categoria].get("archivos", [])
+        videos = buscar_videos(categoria)
     else:
-        # Si no existe la categoría, buscar todos los mp4 en la carpeta
-        archivos = [f for f in os.listdir(carpeta) if f.endswith(".mp4")]
+        videos = buscar_videos()
+    archivos = [v["archivo"] for v in videos]
     
     if not archivos:
         raise RuntimeError(f"No se encontraron videos en la categoría '{categoria}'")
@@ -73,12 +94,11 @@ def obtener_video_base(categoria: str = None) -> str:
 def listar_videos_disponibles() -> dict:
     """Lista todos los videos disponibles por categoría."""
     config = cargar_config_videos()
-    carpeta = os.path.join(BASE_DIR, config["carpeta_videos"])
+    actualizar_indice_medios(config)
     
     resultado = {}
     for cat_nombre, cat_info in config.get("categorias", {}).items():
-        archivos = cat_info.get("archivos", [])
-        existentes = [f for f in archivos if os.path.exists(os.path.join(carpeta, f))]
+        existentes = [v["archivo"] for v in buscar_videos(cat_nombre)]
         resultado[cat_nombre] = {
             "descripcion": cat_info.get("descripcion", ""),
             "total": len(existentes),
@@ -88,7 +108,113 @@ def listar_videos_disponibles() -> dict:
     return resultado
 
 
-def crear_video_con_loop(video_base: str, audio_path: str, output_path: str) -> str:
+# Caché de videos base normalizados ("mezzanine")
+MEZZANINE_DIR = os.path.join(BASE_DIR, "cache", "mezzanine")
+MEZZANINE_ANCHO = 1920
+MEZZANINE_ALTO = 1080
+MEZZANINE_FPS = 30
+MEZZANINE_GOP = 60  # Un keyframe cada 2 segundos
+
+
+def hash_archivo(path: str) -> str:
+    """
+    Calcula el SHA-256 del contenido de un archivo.
+    El resultado se memoriza por (ruta, tamaño, mtime) para no volver a
+    leer archivos grandes que no cambiaron.
+
+    Args:
+        path: Ruta del archivo
+
+    Returns:
+        Hash en hexadecimal
+    """
+    os.makedirs(MEZZANINE_DIR, exist_ok=True)
+    indice_path = os.path.join(MEZZANINE_DIR, "hashes.json")
+    try:
+        with open(indice_path, "r", encoding="utf-8") as f:
+            indice = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        indice = {}
+
+    ruta = os.path.abspath(path)
+    stat = os.stat(ruta)
+    entrada = indice.get(ruta)
+    if entrada and entrada["tamano"] == stat.st_size and entrada["mtime"] == stat.st_mtime:
+        return entrada["sha256"]
+
+    h = hashlib.sha256()
+    with open(ruta, "rb") as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(bloque)
+
+    indice[ruta] = {"tamano": stat.st_size, "mtime": stat.st_mtime, "sha256": h.hexdigest()}
+    temporal = f"{indice_path}.{os.getpid()}.part"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(indice, f, indent=2)
+    os.replace(temporal, indice_path)
+
+    return indice[ruta]["sha256"]
+
+
+def obtener_mezzanine(video_base: str) -> str:
+    """
+    Devuelve la versión normalizada de un video base, creándola si hace falta.
+
+    El mezzanine tiene resolución, fps y GOP fijos con GOPs cerrados, sin
+    audio, y se guarda por hash de contenido: se codifica una sola vez y
+    luego se puede repetir o concatenar copiando el stream.
+
+    Args:
+        video_base: Ruta del video base original
+
+    Returns:
+        Ruta del mezzanine en la caché
+    """
+    nombre = (
+        f"{hash_archivo(video_base)[:32]}_{MEZZANINE_ANCHO}x{MEZZANINE_ALTO}"
+        f"_{MEZZANINE_FPS}fps_g{MEZZANINE_GOP}.mp4"
+    )
+    mezzanine_path = os.path.join(MEZZANINE_DIR, nombre)
+    if os.path.exists(mezzanine_path):
+        return mezzanine_path
+
+    print(f"   🧱 Normalizando video base (solo la primera vez): {os.path.basename(video_base)}")
+    temporal = f"{mezzanine_path}.{os.getpid()}.part.mp4"
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-i", video_base,
+        "-an",
+        "-vf",
+        f"scale={MEZZANINE_ANCHO}:{MEZZANINE_ALTO}:force_original_aspect_ratio=decrease,"
+        f"pad={MEZZANINE_ANCHO}:{MEZZANINE_ALTO}:(ow-iw)/2:(oh-ih)/2,setsar=1,"
+        f"fps={MEZZANINE_FPS},format=yuv420p",
+        "-c:v", "libx264",
+        "-preset", "medium",
+        "-crf", "20",
+        "-g", str(MEZZANINE_GOP),
+        "-keyint_min", str(MEZZANINE_GOP),
+        "-sc_threshold", "0",
+        "-flags", "+cgop",
+        "-movflags", "+faststart",
+        temporal,
+    ]
+    try:
+        subprocess.run(cmd, capture_output=True, text=True, check=True)
+    except subprocess.CalledProcessError as e:
+        try:
+            os.remove(temporal)
+        except OSError:
+            pass
+        raise RuntimeError(f"Error al normalizar el video base: {e.stderr}") from e
+
+    os.replace(temporal, mezzanine_path)
+    return mezzanine_path
+
+
+def crear_video_con_loop(
+    video_base: str, audio_path: str, output_path: str, usar_mezzanine: bool = True
+) -> str:
     """
     Crea un video repitiendo el video base hasta cubrir la duración del audio.
     
@@ -96,6 +222,9 @@ def crear_video_con_loop(video_base: str, audio_path: str, output_path: str) ->
         video_base: Ruta del video base a repetir (loop)
         audio_path: Ruta del archivo de audio
         output_path: Ruta donde guardar el video final
+        usar_mezzanine: Si es True, repite la versión normalizada en caché
+                        copiando el stream (solo se codifica el audio);
+                        si es False, recodifica todo el video como antes
     
     Returns:
         Ruta del video generado
@@ -118,6 +247,13 @@ def crear_video_con_loop(video_base: str, audio_path: str, output_path: str) ->
     print(f"   📹 Video base: {os.path.basename(video_base)}")
     print(f"   🔊 Duración del audio: {duracion_audio:.1f}s")
     
+    if usar_mezzanine:
+        video_entrada = obtener_mezzanine(video_base)
+        codec_video = ["-c:v", "copy"]  # Sin recodificar: solo muxing
+    else:
+        video_entrada = video_base
+        codec_video = ["-c:v", "libx264", "-preset", "medium", "-crf", "23", "-pix_fmt", "yuv420p"]
+    
     # Comando FFmpeg para loop del video + audio
     # -stream_loop -1: repite el video infinitamente
     # -shortest: corta cuando termina el audio
@@ -125,18 +261,15 @@ def crear_video_con_loop(video_base: str, audio_path: str, output_path: str) ->
         "ffmpeg",
         "-y",  # Sobrescribir sin preguntar
         "-stream_loop", "-1",  # Loop infinito del video
-        "-i", video_base,  # Video de entrada
+        "-i", video_entrada,  # Video de entrada
         "-i", audio_path,  # Audio de entrada
         "-map", "0:v",  # Usar video del primer input
         "-map", "1:a",  # Usar audio del segundo input
-        "-c:v", "libx264",  # Codec de video
-        "-preset", "medium",
-        "-crf", "23",
+        *codec_video,
         "-c:a", "aac",  # Codec de audio
         "-b:a", "192k",
         "-shortest",  # Terminar cuando acabe el audio
         "-movflags", "+faststart",
-        "-pix_fmt", "yuv420p",
         output_path
     ]
     
@@ -149,18 +282,176 @@ def crear_video_con_loop(video_base: str, audio_path: str, output_path: str) ->
         raise RuntimeError(f"Error al crear video con FFmpeg: {e.stderr}") from e
 
 
-def crear_video_desde_audio(audio_path: str, output_path: str, categoria: str = None) -> str:
+def planificar_clips_fondo(categoria: str, duracion_objetivo: float) -> list:
+    """
+    Elige varios clips de la categoría hasta cubrir la duración objetivo.
+
+    Usa las duraciones del índice de medios, recorre los clips en orden
+    aleatorio antes de repetir ninguno y evita el mismo clip dos veces
+    seguidas.
+
+    Args:
+        categoria: Categoría de video (None = default)
+        duracion_objetivo: Segundos a cubrir (normalmente la del audio)
+
+    Returns:
+        Lista ordenada de dicts del índice, con la clave extra 'ruta'
+    """
+    config = cargar_config_videos()
+    carpeta = os.path.join(BASE_DIR, config["carpeta_videos"])
+    actualizar_indice_medios(config)
+
+    if categoria is None:
+        categoria = config.get("categoria_default", "paisaje")
+    if categoria in config.get("categorias", {}):
+        videos = buscar_videos(categoria)
+    else:
+        videos = buscar_videos()
+
+    disponibles = [v for v in videos if v["duracion"] and v["duracion"] > 0]
+    if not disponibles:
+        raise RuntimeError(f"No se encontraron videos con duración conocida en '{categoria}'")
+    for video in disponibles:
+        video["ruta"] = os.path.join(carpeta, video["archivo"])
+
+    plan = []
+    total = 0.0
+    tanda = []
+    while total < duracion_objetivo:
+        if not tanda:
+            tanda = disponibles[:]
+            random.shuffle(tanda)
+            if plan and len(tanda) > 1 and tanda[-1]["archivo"] == plan[-1]["archivo"]:
+                tanda.insert(0, tanda.pop())  # Evitar repetir el último clip
+        video = tanda.pop()
+        plan.append(video)
+        total += video["duracion"]
+
+    return plan
+
+
+def crear_video_multiclip(clips: list, audio_path: str, output_path: str) -> str:
+    """
+    Une varios clips de fondo en una sola pasada de concat con el audio.
+
+    Si todos los clips son H.264 con la misma resolución, fps, pix_fmt,
+    perfil y nivel, y ninguno tiene edit list (primer frame en t=0), se
+    copian tal cual; si no, se usan sus mezzanines normalizados (que
+    siempre coinciden). En ambos casos el video no se recodifica.
+
+    Args:
+        clips: Lista de dicts de planificar_clips_fondo
+        audio_path: Ruta del archivo de audio
+        output_path: Ruta donde guardar el video final
+
+    Returns:
+        Ruta del video generado
+    """
+    formatos = {
+        (
+            c["codec"],
+            c["ancho"],
+            c["alto"],
+            round(c["fps"] or 0, 2),
+            c["pix_fmt"],
+            c["perfil"],
+            c["nivel"],
+        )
+        for c in clips
+    }
+    sin_edit_list = all(
+        c["inicio"] is not None and abs(c["inicio"]) < 0.001 for c in clips
+    )
+    if (
+        len(formatos) == 1
+        and next(iter(formatos))[0] == "h264"
+        and None not in next(iter(formatos))
+        and sin_edit_list
+    ):
+        entradas = [c["ruta"] for c in clips]
+    else:
+        normalizados = {}
+        for c in clips:
+            if c["ruta"] not in normalizados:
+                normalizados[c["ruta"]] = obtener_mezzanine(c["ruta"])
+        entradas = [normalizados[c["ruta"]] for c in clips]
+
+    with tempfile.NamedTemporaryFile(
+        mode="w", suffix=".txt", delete=False, encoding="utf-8"
+    ) as f:
+        lista_path = f.name
+        for entrada in entradas:
+            entrada_escaped = os.path.abspath(entrada).replace("'", "'\\''")
+            f.write(f"file '{entrada_escaped}'\n")
+
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-f", "concat",
+        "-safe", "0",
+        "-i", lista_path,
+        "-i", audio_path,
+        "-map", "0:v",
+        "-map", "1:a",
+        "-c:v", "copy",
+        "-c:a", "aac",
+        "-b:a", "192k",
+        "-shortest",
+        "-movflags", "+faststart",
+        output_path,
+    ]
+
+    try:
+        print(f"   🔄 Uniendo {len(clips)} clips de fondo...")
+        subprocess.run(cmd, capture_output=True, text=True, check=True)
+        print(f"   ✅ Video generado: {os.path.basename(output_path)}")
+        return output_path
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Error al crear video con FFmpeg: {e.stderr}") from e
+    finally:
+        try:
+            os.remove(lista_path)
+        except OSError:
+            pass
+
+
+def crear_video_desde_audio(
+    audio_path: str, output_path: str, categoria: str = None, multiclip: bool = True
+) -> str:
     """
-    Crea un video usando un video base en loop + el audio proporcionado.
+    Crea un video usando videos base de fondo + el audio proporcionado.
     
     Args:
         audio_path: Ruta del archivo de audio
         output_path: Ruta donde guardar el video final
         categoria: Categoría de video a usar (ej: 'paisaje')
+        multiclip: Si es True, combina varios clips de la categoría hasta
+                   cubrir el audio; si es False, repite uno solo en loop
     
     Returns:
         Ruta del video generado
     """
+    if multiclip:
+        if not verificar_ffmpeg():
+            raise RuntimeError("FFmpeg no está instalado.")
+        if not os.path.exists(audio_path):
+            raise RuntimeError(f"Audio no encontrado: {audio_path}")
+
+        duracion_audio = obtener_duracion_audio(audio_path)
+        try:
+            plan = planificar_clips_fondo(categoria, duracion_audio)
+        except RuntimeError as e:
+            print(f"   ⚠️  {e}; se usará un solo video en loop")
+            plan = []
+
+        if len({c["archivo"] for c in plan}) > 1:
+            print(f"   🔊 Duración del audio: {duracion_audio:.1f}s")
+            print(f"   📹 Fondo: {len(plan)} clips ({len({c['archivo'] for c in plan})} distintos)")
+            return crear_video_multiclip(plan, audio_path, output_path)
+        if plan:
+            # Un único clip disponible: el loop con mezzanine es lo más barato
+            return crear_video_con_loop(plan[0]["ruta"], audio_path, output_path)
+
     video_base = obtener_video_base(categoria)
     return crear_video_con_loop(video_base, audio_path, output_path)
 
@@ -174,7 +465,18 @@ def verificar_ffmpeg() -> bool:
         return False
 
 
-def crear_video(imagenes: list, audio_path: str, output_path: str) -> str:
+# Parámetros del render por segmentos
+FPS_VIDEO = 30
+DURACION_FADE = 0.5
+
+
+def crear_video(
+    imagenes: list,
+    audio_path: str,
+    output_path: str,
+    modo: str = "paralelo",
+    max_procesos: int = None,
+) -> str:
     """
     Crea un video a partir de imágenes y audio usando FFmpeg.
 
@@ -182,6 +484,10 @@ def crear_video(imagenes: list, audio_path: str, output_path: str) -> str:
         imagenes: Lista de rutas de imágenes
         audio_path: Ruta del archivo de audio
         output_path: Ruta donde guardar el video
+        modo: 'paralelo' (un clip por imagen en paralelo + concat sin
+              recodificar) o 'filtro' (un único filter_complex)
+        max_procesos: Procesos FFmpeg simultáneos en modo paralelo
+                      (default: número de núcleos)
 
     Returns:
         Ruta del video generado
@@ -206,6 +512,143 @@ def crear_video(imagenes: list, audio_path: str, output_path: str) -> str:
     print(f"   Imágenes: {len(imagenes_validas)}")
     print(f"   Duración por imagen: {duracion_por_imagen:.1f}s")
 
+    if modo == "filtro":
+        return _crear_video_filtro(
+            imagenes_validas, audio_path, output_path, duracion_por_imagen
+        )
+    return _crear_video_paralelo(
+        imagenes_validas, audio_path, output_path, duracion_audio, max_procesos
+    )
+
+
+def _renderizar_segmento(imagen: str, frames: int, clip_path: str, hilos: int) -> str:
+    """
+    Codifica una imagen como clip de video con fade de entrada y salida.
+
+    Args:
+        imagen: Ruta de la imagen
+        frames: Número exacto de frames del clip
+        clip_path: Ruta del clip a generar
+        hilos: Hilos que puede usar el codificador
+
+    Returns:
+        Ruta del clip generado
+    """
+    duracion = frames / FPS_VIDEO
+    fade = min(DURACION_FADE, duracion / 2)
+    filtro = (
+        "scale=1920:1080:force_original_aspect_ratio=decrease,"
+        "pad=1920:1080:(ow-iw)/2:(oh-ih)/2,setsar=1,"
+        f"fade=t=in:st=0:d={fade},fade=t=out:st={duracion - fade}:d={fade},"
+        "format=yuv420p"
+    )
+    cmd = [
+        "ffmpeg",
+        "-y",
+        "-loop", "1",
+        "-framerate", str(FPS_VIDEO),
+        "-i", imagen,
+        "-vf", filtro,
+        "-frames:v", str(frames),
+        "-c:v", "libx264",
+        "-preset", "medium",
+        "-crf", "23",
+        "-threads", str(hilos),
+        "-an",
+        clip_path,
+    ]
+    try:
+        subprocess.run(cmd, capture_output=True, text=True, check=True)
+        return clip_path
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(
+            f"Error al renderizar {os.path.basename(imagen)}: {e.stderr}"
+        ) from e
+
+
+def _crear_video_paralelo(
+    imagenes: list,
+    audio_path: str,
+    output_path: str,
+    duracion_audio: float,
+    max_procesos: int = None,
+) -> str:
+    """
+    Renderiza cada imagen como un clip independiente en paralelo y luego
+    los une con el demuxer concat (copia de stream) junto al audio.
+    """
+    num = len(imagenes)
+    nucleos = os.cpu_count() or 1
+    procesos = max(1, min(max_procesos or nucleos, num))
+    hilos = max(1, nucleos // procesos)
+
+    # Cortes en frames exactos para que la suma coincida con el audio
+    total_frames = max(num, round(duracion_audio * FPS_VIDEO))
+    cortes = [round(i * total_frames / num) for i in range(num + 1)]
+
+    carpeta_tmp = tempfile.mkdtemp(
+        prefix="segmentos_", dir=os.path.dirname(os.path.abspath(output_path))
+    )
+    clips = [os.path.join(carpeta_tmp, f"seg_{i:04d}.mp4") for i in range(num)]
+
+    try:
+        print(f"   🧩 Renderizando {num} segmentos ({procesos} procesos FFmpeg)...")
+        with ThreadPoolExecutor(max_workers=procesos) as executor:
+            futuros = [
+                executor.submit(
+                    _renderizar_segmento,
+                    img,
+                    max(1, cortes[i + 1] - cortes[i]),
+                    clips[i],
+                    hilos,
+                )
+                for i, img in enumerate(imagenes)
+            ]
+            for futuro in futuros:
+                futuro.result()
+
+        lista_path = os.path.join(carpeta_tmp, "lista.txt")
+        with open(lista_path, "w", encoding="utf-8") as f:
+            for clip in clips:
+                clip_escaped = clip.replace("'", "'\\''")
+                f.write(f"file '{clip_escaped}'\n")
+
+        cmd = [
+            "ffmpeg",
+            "-y",
+            "-f", "concat",
+            "-safe", "0",
+            "-i", lista_path,
+            "-i", audio_path,
+            "-map", "0:v",
+            "-map", "1:a",
+            "-c:v", "copy",
+            "-c:a", "aac",
+            "-b:a", "192k",
+            "-shortest",
+            "-movflags", "+faststart",
+            output_path,
+        ]
+
+        print("   🔗 Uniendo segmentos con el audio...")
+        try:
+            subprocess.run(cmd, capture_output=True, text=True, check=True)
+        except subprocess.CalledProcessError as e:
+            raise RuntimeError(f"Error al crear video con FFmpeg: {e.stderr}") from e
+        return output_path
+
+    finally:
+        shutil.rmtree(carpeta_tmp, ignore_errors=True)
+
+
+def _crear_video_filtro(
+    imagenes_validas: list, audio_path: str, output_path: str, duracion_por_imagen: float
+) -> str:
+    """
+    Crea el video con un único filter_complex (una entrada por imagen).
+    Útil para pocas imágenes; con muchas se queda sin memoria o supera
+    el largo máximo de la línea de comandos.
+    """
     # Construir los inputs de imágenes
     inputs = []
     filter_parts = []
@@ -4,10 +4,6 @@ Subida de videos a YouTube
 
 import os
 import pickle
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
 from .config import BASE_DIR
 
 # Scopes necesarios: subir videos + leer info de canales
@@ -28,6 +24,9 @@ def obtener_credenciales_youtube():
     Returns:
         Credenciales de YouTube
     """
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from google.auth.transport.requests import Request
+
     credentials = None
     token_path = os.path.join(BASE_DIR, "youtube_token.pickle")
 
@@ -148,6 +147,9 @@ def subir_video_youtube(
     Returns:
         URL del video subido
     """
+    from googleapiclient.discovery import build
+    from googleapiclient.http import MediaFileUpload
+
     print("\n📤 SUBIENDO VIDEO A YOUTUBE...")
 
     credentials = obtener_credenciales_youtube()
@@ -0,0 +1,76 @@
+import pytest
+
+from src import cache
+
+
+@pytest.fixture
+def cache_temporal(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(cache, "CACHE_DB", str(tmp_path / "gemini_texto.sqlite"))
+    reloj = [1000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: reloj[0])
+    return reloj
+
+
+def test_clave_estable_y_sin_orden_de_config():
+    a = cache.clave_cache("modelo", "prompt", {"temperature": 0.2, "top_p": 0.9})
+    b = cache.clave_cache("modelo", "prompt", {"top_p": 0.9, "temperature": 0.2})
+    assert a == b
+    assert len(a) == 64
+
+
+def test_clave_distingue_modelo_contenido_y_config():
+    base = cache.clave_cache("modelo", "prompt", {"temperature": 0.2})
+    assert cache.clave_cache("otro", "prompt", {"temperature": 0.2}) != base
+    assert cache.clave_cache("modelo", "prompt2", {"temperature": 0.2}) != base
+    assert cache.clave_cache("modelo", "prompt", {"temperature": 0.3}) != base
+    assert cache.clave_cache("modelo", "prompt") != base
+
+
+def test_clave_no_confunde_listas_concatenadas():
+    assert cache.clave_cache("m", ["ab", "c"]) != cache.clave_cache("m", ["a", "bc"])
+    assert cache.clave_cache("m", ["1"]) != cache.clave_cache("m", [1])
+
+
+def test_guardar_y_leer(cache_temporal):
+    cache.guardar_cache("k", "modelo", "respuesta")
+    assert cache.leer_cache("k") == "respuesta"
+    assert cache.leer_cache("otra") is None
+
+
+def test_entrada_caducada(cache_temporal, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_MAX_EDAD", 100)
+    cache.guardar_cache("k", "modelo", "respuesta")
+    cache_temporal[0] += 101
+    assert cache.leer_cache("k") is None
+
+
+def test_expulsa_la_menos_usada(cache_temporal, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_MAX_BYTES", 10)
+    cache.guardar_cache("a", "modelo", "aaaa")
+    cache_temporal[0] += 1
+    cache.guardar_cache("b", "modelo", "bbbb")
+    cache_temporal[0] += 1
+    assert cache.leer_cache("a") == "aaaa"  # "a" pasa a ser la más reciente
+    cache_temporal[0] += 1
+    cache.guardar_cache("c", "modelo", "cccc")
+
+    assert cache.leer_cache("b") is None
+    assert cache.leer_cache("a") == "aaaa"
+    assert cache.leer_cache("c") == "cccc"
+
+
+def test_podar_respeta_el_limite(cache_temporal, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_MAX_BYTES", 12)
+    for i in range(6):
+        cache.guardar_cache(f"k{i}", "modelo", "x" * 5)
+        cache_temporal[0] += 1
+
+    conn = cache._conectar()
+    try:
+        claves = [c for (c,) in conn.execute("SELECT clave FROM respuestas ORDER BY clave")]
+        total = conn.execute("SELECT SUM(tamano) FROM respuestas").fetchone()[0]
+    finally:
+        conn.close()
+    assert claves == ["k4", "k5"]
+    assert total <= 12
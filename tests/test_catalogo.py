@@ -0,0 +1,81 @@
+import json
+import os
+
+import pytest
+
+from src import catalogo
+
+
+def _crear_proyecto(carpeta, nombre, tema, fecha, estado="completado"):
+    raiz = carpeta / nombre
+    raiz.mkdir()
+    with open(raiz / "proyecto.json", "w", encoding="utf-8") as f:
+        json.dump({"tema": tema, "estado": estado, "fecha_creacion": fecha}, f)
+    return raiz
+
+
+@pytest.fixture
+def proyectos(tmp_path, monkeypatch):
+    carpeta = tmp_path / "proyectos"
+    carpeta.mkdir()
+    monkeypatch.setattr(catalogo, "PROYECTOS_DIR", str(carpeta))
+    monkeypatch.setattr(catalogo, "CATALOGO_DB", str(tmp_path / "cache" / "proyectos.sqlite"))
+    return carpeta
+
+
+def test_tema_con_comodines_se_busca_literal(proyectos):
+    _crear_proyecto(proyectos, "p1", "Descuentos del 100% en tecnología", "2025-01-01 10:00:00")
+    _crear_proyecto(proyectos, "p2", "Del 1000 al 100 en un año", "2025-01-02 10:00:00")
+    _crear_proyecto(proyectos, "p3", "mi_tema con guion bajo", "2025-01-03 10:00:00")
+    _crear_proyecto(proyectos, "p4", "mi tema con espacio", "2025-01-04 10:00:00")
+    _crear_proyecto(proyectos, "p5", "ruta C:\\videos", "2025-01-05 10:00:00")
+    catalogo.sincronizar_catalogo()
+
+    assert [p["nombre"] for p in catalogo.buscar_proyectos(tema="100%")] == ["p1"]
+    assert [p["nombre"] for p in catalogo.buscar_proyectos(tema="mi_tema")] == ["p3"]
+    assert [p["nombre"] for p in catalogo.buscar_proyectos(tema="C:\\v")] == ["p5"]
+    assert catalogo.contar_proyectos(tema="%") == 1
+    assert catalogo.contar_proyectos(tema="_") == 1
+    assert catalogo.contar_proyectos(tema="MI TEMA") == 1
+
+
+def test_paginacion_del_mas_reciente_al_mas_antiguo(proyectos):
+    for i in range(7):
+        _crear_proyecto(proyectos, f"p{i}", f"tema {i}", f"2025-01-0{i + 1} 10:00:00")
+    catalogo.sincronizar_catalogo()
+
+    paginas = [
+        [p["nombre"] for p in catalogo.buscar_proyectos(limite=3, desplazamiento=d)]
+        for d in (0, 3, 6, 9)
+    ]
+    assert paginas == [["p6", "p5", "p4"], ["p3", "p2", "p1"], ["p0"], []]
+    assert catalogo.contar_proyectos() == 7
+    assert len(catalogo.buscar_proyectos()) == 7
+
+
+def test_filtros_de_estado_y_fecha(proyectos):
+    _crear_proyecto(proyectos, "a", "t", "2025-01-31 23:00:00", estado="completado")
+    _crear_proyecto(proyectos, "b", "t", "2025-02-01 08:00:00", estado="en_progreso")
+    _crear_proyecto(proyectos, "c", "t", "2025-01-15 08:00:00", estado="error")
+    catalogo.sincronizar_catalogo()
+
+    assert [p["nombre"] for p in catalogo.buscar_proyectos(hasta="2025-01-31")] == ["a", "c"]
+    assert [p["nombre"] for p in catalogo.buscar_proyectos(excluir_estado="completado")] == ["b", "c"]
+    assert catalogo.contar_proyectos(estado=["completado", "error"], desde="2025-01-20") == 1
+
+
+def test_sincronizar_relee_solo_cambios_y_quita_borrados(proyectos):
+    _crear_proyecto(proyectos, "a", "viejo", "2025-01-01 10:00:00")
+    raiz_b = _crear_proyecto(proyectos, "b", "t", "2025-01-02 10:00:00")
+    assert catalogo.sincronizar_catalogo() == 2
+    assert catalogo.sincronizar_catalogo() == 0
+
+    metadata = proyectos / "a" / "proyecto.json"
+    with open(metadata, "w", encoding="utf-8") as f:
+        json.dump({"tema": "nuevo", "estado": "completado", "fecha_creacion": "2025-01-01"}, f)
+    os.utime(metadata, (1, 1))
+    os.remove(raiz_b / "proyecto.json")
+    os.rmdir(raiz_b)
+
+    assert catalogo.sincronizar_catalogo() == 1
+    assert [p["tema"] for p in catalogo.buscar_proyectos()] == ["nuevo"]
@@ -0,0 +1,42 @@
+import json
+
+from src.guion import limpiar_json_gemini, reparar_json_truncado
+
+
+def test_saltos_y_tabs_dentro_de_strings_pasan_a_espacio():
+    texto = '{\n  "titulo": "linea uno\nlinea\tdos"\n}'
+    limpio = limpiar_json_gemini(texto)
+    assert json.loads(limpio) == {"titulo": "linea uno linea dos"}
+    # Fuera de los strings el JSON no se toca
+    assert limpio.startswith("{\n  ")
+
+
+def test_otros_controles_se_eliminan():
+    assert json.loads(limpiar_json_gemini('{"a": "x\x01y\rz"}')) == {"a": "xyz"}
+
+
+def test_comillas_y_barras_escapadas():
+    texto = '{"a": "dijo \\"hola\n\\"", "b": "C:\\\\", "c": "fin\n"}'
+    assert json.loads(limpiar_json_gemini(texto)) == {
+        "a": 'dijo "hola "',
+        "b": "C:\\",
+        "c": "fin ",
+    }
+
+
+def test_texto_sin_strings():
+    assert limpiar_json_gemini("[1, 2]") == "[1, 2]"
+
+
+def test_reparar_string_y_estructuras_abiertas():
+    reparado = reparar_json_truncado('{"secciones": [{"audio_narracion": "Hab')
+    assert json.loads(reparado) == {"secciones": [{"audio_narracion": "Hab"}]}
+
+
+def test_reparar_coma_y_dos_puntos_colgantes():
+    assert json.loads(reparar_json_truncado('{"a": 1,')) == {"a": 1}
+    assert json.loads(reparar_json_truncado('{"a": [1, {"b":')) == {"a": [1, {"b": None}]}
+
+
+def test_reparar_escape_a_medias():
+    assert json.loads(reparar_json_truncado('{"a": "x\\')) == {"a": "x"}
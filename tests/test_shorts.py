@@ -0,0 +1,94 @@
+from src.shorts import (
+    _fusionar_candidatos,
+    _puntuacion,
+    dividir_en_ventanas,
+    puntuar_ventanas,
+)
+
+
+def _transcripcion(hasta: int, paso: int = 10) -> str:
+    return "\n".join(f"[{s // 60}:{s % 60:02d}] linea {s}" for s in range(0, hasta, paso))
+
+
+def _momento(inicio: str, fin: str, puntuacion=5, titulo="") -> dict:
+    return {
+        "timestamp_inicio": inicio,
+        "timestamp_fin": fin,
+        "puntuacion": puntuacion,
+        "titulo": titulo,
+    }
+
+
+def test_ventanas_solapadas_cubren_todo():
+    ventanas = dividir_en_ventanas(_transcripcion(260), duracion_ventana=100, solape=30)
+    lineas = [v.splitlines() for v in ventanas]
+
+    assert lineas[0][0] == "[0:00] linea 0"
+    assert lineas[-1][-1] == "[4:10] linea 250"
+    # Cada ventana repite los últimos 30 s de la anterior
+    for anterior, siguiente in zip(lineas, lineas[1:]):
+        assert anterior[-3:] == siguiente[:3]
+    assert all(len(v) <= 10 for v in lineas)
+
+
+def test_ventanas_texto_corto_o_vacio():
+    assert dividir_en_ventanas("") == []
+    texto = "[0:00] a\nsigue sin timestamp\n[0:05] b"
+    assert dividir_en_ventanas(texto, duracion_ventana=100, solape=30) == [texto]
+
+
+def test_puntuacion_tolera_formatos():
+    assert _puntuacion({"puntuacion": 8}) == 8
+    assert _puntuacion({"puntuacion": "8/10"}) == 8
+    assert _puntuacion({"puntuacion": "7,5"}) == 7.5
+    assert _puntuacion({"puntuacion": "alta"}) == 0
+    assert _puntuacion({"puntuacion": None}) == 0
+    assert _puntuacion({}) == 0
+
+
+def test_fusionar_candidatos_de_ventanas_solapadas():
+    candidatos = [
+        # El mismo momento visto desde dos ventanas consecutivas
+        _momento("14:00", "14:40", "7/10", "ventana 1"),
+        _momento("14:05", "14:45", 9, "ventana 2"),
+        # Solape menor que la mitad: es otro momento
+        _momento("14:35", "15:20", 6, "siguiente"),
+        _momento("2:00", "2:30", "buena", "puntuacion rara"),
+    ]
+    fusionados = _fusionar_candidatos(candidatos)
+
+    assert [m["titulo"] for m in fusionados] == ["puntuacion rara", "ventana 2", "siguiente"]
+
+
+def test_fusionar_descarta_timestamps_invalidos():
+    candidatos = [
+        _momento("1:xx", "2:00", 10, "roto"),
+        _momento("3:00", "2:00", 10, "al revés"),
+        {"timestamp_inicio": None, "timestamp_fin": "1:00"},
+        "no es un momento",
+        _momento("0:10", "0:50", 3, "válido"),
+    ]
+    assert [m["titulo"] for m in _fusionar_candidatos(candidatos)] == ["válido"]
+
+
+def test_puntuar_ventanas_prefiere_el_tramo_animado():
+    transcript = []
+    for inicio in range(0, 300, 5):
+        texto = "hablamos del tema como siempre"
+        if 180 <= inicio < 215:
+            texto = "¡no puede ser! [risas] ¿increíble sorpresa tremenda?"
+        transcript.append({"start": inicio, "duration": 5, "text": texto})
+
+    ventanas = puntuar_ventanas(transcript)
+
+    puntuaciones = [v["puntuacion"] for v in ventanas]
+    assert puntuaciones == sorted(puntuaciones, reverse=True)
+    assert all(30 <= v["fin"] - v["inicio"] <= 60 for v in ventanas)
+    mejor = ventanas[0]
+    assert mejor["inicio"] <= 180 and mejor["fin"] >= 210
+    assert mejor["marcadores"] > 0
+
+
+def test_puntuar_ventanas_sin_texto():
+    assert puntuar_ventanas([]) == []
+    assert puntuar_ventanas([{"start": 0, "duration": 40, "text": ""}]) == []